@@ -0,0 +1,108 @@
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import router
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import (AuthenticationFailed,
+                                                 InvalidToken)
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+User = get_user_model()
+
+# Поля, которых хватает аутентификации и пермишенам. Остальные поля
+# пользователя остаются отложенными и догружаются при обращении.
+SNAPSHOT_FIELDS = ('id', 'username', 'role', 'is_staff', 'is_superuser',
+                   'is_active')
+
+
+class UserSnapshotCache:
+    # Кэш снимков пользователей в памяти процесса с TTL. Сигналы
+    # в api.signals сбрасывают запись при изменении и удалении
+    # пользователя; другие воркеры увидят изменение не позже чем через TTL.
+    max_entries = 10000
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data = {}
+
+    def get(self, user_id):
+        entry = self._data.get(user_id)
+        if entry is None or entry[0] < time.monotonic():
+            return None
+        return entry[1]
+
+    def set(self, user_id, values):
+        expires = time.monotonic() + settings.JWT_USER_CACHE_TTL
+        with self._lock:
+            if len(self._data) >= self.max_entries:
+                now = time.monotonic()
+                self._data = {key: entry for key, entry in self._data.items()
+                              if entry[0] >= now}
+                if len(self._data) >= self.max_entries:
+                    self._data.clear()
+            self._data[user_id] = (expires, values)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._data.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+user_cache = UserSnapshotCache()
+
+
+def build_user(values):
+    # from_db ждет значения в порядке полей модели.
+    values = dict(zip(SNAPSHOT_FIELDS, values))
+    field_names = [field.attname for field in User._meta.concrete_fields
+                   if field.attname in values]
+    return User.from_db(router.db_for_read(User), field_names,
+                        [values[name] for name in field_names])
+
+
+def issue_token(user):
+    refresh = RefreshToken.for_user(user)
+    if settings.JWT_USER_CLAIMS:
+        for field in SNAPSHOT_FIELDS[1:]:
+            refresh[field] = getattr(user, field)
+    return refresh.access_token
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    # Пользователь из токена берется из снимка в кэше или из claims
+    # токена (JWT_USER_CLAIMS), без запроса к таблице пользователей.
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken('Token contained no recognizable user '
+                               'identification')
+        values = self.get_snapshot(validated_token, user_id)
+        if values is None:
+            return super().get_user(validated_token)
+        user = build_user(values)
+        if not user.is_active:
+            raise AuthenticationFailed('User is inactive',
+                                       code='user_inactive')
+        return user
+
+    def get_snapshot(self, validated_token, user_id):
+        if settings.JWT_USER_CLAIMS and all(
+                field in validated_token for field in SNAPSHOT_FIELDS[1:]):
+            return [user_id] + [validated_token[field]
+                                for field in SNAPSHOT_FIELDS[1:]]
+        values = user_cache.get(user_id)
+        if values is None:
+            values = (User.objects.filter(pk=user_id)
+                      .values_list(*SNAPSHOT_FIELDS).first())
+            if values is None:
+                return None
+            user_cache.set(user_id, values)
+        return values
@@ -0,0 +1,157 @@
+import hashlib
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
+from rest_framework.response import Response
+
+from api_yamdb.db.replicas import use_primary
+
+from .renderers import encode, uses_fast_json
+
+VERSION_KEY = 'api:version:{}'
+RESPONSE_KEY = 'api:response:v2:{}'
+CACHED_HEADERS = ('ETag', 'Last-Modified')
+
+
+def get_cache():
+    return caches[settings.API_CACHE_ALIAS]
+
+
+class CacheStats:
+    # Счетчики попаданий текущего процесса, по basename вьюсета.
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = Counter()
+        self.misses = Counter()
+
+    def record(self, name, hit):
+        with self._lock:
+            (self.hits if hit else self.misses)[name] += 1
+
+    def snapshot(self):
+        with self._lock:
+            names = sorted(set(self.hits) | set(self.misses))
+            return {
+                name: {'hits': self.hits[name], 'misses': self.misses[name]}
+                for name in names
+            }
+
+    def reset(self):
+        with self._lock:
+            self.hits.clear()
+            self.misses.clear()
+
+
+stats = CacheStats()
+
+
+def new_version():
+    # Версия от времени, а не от единицы: если LRU вытеснит ключ версии,
+    # новая не совпадет ни с одной из старых и не оживит устаревший ответ.
+    return time.time_ns()
+
+
+def get_versions(namespaces):
+    cache = get_cache()
+    keys = [VERSION_KEY.format(ns) for ns in namespaces]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, new_version(), timeout=None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def invalidate(*namespaces):
+    # Ответы не удаляются: у пространства меняется версия, старые ключи
+    # больше не собираются, а из кэша их вытеснит LRU или TIMEOUT.
+    cache = get_cache()
+    for namespace in namespaces:
+        key = VERSION_KEY.format(namespace)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, new_version(), timeout=None)
+
+
+def get_role(user):
+    if not user or not user.is_authenticated:
+        return 'anonymous'
+    if user.is_superuser:
+        return 'superuser'
+    return user.role
+
+
+class ResponseCacheMixin:
+    # Кэширует данные успешных GET-ответов. Ключ: путь, отсортированная
+    # строка запроса, роль пользователя и версии пространств имен,
+    # которые сбрасываются сигналами в api.signals.
+    cache_namespaces = ()
+
+    def get_cache_namespaces(self):
+        return self.cache_namespaces
+
+    def get_cache_key(self, request, namespaces):
+        parts = [request.path, get_role(request.user)]
+        parts += sorted(request.query_params.lists())
+        parts += zip(namespaces, get_versions(namespaces))
+        digest = hashlib.md5(repr(parts).encode()).hexdigest()
+        return RESPONSE_KEY.format(digest)
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        cache = get_cache()
+        key = self.get_cache_key(request, self.get_cache_namespaces())
+        entry = cache.get(key)
+        name = self.basename or type(self).__name__
+        stats.record(name, hit=entry is not None)
+        if entry is not None:
+            data, headers, content = entry
+            headers['X-Cache'] = 'HIT'
+            # Валидаторы (ETag, Last-Modified) сохранены вместе с ответом,
+            # поэтому 304 отдается без обращения к БД.
+            not_modified = get_conditional_response(
+                request, etag=headers.get('ETag'),
+                last_modified=parse_http_date_safe(
+                    headers.get('Last-Modified', '')))
+            if not_modified is not None:
+                for header, value in headers.items():
+                    not_modified[header] = value
+                return not_modified
+            response = Response(data, headers=headers)
+            if content is not None and uses_fast_json(request):
+                # JSON уже закодирован при промахе: рендерер отдаст байты.
+                response.encoded_json = content
+            return response
+        # Промах читает с primary: отставшая реплика вернула бы данные
+        # до записи, и они закэшировались бы под уже сброшенной версией.
+        with use_primary():
+            response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            headers = {header: response[header] for header in CACHED_HEADERS
+                       if response.has_header(header)}
+            content = None
+            if uses_fast_json(request):
+                content = response.encoded_json = encode(response.data)
+            cache.set(key, (response.data, headers, content),
+                      settings.API_CACHE_TIMEOUT)
+            response['X-Cache'] = 'MISS'
+        return response
+
+
+class CachedListMixin(ResponseCacheMixin):
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+
+class CachedRetrieveMixin(ResponseCacheMixin):
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(super().retrieve, request, *args,
+                                    **kwargs)
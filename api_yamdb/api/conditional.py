@@ -0,0 +1,79 @@
+import hashlib
+from datetime import datetime
+
+from django.core.exceptions import ValidationError
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+
+class ConditionalGetMixin:
+    # ETag и Last-Modified для list/retrieve по одному агрегату
+    # (число строк и max(modified)) до запуска сериализатора: повторный
+    # опрос без изменений получает 304 без тела. В conditional_related
+    # перечисляются modified или счетчики связанных моделей, которые
+    # меняются вместе с ответом; conditional_count добавляет COUNT(*),
+    # чтобы заметить удаление строк, если такого счетчика нет. COUNT(*)
+    # меняет только ETag: для If-Modified-Since удаление датирует
+    # conditional_deletions - max(deleted_at) мягко удаленных строк.
+    conditional_related = ()
+    conditional_count = True
+    conditional_deletions = False
+
+    def get_conditional_queryset(self):
+        queryset = self.filter_queryset(self.get_queryset())
+        if self.action == 'retrieve':
+            lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+            queryset = queryset.filter(
+                **{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        return queryset
+
+    def get_conditional_state(self, request):
+        aggregates = {'modified': Max('modified')}
+        if self.conditional_count:
+            aggregates['count'] = Count('pk')
+        for field in self.conditional_related:
+            aggregates[field] = Max(field)
+        try:
+            state = self.get_conditional_queryset().order_by().aggregate(
+                **aggregates)
+        except (TypeError, ValueError, ValidationError):
+            # Некорректный lookup: пусть 404 вернет обычный обработчик.
+            return None, None
+        if self.conditional_deletions and self.action == 'list':
+            model = self.get_queryset().model
+            state.update(model._base_manager.aggregate(
+                deleted=Max('deleted_at')))
+        stamps = [value for value in state.values()
+                  if isinstance(value, datetime)]
+        if not stamps:
+            return None, None
+        key = (request.get_full_path(), request.accepted_media_type,
+               sorted(state.items()))
+        etag = hashlib.md5(repr(key).encode()).hexdigest()
+        return quote_etag(etag), max(stamps).timestamp()
+
+    def conditional_response(self, handler, request, *args, **kwargs):
+        etag, last_modified = self.get_conditional_state(request)
+        if etag is not None:
+            not_modified = get_conditional_response(
+                request, etag=etag, last_modified=int(last_modified))
+            if not_modified is not None:
+                return self.set_validators(not_modified, etag, last_modified)
+        response = handler(request, *args, **kwargs)
+        if etag is not None and response.status_code == 200:
+            self.set_validators(response, etag, last_modified)
+        return response
+
+    def set_validators(self, response, etag, last_modified):
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(super().list, request, *args,
+                                         **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(super().retrieve, request, *args,
+                                         **kwargs)
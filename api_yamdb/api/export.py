@@ -0,0 +1,87 @@
+import json
+from collections import defaultdict
+from itertools import chain
+
+from django.db.models import Q
+from reviews.catalog import chunked, export_value
+from reviews.models import Review, Title
+
+EXPORT_CHUNK_SIZE = 2000
+# Строк в одном куске ответа: по одному write() на строку сервер тратил
+# бы больше на системные вызовы, чем на сериализацию.
+LINES_PER_WRITE = 100
+
+
+def title_rows(queryset, chunk_size):
+    fields = ('id', 'name', 'year', 'description', 'category__slug',
+              'rating', 'modified')
+    rows = queryset.order_by('pk').values_list(*fields).iterator(
+        chunk_size=chunk_size)
+    # iterator() не выполняет prefetch_related: жанры догружаются
+    # одним запросом на пачку.
+    for chunk in chunked(rows, chunk_size):
+        genres = defaultdict(list)
+        for title_id, slug in (
+                Title.genre.through.objects
+                .filter(title_id__in=[row[0] for row in chunk])
+                .order_by('pk').values_list('title_id', 'genre__slug')):
+            genres[title_id].append(slug)
+        for row in chunk:
+            data = dict(zip(fields, row))
+            data['category'] = data.pop('category__slug')
+            data['genre'] = genres[row[0]]
+            yield data
+
+
+def review_rows(queryset, chunk_size):
+    fields = ('id', 'title_id', 'author__username', 'text', 'score',
+              'pub_date', 'modified')
+    rows = queryset.visible().order_by('pk').values_list(*fields).iterator(
+        chunk_size=chunk_size)
+    for row in rows:
+        data = dict(zip(fields, row))
+        data['title'] = data.pop('title_id')
+        data['author'] = data.pop('author__username')
+        yield data
+
+
+def deleted_titles(since):
+    return Title.all_objects.filter(deleted_at__gte=since)
+
+
+def deleted_reviews(since):
+    # Отзыв пропадает из выгрузки и вместе с произведением или автором.
+    return Review.all_objects.filter(
+        Q(deleted_at__gte=since) | Q(title__deleted_at__gte=since)
+        | Q(author__deleted_at__gte=since))
+
+
+def tombstones(queryset, chunk_size):
+    # Мягко удаленные строки: без них зеркало партнера хранило бы их
+    # вечно. После purge_deleted строк уже нет.
+    pks = queryset.order_by('pk').values_list('pk', flat=True).iterator(
+        chunk_size=chunk_size)
+    for pk in pks:
+        yield {'id': pk, 'deleted': True}
+
+
+EXPORTS = {
+    'titles': (Title, title_rows, deleted_titles),
+    'reviews': (Review, review_rows, deleted_reviews),
+}
+
+
+def ndjson_stream(entity, since=None, chunk_size=EXPORT_CHUNK_SIZE):
+    model, rows, deleted = EXPORTS[entity]
+    queryset = model.objects.all()
+    if since is not None:
+        queryset = queryset.filter(modified__gte=since)
+    lines = rows(queryset, chunk_size)
+    if since is not None:
+        lines = chain(lines, tombstones(deleted(since), chunk_size))
+    for chunk in chunked(lines, LINES_PER_WRITE):
+        yield ''.join(
+            json.dumps({key: export_value(value)
+                        for key, value in data.items()},
+                       ensure_ascii=False) + '\n'
+            for data in chunk)
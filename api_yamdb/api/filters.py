@@ -1,15 +1,76 @@
 from django_filters import rest_framework as filters
+from rest_framework.filters import OrderingFilter
 from reviews.models import Title
 
 
+class CharInFilter(filters.BaseInFilter, filters.CharFilter):
+    pass
+
+
 class TitleFilter(filters.FilterSet):
-    category = filters.CharFilter(field_name="category__slug",
-                                  lookup_expr="icontains")
-    year = filters.NumberFilter(field_name="year", lookup_expr="icontains")
+    category = filters.CharFilter(field_name="category__slug")
+    genre = CharInFilter(method="filter_genre")
+    year = filters.NumberFilter(field_name="year")
+    year_min = filters.NumberFilter(field_name="year", lookup_expr="gte")
+    year_max = filters.NumberFilter(field_name="year", lookup_expr="lte")
     name = filters.CharFilter(field_name="name", lookup_expr="icontains")
-    genre = filters.CharFilter(field_name="genre__slug",
-                               lookup_expr="icontains")
+    # Поиск по подстроке, как раньше: индексы тут не помогают.
+    category_contains = filters.CharFilter(field_name="category__slug",
+                                           lookup_expr="icontains")
+    genre_contains = filters.CharFilter(method="filter_genre")
+    year_contains = filters.CharFilter(field_name="year",
+                                       lookup_expr="icontains")
 
     class Meta:
         model = Title
-        fields = "__all__"
+        fields = ("name", "year", "category", "genre")
+
+    def filter_genre(self, queryset, name, value):
+        # Подзапрос вместо JOIN по M2M: произведение с несколькими
+        # подходящими жанрами не попадает в выдачу дважды.
+        if name == "genre_contains":
+            genres = {"genre__slug__icontains": value}
+        else:
+            genres = {"genre__slug__in": value}
+        title_ids = Title.genre.through.objects.filter(
+            **genres).values("title_id")
+        return queryset.filter(pk__in=title_ids)
+
+
+class MappedOrderingFilter(OrderingFilter):
+    # Публичные имена сортировок и хранимые индексированные колонки за
+    # ними: ?ordering=-rating,year. Последним добавляется id, чтобы порядок
+    # был однозначным и страницы не пересекались.
+    fields = {}
+
+    def get_valid_fields(self, queryset, view, context={}):
+        return [(name, name) for name in self.fields]
+
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view)
+        if not ordering:
+            return ordering
+        columns = [
+            ("-" if term.startswith("-") else "") + self.fields[
+                term.lstrip("-")]
+            for term in ordering
+        ]
+        return columns + ["-id" if columns[-1].startswith("-") else "id"]
+
+
+class TitleOrderingFilter(MappedOrderingFilter):
+    fields = {
+        "rating": "weighted_rating",
+        "year": "year",
+        "name": "name",
+        "review_count": "rating_count",
+    }
+
+
+class ReviewOrderingFilter(MappedOrderingFilter):
+    # В режиме ?pagination=cursor порядок всегда по дате.
+    fields = {
+        "pub_date": "pub_date",
+        "score": "score",
+        "comment_count": "comment_count",
+    }
@@ -0,0 +1,199 @@
+import json
+import math
+import platform
+import subprocess
+import time
+import tracemalloc
+
+import django
+from api.cache import get_cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from reviews.models import Category, Comment, Genre, Review, Title, User
+
+PAGE_SIZE = 15
+
+
+def percentile(values, percent):
+    # Ближайший ранг: p99 из 100 замеров - второй по величине.
+    values = sorted(values)
+    return values[max(0, math.ceil(percent / 100 * len(values)) - 1)]
+
+
+def build_endpoints():
+    title = (Title.objects.order_by('-rating_count', 'pk')
+             .values_list('pk', 'rating_count').first())
+    if title is None:
+        raise CommandError('В БД нет произведений: выполните seed_data')
+    title_id, review_count = title
+    comment = (Comment.objects.filter(review__title_id=title_id)
+               .values_list('review_id', flat=True).first())
+    genre = Genre.objects.values_list('slug', flat=True).first()
+    category = Category.objects.values_list('slug', flat=True).first()
+    reviews = f'/api/v1/titles/{title_id}/reviews/'
+    endpoints = {
+        'titles_list': '/api/v1/titles/',
+        'titles_top_rated': '/api/v1/titles/?ordering=-rating',
+        'title_detail': f'/api/v1/titles/{title_id}/',
+        'reviews_list': reviews,
+        # Последняя страница: цена OFFSET на длинном списке.
+        'reviews_last_page':
+            f'{reviews}?page={max(1, -(-review_count // PAGE_SIZE))}',
+        'reviews_cursor': f'{reviews}?pagination=cursor',
+        'categories_list': '/api/v1/categories/',
+        'genres_list': '/api/v1/genres/',
+        'search': '/api/v1/search/?q=детектив',
+    }
+    if genre:
+        endpoints['titles_by_genre'] = (
+            f'/api/v1/titles/?genre={genre}&ordering=-rating')
+    if category:
+        endpoints['titles_by_category'] = (
+            f'/api/v1/titles/?category={category}&ordering=-rating')
+    if comment:
+        endpoints['comments_list'] = (
+            f'/api/v1/titles/{title_id}/reviews/{comment}/comments/')
+    return endpoints
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+            text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = ('Замеряет p50/p95/p99, число SQL-запросов и пик памяти '
+            'основных эндпоинтов через тестовый клиент DRF на текущей БД.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=50)
+        parser.add_argument('--warmup', type=int, default=5)
+        parser.add_argument(
+            '--endpoints', help='Через запятую; по умолчанию все.')
+        parser.add_argument(
+            '--warm-cache', action='store_true',
+            help='Не сбрасывать кэш ответов перед каждым запросом.')
+        parser.add_argument('--output', help='Файл для результатов в JSON.')
+        parser.add_argument(
+            '--compare', help='JSON прошлого запуска для сравнения.')
+        parser.add_argument(
+            '--threshold', type=float, default=1.2,
+            help='Допустимый рост p95 относительно --compare.')
+
+    def handle(self, *args, **options):
+        endpoints = build_endpoints()
+        if options['endpoints']:
+            names = options['endpoints'].split(',')
+            unknown = set(names) - set(endpoints)
+            if unknown:
+                raise CommandError(
+                    f'Неизвестные эндпоинты: {", ".join(sorted(unknown))}')
+            endpoints = {name: endpoints[name] for name in names}
+        results = {
+            'meta': self.meta(options),
+            'endpoints': {
+                name: self.measure(url, options)
+                for name, url in endpoints.items()
+            },
+        }
+        self.print_table(results['endpoints'])
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as output:
+                json.dump(results, output, ensure_ascii=False, indent=2)
+        if options['compare']:
+            self.compare(results, options)
+
+    def meta(self, options):
+        return {
+            'created': timezone.now().isoformat(),
+            'commit': git_commit(),
+            'database': connection.vendor,
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'requests': options['requests'],
+            'warm_cache': options['warm_cache'],
+            'rows': {
+                model._meta.model_name: model.objects.count()
+                for model in (User, Title, Review, Comment)
+            },
+        }
+
+    def request(self, client, url, options):
+        if not options['warm_cache']:
+            get_cache().clear()
+        response = client.get(url)
+        if response.status_code != 200:
+            raise CommandError(f'{url}: ответ {response.status_code}')
+        return response
+
+    def measure(self, url, options):
+        client = APIClient()
+        for _ in range(options['warmup']):
+            self.request(client, url, options)
+        latencies, queries = [], []
+        for _ in range(max(1, options['requests'])):
+            with CaptureQueriesContext(connection) as context:
+                started = time.perf_counter()
+                self.request(client, url, options)
+                latencies.append((time.perf_counter() - started) * 1000)
+            queries.append(len(context))
+        return {
+            'url': url,
+            'p50_ms': round(percentile(latencies, 50), 3),
+            'p95_ms': round(percentile(latencies, 95), 3),
+            'p99_ms': round(percentile(latencies, 99), 3),
+            'mean_ms': round(sum(latencies) / len(latencies), 3),
+            'queries': max(queries),
+            'peak_memory_kb': self.peak_memory(client, url, options),
+        }
+
+    def peak_memory(self, client, url, options, runs=3):
+        # Отдельным проходом: tracemalloc замедляет запросы в разы
+        # и исказил бы задержки.
+        tracemalloc.start()
+        peak = 0
+        try:
+            for _ in range(runs):
+                tracemalloc.clear_traces()
+                self.request(client, url, options)
+                peak = max(peak, tracemalloc.get_traced_memory()[1])
+        finally:
+            tracemalloc.stop()
+        return round(peak / 1024, 1)
+
+    def print_table(self, endpoints):
+        self.stdout.write(f'{"endpoint":24}{"p50":>10}{"p95":>10}'
+                          f'{"p99":>10}{"queries":>9}{"peak KB":>10}')
+        for name, result in endpoints.items():
+            self.stdout.write(
+                f'{name:24}{result["p50_ms"]:>10.2f}{result["p95_ms"]:>10.2f}'
+                f'{result["p99_ms"]:>10.2f}{result["queries"]:>9}'
+                f'{result["peak_memory_kb"]:>10.1f}')
+
+    def compare(self, results, options):
+        with open(options['compare'], encoding='utf-8') as baseline_file:
+            baseline = json.load(baseline_file)['endpoints']
+        regressions = []
+        for name, result in results['endpoints'].items():
+            if name not in baseline:
+                continue
+            base = baseline[name]
+            ratio = result['p95_ms'] / max(base['p95_ms'], 1e-6)
+            self.stdout.write(
+                f'{name:24} p95 x{ratio:.2f}, запросов '
+                f'{base["queries"]} -> {result["queries"]}')
+            if ratio > options['threshold']:
+                regressions.append(f'{name}: p95 x{ratio:.2f}')
+            if result['queries'] > base['queries']:
+                regressions.append(
+                    f'{name}: запросов {base["queries"]} -> '
+                    f'{result["queries"]}')
+        if regressions:
+            raise CommandError('Регрессии: ' + '; '.join(regressions))
@@ -0,0 +1,90 @@
+import json
+
+from api.compiled import CompiledSerializer
+from api.management.commands.benchmark_serializers import best_time
+from api.renderers import BACKENDS, encode
+from api.serializers import (CategorySerializer, ReviewSerializer,
+                             TitleReadSerializer)
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+from reviews.models import Category, Review, Title
+
+PAYLOADS = {
+    'titles': (lambda: Title.objects.for_read().order_by('pk'),
+               TitleReadSerializer),
+    'reviews': (lambda: Review.objects.select_related('author', 'title')
+                .defer('search_vector', 'title__search_vector')
+                .order_by('pk'),
+                ReviewSerializer),
+    'categories': (lambda: Category.objects.order_by('pk'),
+                   CategorySerializer),
+}
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает JSONRenderer DRF и кодировщики api.renderers '
+            'на страницах из текущей БД: кодирований в секунду, МБ/с, '
+            'разбор тела и совпадение JSON байт в байт.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=15,
+                            help='Объектов на странице.')
+        parser.add_argument('--repeat', type=int, default=200)
+        parser.add_argument('--output', help='Файл для результатов в JSON.')
+
+    def handle(self, *args, **options):
+        results = {name: self.measure(name, options) for name in PAYLOADS}
+        columns = ['drf', *BACKENDS]
+        self.stdout.write(
+            f'{"":12}{"bytes":>8}'
+            + ''.join(f'{column + " ops/s":>16}' for column in columns)
+            + f'{"MB/s":>8}{"loads/s":>10}  JSON')
+        for name, result in results.items():
+            fastest = max(BACKENDS, key=lambda b: result[b]['ops_per_s'])
+            self.stdout.write(
+                f'{name:12}{result["bytes"]:>8}'
+                + ''.join(f'{result[column]["ops_per_s"]:>16}'
+                          for column in columns)
+                + f'{result[fastest]["mb_per_s"]:>8}'
+                f'{result[fastest]["loads_per_s"]:>10}  '
+                f'{"совпадает" if result["identical"] else "РАЗЛИЧАЕТСЯ"}')
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as output:
+                json.dump(results, output, ensure_ascii=False, indent=2)
+        different = [name for name, result in results.items()
+                     if not result['identical']]
+        if different:
+            raise CommandError(f'JSON различается: {", ".join(different)}')
+
+    def measure(self, name, options):
+        get_queryset, serializer_class = PAYLOADS[name]
+        rows, repeat = options['rows'], max(1, options['repeat'])
+        compiled = CompiledSerializer(serializer_class)
+        results = compiled.serialize(compiled.values(get_queryset())[:rows])
+        # Страница в том виде, в каком ее отдает PageNumberPagination.
+        data = {'count': len(results), 'next': None, 'previous': None,
+                'results': list(results)}
+        renderer = JSONRenderer()
+        expected = renderer.render(data)
+        size = len(expected)
+
+        def measured(function):
+            seconds, _ = best_time(
+                lambda: [function() for _ in range(10)], repeat)
+            return round(10 / max(seconds, 1e-9))
+
+        result = {'bytes': size,
+                  'drf': {'ops_per_s': measured(
+                      lambda: renderer.render(data))}}
+        identical = True
+        for backend_name, backend in BACKENDS.items():
+            ops = measured(lambda: encode(data, backend))
+            content = encode(data, backend)
+            identical = identical and content == expected
+            result[backend_name] = {
+                'ops_per_s': ops,
+                'mb_per_s': round(ops * size / 1e6, 1),
+                'loads_per_s': measured(lambda: backend.loads(content)),
+            }
+        result['identical'] = identical
+        return result
@@ -0,0 +1,105 @@
+import json
+import time
+
+from api.compiled import CompiledSerializer
+from api.serializers import (CommentSerializer, ReviewSerializer,
+                             TitleReadSerializer)
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+from reviews.models import Comment, Review, Title
+
+SERIALIZERS = {
+    'titles': (lambda: Title.objects.for_read().order_by('pk'),
+               TitleReadSerializer),
+    'reviews': (lambda: Review.objects.select_related('author', 'title')
+                .defer('search_vector', 'title__search_vector'),
+                ReviewSerializer),
+    'comments': (lambda: Comment.objects.select_related('author')
+                 .defer('search_vector'),
+                 CommentSerializer),
+}
+
+
+def best_time(function, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function()
+        timings.append(time.perf_counter() - started)
+    return min(timings), result
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает ModelSerializer и CompiledSerializer на строках '
+            'текущей БД: строк в секунду (с запросами и без) и совпадение '
+            'JSON байт в байт.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--output', help='Файл для результатов в JSON.')
+
+    def handle(self, *args, **options):
+        results = {name: self.measure(name, options) for name in SERIALIZERS}
+        self.stdout.write(
+            f'{"":10}{"rows":>7}{"drf rows/s":>14}{"compiled":>14}'
+            f'{"x":>7}{"drf+sql":>12}{"comp+sql":>12}{"x":>7}  JSON')
+        for name, result in results.items():
+            self.stdout.write(
+                f'{name:10}{result["rows"]:>7}{result["drf_rows_per_s"]:>14}'
+                f'{result["compiled_rows_per_s"]:>14}'
+                f'{result["speedup"]:>7}'
+                f'{result["drf_total_rows_per_s"]:>12}'
+                f'{result["compiled_total_rows_per_s"]:>12}'
+                f'{result["total_speedup"]:>7}  '
+                f'{"совпадает" if result["identical"] else "РАЗЛИЧАЕТСЯ"}')
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as output:
+                json.dump(results, output, ensure_ascii=False, indent=2)
+        different = [name for name, result in results.items()
+                     if not result['identical']]
+        if different:
+            raise CommandError(f'JSON различается: {", ".join(different)}')
+
+    def measure(self, name, options):
+        get_queryset, serializer_class = SERIALIZERS[name]
+        compiled = CompiledSerializer(serializer_class)
+        rows, repeat = options['rows'], max(1, options['repeat'])
+
+        def drf_total():
+            return serializer_class(list(get_queryset()[:rows]),
+                                    many=True).data
+
+        def compiled_total():
+            return compiled.serialize(compiled.values(get_queryset())[:rows])
+
+        # Отдельно - только сериализация уже загруженной страницы.
+        objects = list(get_queryset()[:rows])
+        values = list(compiled.values(get_queryset())[:rows])
+        related = compiled.related(values)
+        drf_time, drf_data = best_time(
+            lambda: serializer_class(objects, many=True).data, repeat)
+        compiled_time, _ = best_time(
+            lambda: [compiled.plan.build(row, related) for row in values],
+            repeat)
+        drf_total_time, _ = best_time(drf_total, repeat)
+        compiled_total_time, compiled_data = best_time(compiled_total,
+                                                       repeat)
+        count = len(objects)
+        renderer = JSONRenderer()
+
+        def per_second(seconds):
+            return round(count / max(seconds, 1e-9))
+
+        return {
+            'rows': count,
+            'drf_rows_per_s': per_second(drf_time),
+            'compiled_rows_per_s': per_second(compiled_time),
+            'speedup': round(drf_time / max(compiled_time, 1e-9), 1),
+            'drf_total_rows_per_s': per_second(drf_total_time),
+            'compiled_total_rows_per_s': per_second(compiled_total_time),
+            'total_speedup': round(
+                drf_total_time / max(compiled_total_time, 1e-9), 1),
+            'identical': (renderer.render(drf_data)
+                          == renderer.render(compiled_data)),
+        }
@@ -0,0 +1,193 @@
+import asyncio
+import json
+import time
+from collections import Counter
+from urllib.parse import urlsplit
+
+from api.management.commands.benchmark_api import git_commit, percentile
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+
+async def read_response(reader):
+    head = await reader.readuntil(b'\r\n\r\n')
+    lines = head.decode('latin1').split('\r\n')
+    status = int(lines[0].split(' ', 2)[1])
+    headers = {}
+    for line in lines[1:]:
+        if ':' in line:
+            name, value = line.split(':', 1)
+            headers[name.strip().lower()] = value.strip()
+    if 'content-length' in headers:
+        await reader.readexactly(int(headers['content-length']))
+    elif headers.get('transfer-encoding') == 'chunked':
+        while True:
+            size = int((await reader.readline()).split(b';')[0], 16)
+            if size == 0:
+                while (await reader.readline()) not in (b'\r\n', b''):
+                    pass
+                break
+            await reader.readexactly(size + 2)
+    else:
+        await reader.read()
+        headers['connection'] = 'close'
+    return status, headers.get('connection') == 'close'
+
+
+def milliseconds(value):
+    return '-' if value is None else f'{value:.2f} мс'
+
+
+class LoadTest:
+    # Замкнутая нагрузка: concurrency клиентов с keep-alive шлют запросы
+    # один за другим, пока не истечет время.
+
+    def __init__(self, url, headers, timeout):
+        parts = urlsplit(url)
+        if parts.scheme != 'http':
+            raise CommandError('Поддерживается только http://')
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.timeout = timeout
+        path = (parts.path or '/') + (f'?{parts.query}' if parts.query else '')
+        lines = [f'GET {path} HTTP/1.1', f'Host: {parts.netloc}',
+                 'Connection: keep-alive', *headers]
+        self.request = ('\r\n'.join(lines) + '\r\n\r\n').encode('latin1')
+        self.latencies = []
+        self.statuses = Counter()
+        self.errors = 0
+
+    async def fetch(self, connection):
+        if connection is None:
+            connection = await asyncio.open_connection(self.host, self.port)
+        reader, writer = connection
+        writer.write(self.request)
+        await writer.drain()
+        status, close = await read_response(reader)
+        return connection, status, close
+
+    async def client(self, deadline, record):
+        connection = None
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            try:
+                connection, status, close = await asyncio.wait_for(
+                    self.fetch(connection), self.timeout)
+            except (OSError, ValueError, asyncio.TimeoutError,
+                    asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+                # Таймаут тоже ошибка: зависший сервер дает 0 запросов/с,
+                # а не вечное ожидание.
+                if record:
+                    self.errors += 1
+                connection = self.close(connection)
+                await asyncio.sleep(0.01)
+                continue
+            if record:
+                self.latencies.append(
+                    (time.perf_counter() - started) * 1000)
+                self.statuses[status] += 1
+            if close:
+                connection = self.close(connection)
+        self.close(connection)
+
+    async def open_idle(self):
+        # Медленный клиент: начал запрос и молчит. Синхронный воркер
+        # gunicorn ждет его целиком, цикл событий uvicorn - нет.
+        try:
+            reader, writer = await asyncio.open_connection(self.host,
+                                                           self.port)
+            writer.write(self.request[:self.request.index(b'\r\n') + 2])
+            await writer.drain()
+        except OSError:
+            return None
+        return writer
+
+    def close(self, connection):
+        if connection is not None:
+            connection[1].close()
+
+    async def run(self, concurrency, duration, warmup, idle):
+        idle_writers = [await self.open_idle() for _ in range(idle)]
+        try:
+            if warmup:
+                await asyncio.gather(*(
+                    self.client(time.monotonic() + warmup, record=False)
+                    for _ in range(concurrency)))
+            deadline = time.monotonic() + duration
+            await asyncio.gather(*(self.client(deadline, record=True)
+                                   for _ in range(concurrency)))
+        finally:
+            for writer in filter(None, idle_writers):
+                writer.close()
+
+
+class Command(BaseCommand):
+    help = ('Нагрузочный тест запущенного сервера: RPS и задержки при '
+            'заданном числе одновременных keep-alive соединений. Для '
+            'сравнения WSGI и ASGI запустите его против gunicorn и uvicorn.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('url')
+        parser.add_argument('--concurrency', type=int, default=50)
+        parser.add_argument('--duration', type=float, default=10)
+        parser.add_argument('--warmup', type=float, default=1)
+        parser.add_argument(
+            '--timeout', type=float, default=10,
+            help='Предельное время ответа, секунд; дольше - ошибка.')
+        parser.add_argument(
+            '--idle-connections', type=int, default=0,
+            help='Сколько медленных клиентов держат соединение без ответа.')
+        parser.add_argument(
+            '--header', action='append', default=[],
+            help='Заголовок запроса, например "Authorization: Bearer ...".')
+        parser.add_argument('--label', default='', help='Имя прогона.')
+        parser.add_argument('--output', help='Файл для результатов в JSON.')
+        parser.add_argument(
+            '--compare', help='JSON прошлого прогона для сравнения.')
+
+    def handle(self, *args, **options):
+        test = LoadTest(options['url'], options['header'], options['timeout'])
+        asyncio.run(test.run(
+            options['concurrency'], options['duration'], options['warmup'],
+            options['idle_connections']))
+        latencies = test.latencies
+        result = {
+            'label': options['label'],
+            'url': options['url'],
+            'created': timezone.now().isoformat(),
+            'commit': git_commit(),
+            'concurrency': options['concurrency'],
+            'idle_connections': options['idle_connections'],
+            'duration': options['duration'],
+            'requests': len(latencies),
+            'rps': round(len(latencies) / options['duration'], 1),
+            'errors': test.errors,
+            'statuses': {str(status): count
+                         for status, count in sorted(test.statuses.items())},
+        }
+        for percent in (50, 95, 99):
+            result[f'p{percent}_ms'] = (
+                round(percentile(latencies, percent), 3) if latencies
+                else None)
+        self.stdout.write(
+            f'{result["label"] or result["url"]}: {result["rps"]} запросов/с, '
+            f'p50 {milliseconds(result["p50_ms"])}, '
+            f'p95 {milliseconds(result["p95_ms"])}, '
+            f'p99 {milliseconds(result["p99_ms"])}, '
+            f'ошибок {result["errors"]}, статусы {result["statuses"]}')
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as output:
+                json.dump(result, output, ensure_ascii=False, indent=2)
+        if options['compare']:
+            self.compare(result, options['compare'])
+
+    def compare(self, result, path):
+        with open(path, encoding='utf-8') as base_file:
+            base = json.load(base_file)
+        line = (f'{base["label"] or "база"} -> {result["label"] or "прогон"}: '
+                f'RPS {base["rps"]} -> {result["rps"]}')
+        if base['rps']:
+            line += f' (x{result["rps"] / base["rps"]:.2f})'
+        if base['p95_ms'] and result['p95_ms']:
+            line += f', p95 x{result["p95_ms"] / base["p95_ms"]:.2f}'
+        self.stdout.write(line)
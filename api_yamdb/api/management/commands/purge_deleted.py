@@ -0,0 +1,138 @@
+import time
+from collections import Counter
+
+from api.cache import get_cache
+from api.metrics import PURGE_PROGRESS_KEY
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+from reviews.models import Comment, Review, Title
+
+User = get_user_model()
+
+SOFT_DELETED = (Title, User, Review, Comment)
+
+
+class Command(BaseCommand):
+    help = ('Удаляет мягко удаленные произведения, пользователей, отзывы '
+            'и комментарии вместе с зависимыми строками. Каждая пачка - '
+            'отдельная транзакция, так что прерванный запуск продолжается '
+            'следующим с того же места.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument(
+            '--sleep', type=float, default=0,
+            help='Пауза между пачками в секундах: меньше нагрузка на БД '
+                 'и отставание реплик.')
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать, сколько строк ждет удаления.')
+
+    def handle(self, *args, **options):
+        self.batch_size = max(1, options['batch_size'])
+        self.sleep = options['sleep']
+        self.verbosity = options['verbosity']
+        self.pending = self.count_pending()
+        self.write_pending('Ждут удаления')
+        if options['dry_run']:
+            return
+        self.purged = Counter()
+        self.started = time.monotonic()
+        # Корни по очереди: удаленное произведение забирает и отзывы
+        # удаленных авторов на него, и удаленные отзывы с комментариями.
+        for title_id in self.roots(Title):
+            self.purge_reviews(Review.all_objects.filter(title_id=title_id),
+                               hide=True)
+            self.purge(Title.all_objects.filter(pk=title_id))
+        for user_id in self.roots(User):
+            self.purge(Comment.all_objects.filter(author_id=user_id),
+                       before=self.uncount_comments)
+            # Отзывы, помеченные при удалении автора, уже вычтены из
+            # рейтинга; непомеченные вычтет post_delete.
+            self.purge_reviews(Review.all_objects.filter(author_id=user_id))
+            self.purge(User.objects.filter(pk=user_id))
+        self.purge_reviews(
+            Review.all_objects.filter(deleted_at__isnull=False))
+        self.purge(Comment.all_objects.filter(deleted_at__isnull=False))
+        self.pending = self.count_pending()
+        self.publish()
+        elapsed = max(time.monotonic() - self.started, 1e-6)
+        total = sum(self.purged.values())
+        self.stdout.write(self.style.SUCCESS(
+            f'Удалено строк: {total} за {elapsed:.1f} с '
+            f'({total / elapsed:.0f} строк/с)'
+            + ''.join(f', {label} {count}'
+                      for label, count in sorted(self.purged.items()))))
+        self.write_pending('Осталось')
+
+    def write_pending(self, prefix):
+        self.stdout.write(f'{prefix}: ' + ', '.join(
+            f'{label} {count}' for label, count in self.pending.items()))
+
+    def count_pending(self):
+        return {model._meta.label: model._base_manager.filter(
+            deleted_at__isnull=False).count() for model in SOFT_DELETED}
+
+    def roots(self, model):
+        return list(model._base_manager.filter(deleted_at__isnull=False)
+                    .order_by('pk').values_list('pk', flat=True))
+
+    def next_batch(self, queryset):
+        return list(queryset.order_by('pk').values_list('pk', flat=True)
+                    [:self.batch_size])
+
+    def purge_reviews(self, reviews, hide=False):
+        # Сначала комментарии пачки отзывов, потом сами отзывы: каскад
+        # Django удалил бы все комментарии популярного отзыва разом.
+        while True:
+            review_ids = self.next_batch(reviews)
+            if not review_ids:
+                return
+            self.purge(Comment.all_objects.filter(review_id__in=review_ids))
+            self.purge(Review.all_objects.filter(pk__in=review_ids),
+                       before=self.hide if hide else None)
+
+    def purge(self, queryset, before=None):
+        model = queryset.model
+        while True:
+            ids = self.next_batch(queryset)
+            if not ids:
+                return
+            with transaction.atomic():
+                batch = model._base_manager.filter(pk__in=ids)
+                if before is not None:
+                    before(batch)
+                _, deleted = batch.delete()
+            self.purged.update(deleted)
+            self.publish()
+            if self.verbosity > 1:
+                self.stdout.write(f'{model._meta.label}: {len(ids)}, всего '
+                                  f'{sum(self.purged.values())}')
+            if self.sleep:
+                time.sleep(self.sleep)
+
+    def hide(self, reviews):
+        # Отзывы удаленного произведения: рейтинг пересчитывать незачем,
+        # и помеченные строки обработчики post_delete пропускают.
+        reviews.filter(deleted_at__isnull=True).update(
+            deleted_at=timezone.now())
+
+    def uncount_comments(self, comments):
+        # Комментарии автора помечены при его удалении и уже вычтены из
+        # Review.comment_count; здесь - только добавленные параллельно.
+        counts = (comments.filter(deleted_at__isnull=True)
+                  .values('review_id').annotate(count=Count('id'))
+                  .order_by())
+        for row in counts:
+            Review.objects.filter(pk=row['review_id']).apply_comment_delta(
+                -row['count'])
+
+    def publish(self):
+        get_cache().set(PURGE_PROGRESS_KEY, {
+            'rows': dict(self.purged),
+            'pending': self.pending,
+            'updated': time.time(),
+        }, timeout=None)
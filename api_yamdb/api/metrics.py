@@ -0,0 +1,291 @@
+import logging
+import os
+import random
+import threading
+import time
+import traceback
+from bisect import bisect_left
+from collections import deque
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+
+from api_yamdb.db.pool import current_pools
+
+from .cache import get_cache
+from .cache import stats as cache_stats
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+
+# name: (описание, границы корзин); у каждой метрики метки route и method.
+HISTOGRAMS = {
+    'api_request_duration_seconds': (
+        'Время обработки запроса.', LATENCY_BUCKETS),
+    'api_db_queries': ('SQL-запросов на запрос.', QUERY_BUCKETS),
+    'api_db_duration_seconds': (
+        'Время в БД на запрос.', LATENCY_BUCKETS),
+    'api_serializer_duration_seconds': (
+        'Время сериализации ответа.', LATENCY_BUCKETS),
+    'api_response_size_bytes': ('Размер тела ответа.', SIZE_BUCKETS),
+}
+
+_local = threading.local()
+
+
+class Histogram:
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        total = 0
+        for bound, count in zip(self.buckets + ('+Inf',), self.counts):
+            total += count
+            yield bound, total
+
+
+class MetricsRegistry:
+    # Метрики текущего процесса. У каждого воркера gunicorn свой реестр:
+    # Prometheus видит воркер, на который попал запрос сбора.
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.histograms = {name: {} for name in HISTOGRAMS}
+            self.requests = {}
+            self.slow_query_count = 0
+            self.slow_queries = deque(maxlen=100)
+
+    def observe_request(self, route, method, status_code, values):
+        labels = (route, method)
+        with self._lock:
+            for name, value in values.items():
+                if value is None:
+                    continue
+                histograms = self.histograms[name]
+                if labels not in histograms:
+                    histograms[labels] = Histogram(HISTOGRAMS[name][1])
+                histograms[labels].observe(value)
+            key = labels + (status_code,)
+            self.requests[key] = self.requests.get(key, 0) + 1
+
+    def record_slow_query(self, sql, duration, origin):
+        with self._lock:
+            self.slow_query_count += 1
+            self.slow_queries.append(
+                {'sql': sql, 'duration': duration, 'origin': origin})
+        logger.warning('Медленный запрос %.1f мс (%s): %s',
+                       duration * 1000, origin, sql)
+
+    def render(self):
+        lines = []
+        with self._lock:
+            for name, (help_text, _) in HISTOGRAMS.items():
+                lines += [f'# HELP {name} {help_text}',
+                          f'# TYPE {name} histogram']
+                for (route, method), histogram in sorted(
+                        self.histograms[name].items()):
+                    labels = f'route="{route}",method="{method}"'
+                    for bound, total in histogram.cumulative():
+                        lines.append(
+                            f'{name}_bucket{{{labels},le="{bound}"}} {total}')
+                    lines.append(f'{name}_sum{{{labels}}} {histogram.sum}')
+                    lines.append(
+                        f'{name}_count{{{labels}}} {histogram.count}')
+            lines += ['# HELP api_requests_total Запросы по коду ответа.',
+                      '# TYPE api_requests_total counter']
+            for (route, method, status), count in sorted(
+                    self.requests.items()):
+                lines.append(
+                    f'api_requests_total{{route="{route}",method="{method}",'
+                    f'status="{status}"}} {count}')
+            lines += [
+                '# HELP api_slow_queries_total Запросы к БД дольше '
+                'METRICS_SLOW_QUERY_MS.',
+                '# TYPE api_slow_queries_total counter',
+                f'api_slow_queries_total {self.slow_query_count}',
+            ]
+        lines += ['# HELP api_cache_requests_total Обращения к кэшу ответов.',
+                  '# TYPE api_cache_requests_total counter']
+        for view, counts in cache_stats.snapshot().items():
+            for key, result in (('hits', 'hit'), ('misses', 'miss')):
+                lines.append(
+                    f'api_cache_requests_total{{view="{view}",'
+                    f'result="{result}"}} {counts[key]}')
+        lines += render_pools()
+        lines += render_purge()
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+POOL_METRICS = (
+    ('max_size', 'gauge', 'Размер пула соединений.'),
+    ('in_use', 'gauge', 'Занятые соединения пула.'),
+    ('idle', 'gauge', 'Свободные открытые соединения пула.'),
+    ('max_in_use', 'gauge', 'Наибольшее число занятых соединений.'),
+    ('acquired', 'counter', 'Выдано соединений из пула.'),
+    ('opened', 'counter', 'Открыто новых соединений с БД.'),
+    ('timeouts', 'counter', 'Не дождались свободного соединения.'),
+    ('wait_seconds', 'counter', 'Суммарное ожидание свободного соединения.'),
+)
+
+
+def render_pools():
+    # Насыщение пула: in_use близко к max_size и растущие wait_seconds
+    # и timeouts - пора менять число воркеров или размер пула.
+    pools = {alias: pool.stats() for alias, pool in current_pools().items()}
+    if not pools:
+        return []
+    lines = []
+    for key, kind, help_text in POOL_METRICS:
+        name = f'api_db_pool_{key}' + ('_total' if kind == 'counter'
+                                       else '')
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}']
+        for alias, stats in sorted(pools.items()):
+            lines.append(f'{name}{{alias="{alias}"}} {stats[key]}')
+    return lines
+
+
+# Прогресс purge_deleted: команда пишет его в кэш ответов после каждой
+# пачки, а /metrics отдает из любого воркера (с REDIS_URL).
+PURGE_PROGRESS_KEY = 'api:purge:progress'
+
+
+def render_purge():
+    progress = get_cache().get(PURGE_PROGRESS_KEY)
+    if progress is None:
+        return []
+    lines = [
+        '# HELP api_purge_deleted_rows_total Удалено строк за последний '
+        'запуск purge_deleted.',
+        '# TYPE api_purge_deleted_rows_total counter',
+    ]
+    for model, count in sorted(progress['rows'].items()):
+        lines.append(f'api_purge_deleted_rows_total{{model="{model}"}} '
+                     f'{count}')
+    lines += ['# HELP api_purge_pending_rows Мягко удаленные строки, '
+              'которые ждут purge_deleted.',
+              '# TYPE api_purge_pending_rows gauge']
+    for model, count in sorted(progress['pending'].items()):
+        lines.append(f'api_purge_pending_rows{{model="{model}"}} {count}')
+    lines += ['# HELP api_purge_last_batch_timestamp_seconds Время '
+              'последней пачки purge_deleted.',
+              '# TYPE api_purge_last_batch_timestamp_seconds gauge',
+              f'api_purge_last_batch_timestamp_seconds {progress["updated"]}']
+    return lines
+
+
+def query_origin():
+    # Ближайший к запросу кадр кода проекта (не Django и не библиотек).
+    project_dir = settings.BASE_DIR + os.sep
+    for frame in reversed(traceback.extract_stack()[:-2]):
+        if (frame.filename.startswith(project_dir)
+                and 'site-packages' not in frame.filename
+                and not frame.filename.endswith(os.path.join('api',
+                                                             'metrics.py'))):
+            return f'{frame.filename}:{frame.lineno} in {frame.name}'
+    return 'unknown'
+
+
+class RequestState:
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0
+        self.serializer_time = None
+        self.serializer_depth = 0
+
+    def execute(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - started
+            self.queries += 1
+            self.db_time += duration
+            if (duration * 1000 >= settings.METRICS_SLOW_QUERY_MS
+                    and random.random()
+                    < settings.METRICS_SLOW_QUERY_SAMPLE_RATE):
+                registry.record_slow_query(sql, duration, query_origin())
+
+
+@contextmanager
+def serialization_timer():
+    # Время сериализации попадает в метрики запроса. Вложенные
+    # сериализаторы не замеряются отдельно: их время уже внутри внешнего.
+    state = getattr(_local, 'state', None)
+    if state is None or state.serializer_depth:
+        yield
+        return
+    state.serializer_depth += 1
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        state.serializer_depth -= 1
+        state.serializer_time = ((state.serializer_time or 0)
+                                 + time.perf_counter() - started)
+
+
+class TimedSerializerMixin:
+
+    def to_representation(self, instance):
+        with serialization_timer():
+            return super().to_representation(instance)
+
+
+def route_name(request):
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match else 'unmatched'
+
+
+class MetricsMiddleware:
+    # Время, число и длительность SQL-запросов, время сериализации
+    # и размер ответа по имени маршрута и методу.
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.METRICS_ENABLED:
+            return self.get_response(request)
+        state = RequestState()
+        _local.state = state
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(state.execute))
+                response = self.get_response(request)
+        finally:
+            _local.state = None
+        registry.observe_request(
+            route_name(request), request.method, response.status_code, {
+                'api_request_duration_seconds':
+                    time.perf_counter() - started,
+                'api_db_queries': state.queries,
+                'api_db_duration_seconds': state.db_time,
+                'api_serializer_duration_seconds': state.serializer_time,
+                # У потокового ответа размер заранее неизвестен.
+                'api_response_size_bytes':
+                    None if response.streaming else len(response.content),
+            })
+        return response
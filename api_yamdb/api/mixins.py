@@ -0,0 +1,54 @@
+from django.conf import settings
+from rest_framework.response import Response
+
+
+class ReadOptimizedMixin:
+    # Для list/retrieve заранее подгружает связи, которые читает
+    # сериализатор, чтобы не делать по запросу на каждую строку страницы.
+    # Вьюсет задает read_select_related/read_prefetch_related/read_defer
+    # или переопределяет optimize_queryset.
+    read_actions = ('list', 'retrieve')
+    read_select_related = ()
+    read_prefetch_related = ()
+    read_defer = ()
+
+    def optimize_queryset(self, queryset):
+        if self.read_select_related:
+            queryset = queryset.select_related(*self.read_select_related)
+        if self.read_prefetch_related:
+            queryset = queryset.prefetch_related(*self.read_prefetch_related)
+        if self.read_defer:
+            queryset = queryset.defer(*self.read_defer)
+        return queryset
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.action in self.read_actions:
+            queryset = self.optimize_queryset(queryset)
+        return queryset
+
+
+class SoftDeleteMixin:
+    # DELETE только скрывает строку (soft_delete), а ее и все зависимые
+    # строки удаляет пачками команда purge_deleted, не держа запрос.
+
+    def perform_destroy(self, instance):
+        instance.soft_delete()
+
+
+class CompiledListMixin:
+    # list отдает словари из .values() через compiled_serializer вместо
+    # ModelSerializer: тот же JSON без создания моделей и полей DRF на
+    # каждую строку. API_COMPILED_SERIALIZERS=0 возвращает обычный путь.
+    compiled_serializer = None
+
+    def list(self, request, *args, **kwargs):
+        if (self.compiled_serializer is None
+                or not settings.API_COMPILED_SERIALIZERS):
+            return super().list(request, *args, **kwargs)
+        serializer = self.compiled_serializer
+        rows = serializer.values(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(serializer.serialize(page))
+        return Response(serializer.serialize(rows))
@@ -0,0 +1,87 @@
+import base64
+from collections import OrderedDict
+
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    # Постраничная выдача по курсору (pub_date, id) от новых к старым:
+    # без OFFSET и без COUNT(*), опирается на индекс (<fk>, -pub_date, -id).
+    page_size = PageNumberPagination.page_size
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Неверный курсор.'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        queryset = queryset.order_by('-pub_date', '-id')
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            pub_date, pk = self.decode_cursor(cursor)
+            queryset = queryset.filter(pub_date__lte=pub_date).exclude(
+                pub_date=pub_date, id__gte=pk)
+        page = list(queryset[:self.page_size + 1])
+        self.has_next = len(page) > self.page_size
+        page = page[:self.page_size]
+        self.last = page[-1] if page else None
+        return page
+
+    def decode_cursor(self, cursor):
+        try:
+            value = base64.urlsafe_b64decode(cursor.encode()).decode()
+            pub_date, pk = value.rsplit('|', 1)
+            pub_date = parse_datetime(pub_date)
+            pk = int(pk)
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if pub_date is None:
+            raise NotFound(self.invalid_cursor_message)
+        return pub_date, pk
+
+    def encode_cursor(self, obj):
+        # Страница - модели или словари из .values() (CompiledListMixin).
+        if isinstance(obj, dict):
+            pub_date, pk = obj['pub_date'], obj['pk']
+        else:
+            pub_date, pk = obj.pub_date, obj.pk
+        value = f'{pub_date.isoformat()}|{pk}'
+        return base64.urlsafe_b64encode(value.encode()).decode()
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param,
+                                   self.encode_cursor(self.last))
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('results', data),
+        ]))
+
+
+class PageOrKeysetPagination(BasePagination):
+    # По умолчанию номера страниц, как раньше. ?pagination=cursor
+    # (или уже выданный ?cursor=) включает KeysetPagination.
+    mode_query_param = 'pagination'
+    keyset_mode = 'cursor'
+
+    def __init__(self):
+        self.paginator = PageNumberPagination()
+
+    def use_keyset(self, request):
+        params = request.query_params
+        return (params.get(self.mode_query_param) == self.keyset_mode
+                or KeysetPagination.cursor_query_param in params)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.use_keyset(request):
+            self.paginator = KeysetPagination()
+        return self.paginator.paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        return self.paginator.get_paginated_response(data)
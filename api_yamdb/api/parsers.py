@@ -0,0 +1,15 @@
+from rest_framework import parsers
+from rest_framework.exceptions import ParseError
+
+from .renderers import get_backend
+
+
+class FastJSONParser(parsers.JSONParser):
+    # Разбор тела запроса через API_JSON_BACKEND. Как и JSONParser,
+    # не принимает NaN и Infinity.
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return get_backend().loads(stream.read())
+        except ValueError as exc:
+            raise ParseError(f'JSON parse error - {exc}')
@@ -0,0 +1,99 @@
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework import renderers
+from rest_framework.utils import encoders, json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Как у JSONRenderer DRF: разделители строк JavaScript экранируются.
+LINE_SEPARATORS = ((b'\xe2\x80\xa8', b'\\u2028'),
+                   (b'\xe2\x80\xa9', b'\\u2029'))
+
+_drf_encoder = encoders.JSONEncoder()
+
+
+class StdlibBackend:
+    name = 'json'
+
+    def __init__(self):
+        self.encoder = encoders.JSONEncoder(
+            ensure_ascii=False, allow_nan=False, separators=(',', ':'))
+
+    def dumps(self, data):
+        return self.encoder.encode(data).encode()
+
+    def loads(self, content):
+        # json из DRF не принимает NaN и Infinity.
+        return json.loads(content)
+
+
+class OrjsonBackend:
+    # orjson сразу пишет байты. Даты, Decimal и ленивые строки отдаются
+    # кодировщику DRF, чтобы формат совпадал с JSONRenderer.
+    name = 'orjson'
+
+    def __init__(self):
+        self.option = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+    def dumps(self, data):
+        return orjson.dumps(data, default=_drf_encoder.default,
+                            option=self.option)
+
+    def loads(self, content):
+        return orjson.loads(content)
+
+
+BACKENDS = {'json': StdlibBackend()}
+if orjson is not None:
+    BACKENDS['orjson'] = OrjsonBackend()
+
+
+def get_backend(name=None):
+    name = name or settings.API_JSON_BACKEND
+    if name == 'auto':
+        return BACKENDS.get('orjson', BACKENDS['json'])
+    if name not in BACKENDS:
+        raise ImproperlyConfigured(
+            f'API_JSON_BACKEND={name}: кодировщик не установлен')
+    return BACKENDS[name]
+
+
+def encode(data, backend=None):
+    backend = backend or get_backend()
+    try:
+        content = backend.dumps(data)
+    except (TypeError, ValueError):
+        # Например, целое больше 64 бит для orjson.
+        content = BACKENDS['json'].dumps(data)
+    for separator, escaped in LINE_SEPARATORS:
+        if separator in content:
+            content = content.replace(separator, escaped)
+    return content
+
+
+def uses_fast_json(request):
+    renderer = getattr(request, 'accepted_renderer', None)
+    return (isinstance(renderer, FastJSONRenderer)
+            and renderer.get_indent(request.accepted_media_type, {}) is None)
+
+
+class FastJSONRenderer(renderers.JSONRenderer):
+    # JSON байт в байт как у JSONRenderer, но через API_JSON_BACKEND
+    # (orjson, если установлен). Ответ из кэша уже закодирован: готовые
+    # байты лежат в response.encoded_json (см. api.cache).
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        renderer_context = renderer_context or {}
+        if self.get_indent(accepted_media_type, renderer_context) is not None:
+            return super().render(data, accepted_media_type,
+                                  renderer_context)
+        encoded = getattr(renderer_context.get('response'), 'encoded_json',
+                          None)
+        if encoded is not None:
+            return encoded
+        return encode(data)
@@ -1,12 +1,18 @@
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.shortcuts import get_object_or_404
+from django.db import connections, router, transaction
 from rest_framework import serializers
-from reviews.models import Category, Comment, Genre, Review, Title
+from rest_framework.settings import api_settings
+from reviews.catalog import catalog_imported
+from reviews.models import Category, Comment, Genre, Review, Title, TitleStats
+from reviews.search import update_search_vector
+
+from .metrics import TimedSerializerMixin
 
 User = get_user_model()
 
 
-class SignUpSerializer(serializers.Serializer):
+class SignUpSerializer(TimedSerializerMixin, serializers.Serializer):
     username = serializers.CharField(max_length=150, validators=[])
     email = serializers.EmailField(validators=[])
 
@@ -32,7 +38,7 @@ class SignUpSerializer(serializers.Serializer):
         return instance
 
 
-class UsersSerializer(serializers.ModelSerializer):
+class UsersSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ('username', 'email', 'role', 'bio', 'first_name',
@@ -51,21 +57,21 @@ class UsersSerializer(serializers.ModelSerializer):
             return data
 
 
-class CategorySerializer(serializers.ModelSerializer):
+class CategorySerializer(TimedSerializerMixin, serializers.ModelSerializer):
 
     class Meta:
         fields = ('name', 'slug',)
         model = Category
 
 
-class GenreSerializer(serializers.ModelSerializer):
+class GenreSerializer(TimedSerializerMixin, serializers.ModelSerializer):
 
     class Meta:
         fields = ('name', 'slug',)
         model = Genre
 
 
-class TitleReadSerializer(serializers.ModelSerializer):
+class TitleReadSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     rating = serializers.IntegerField(required=False)
     genre = GenreSerializer(read_only=True, many=True)
     category = CategorySerializer(read_only=True)
@@ -76,8 +82,17 @@ class TitleReadSerializer(serializers.ModelSerializer):
         model = Title
 
 
-class TitleWriteSerializer(serializers.ModelSerializer):
-    rating = serializers.IntegerField(required=False)
+class TitleStatsSerializer(TimedSerializerMixin,
+                           serializers.ModelSerializer):
+    scores = serializers.DictField(source='histogram', read_only=True)
+
+    class Meta:
+        fields = ('title', 'total', 'scores')
+        model = TitleStats
+
+
+class TitleWriteSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    rating = serializers.IntegerField(read_only=True)
     genre = serializers.SlugRelatedField(
         queryset=Genre.objects.all(),
         slug_field='slug',
@@ -95,18 +110,120 @@ class TitleWriteSerializer(serializers.ModelSerializer):
         model = Title
 
 
-class CommentSerializer(serializers.ModelSerializer):
+class TitleBulkListSerializer(serializers.ListSerializer):
+    # Пакетное создание произведений: slug жанров и категорий всех
+    # элементов проверяются одним запросом на модель, вставка идет
+    # через bulk_create. Ошибки возвращаются списком по элементам.
+    not_found = 'Объект с slug={} не существует.'
+    too_many = 'Не больше {} произведений за запрос.'
+
+    def check_size(self, data):
+        # Вся пачка вставляется в одной транзакции, поэтому ее размер
+        # ограничен, чтобы блокировки не держались долго.
+        if len(data) > settings.TITLE_BULK_MAX_ITEMS:
+            raise serializers.ValidationError({
+                api_settings.NON_FIELD_ERRORS_KEY: [
+                    self.too_many.format(settings.TITLE_BULK_MAX_ITEMS)]
+            })
+
+    def to_internal_value(self, data):
+        if not isinstance(data, list) or not data:
+            return super().to_internal_value(data)
+        self.check_size(data)
+        # Элементы проверяются по отдельности, чтобы в ответе были и ошибки
+        # полей, и ненайденные slug всех элементов сразу.
+        items, errors = [], []
+        for item in data:
+            try:
+                items.append(self.child.run_validation(item))
+                errors.append({})
+            except serializers.ValidationError as exc:
+                items.append(None)
+                errors.append(exc.detail)
+        valid = [item for item in items if item is not None]
+        genres = dict(Genre.objects.filter(
+            slug__in={slug for item in valid for slug in item['genre']}
+        ).values_list('slug', 'pk'))
+        categories = dict(Category.objects.filter(
+            slug__in={item['category'] for item in valid}
+        ).values_list('slug', 'pk'))
+        for item, error in zip(items, errors):
+            if item is None:
+                continue
+            missing = [slug for slug in item['genre'] if slug not in genres]
+            if missing:
+                error['genre'] = [self.not_found.format(slug)
+                                  for slug in missing]
+            if item['category'] not in categories:
+                error['category'] = [self.not_found.format(item['category'])]
+            item['genre'] = [genres.get(slug) for slug in item['genre']]
+            item['category'] = categories.get(item['category'])
+        if any(errors):
+            raise serializers.ValidationError(errors)
+        return items
+
+    def create(self, validated_data):
+        batch_size = settings.TITLE_BULK_BATCH_SIZE
+        titles = [Title(name=item['name'], year=item['year'],
+                        description=item.get('description', ''),
+                        category_id=item['category'])
+                  for item in validated_data]
+        connection = connections[router.db_for_write(Title)]
+        # Название признака в Django 3.0 изменилось.
+        returns_ids = getattr(
+            connection.features, 'can_return_rows_from_bulk_insert',
+            getattr(connection.features, 'can_return_ids_from_bulk_insert',
+                    False))
+        with transaction.atomic(using=connection.alias):
+            if returns_ids:
+                Title.objects.bulk_create(titles, batch_size=batch_size)
+            else:
+                # Без RETURNING id новых строк не узнать.
+                for title in titles:
+                    title.save()
+            Title.genre.through.objects.bulk_create(
+                [Title.genre.through(title_id=title.pk, genre_id=genre_id)
+                 for title, item in zip(titles, validated_data)
+                 for genre_id in dict.fromkeys(item['genre'])],
+                batch_size=batch_size)
+            pks = [title.pk for title in titles]
+            if returns_ids:
+                # bulk_create не отправляет post_save.
+                update_search_vector(Title.objects.filter(pk__in=pks))
+                TitleStats.objects.bulk_create(
+                    [TitleStats(title_id=pk) for pk in pks],
+                    batch_size=batch_size)
+            # И m2m_changed для жанров тоже. Сигнал уходит после фиксации,
+            # чтобы сброшенный кэш не наполнился данными без новых строк.
+            transaction.on_commit(
+                lambda: catalog_imported.send(sender=Title, entity='titles',
+                                              title_ids=pks),
+                using=connection.alias)
+        return titles
+
+
+class TitleBulkSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    genre = serializers.ListField(child=serializers.SlugField())
+    category = serializers.SlugField()
+
+    class Meta:
+        fields = ('name', 'year', 'description', 'category', 'genre')
+        model = Title
+        list_serializer_class = TitleBulkListSerializer
+
+
+class CommentSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     author = serializers.SlugRelatedField(
         read_only=True,
         slug_field='username'
     )
 
     class Meta:
-        exclude = ('review',)
+        exclude = ('review', 'search_vector', 'modified')
         model = Comment
 
 
-class ReviewSerializer(serializers.ModelSerializer):
+class ReviewSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     author = serializers.SlugRelatedField(
         read_only=True,
         slug_field='username',
@@ -116,18 +233,25 @@ class ReviewSerializer(serializers.ModelSerializer):
         slug_field='name',
     )
 
-    def validate(self, attrs):
-        is_exist = Review.objects.filter(
-            author=self.context['request'].user,
-            title=get_object_or_404(
-                Title,
-                pk=self.context['view'].kwargs.get('title_id'))).exists()
-        if is_exist and self.context['request'].method == 'POST':
-            raise serializers.ValidationError(
-                'Вы можете написать только один отзыв на произведение'
-            )
-        return attrs
-
     class Meta:
-        fields = '__all__'
+        fields = ('id', 'text', 'author', 'score', 'pub_date', 'title',
+                  'comment_count')
         model = Review
+
+
+class SearchReviewSerializer(ReviewSerializer):
+    title_id = serializers.IntegerField(read_only=True)
+
+    class Meta(ReviewSerializer.Meta):
+        fields = ReviewSerializer.Meta.fields + ('title_id',)
+
+
+class SearchCommentSerializer(CommentSerializer):
+    review_id = serializers.IntegerField(read_only=True)
+    title_id = serializers.IntegerField(source='review.title_id',
+                                        read_only=True)
+
+    class Meta(CommentSerializer.Meta):
+        exclude = None
+        fields = ('id', 'author', 'text', 'pub_date', 'review_id',
+                  'title_id')
@@ -0,0 +1,115 @@
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.signals import request_started
+from django.db import connections, transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from reviews.catalog import catalog_imported
+from reviews.models import Category, Genre, Review, Title
+
+from api_yamdb.db.soft_delete import soft_deleted
+
+from .authentication import user_cache
+from .cache import invalidate
+
+User = get_user_model()
+
+
+def after_commit(func, *args, using=None):
+    # Сброс после фиксации: иначе параллельный GET успеет прочитать
+    # старые данные и закэшировать их под новой версией пространства.
+    transaction.on_commit(lambda: func(*args), using=using)
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_categories(sender, using, **kwargs):
+    after_commit(invalidate, 'categories', 'titles', 'taxonomy', using=using)
+
+
+@receiver(post_save, sender=Genre)
+@receiver(post_delete, sender=Genre)
+def invalidate_genres(sender, using, **kwargs):
+    after_commit(invalidate, 'genres', 'titles', 'taxonomy', using=using)
+
+
+@receiver(post_save, sender=Title)
+@receiver(post_delete, sender=Title)
+@receiver(soft_deleted, sender=Title)
+def invalidate_title(sender, instance, using, **kwargs):
+    after_commit(invalidate, 'titles', f'title:{instance.pk}', using=using)
+
+
+@receiver(m2m_changed, sender=Title.genre.through)
+def invalidate_title_genres(sender, instance, action, reverse, pk_set,
+                            using, **kwargs):
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        namespaces = [f'title:{instance.pk}']
+    else:
+        namespaces = [f'title:{pk}' for pk in pk_set or ()]
+    after_commit(invalidate, 'titles', *namespaces, using=using)
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+@receiver(soft_deleted, sender=Review)
+def invalidate_review_title(sender, instance, signal, using, **kwargs):
+    # В произведении отдается рейтинг, который меняют отзывы. Мягко
+    # удаленный отзыв сбросил кэш еще при удалении.
+    if signal is post_delete and instance.deleted_at is not None:
+        return
+    after_commit(invalidate, 'titles', f'title:{instance.title_id}',
+                 using=using)
+
+
+@receiver(catalog_imported)
+def invalidate_imported(sender, entity, title_ids, **kwargs):
+    namespaces = {'categories': ('categories', 'taxonomy'),
+                  'genres': ('genres', 'taxonomy')}.get(entity, ())
+    after_commit(invalidate, *namespaces, 'titles',
+                 *(f'title:{pk}' for pk in title_ids))
+
+
+@receiver(soft_deleted, sender=User)
+def invalidate_author_titles(sender, instance, using, **kwargs):
+    # Отзывы удаленного автора сразу вычитаются из рейтинга.
+    title_ids = Review.all_objects.filter(author=instance).values_list(
+        'title_id', flat=True)
+    after_commit(invalidate, 'titles',
+                 *(f'title:{pk}' for pk in title_ids), using=using)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+@receiver(soft_deleted, sender=User)
+def invalidate_user_snapshot(sender, instance, using, **kwargs):
+    after_commit(user_cache.invalidate, instance.pk, using=using)
+
+
+@receiver(connection_created)
+def remember_connection_check(sender, connection, **kwargs):
+    connection.health_checked_at = time.monotonic()
+
+
+@receiver(request_started)
+def check_persistent_connections(sender, **kwargs):
+    # Проверка соединений, оставшихся от прошлого запроса (CONN_MAX_AGE);
+    # в Django 4.1 это делает CONN_HEALTH_CHECKS. Не чаще раза в
+    # DB_CONN_HEALTH_CHECK_IDLE секунд на соединение, а не на каждый
+    # запрос.
+    if not settings.DB_CONN_HEALTH_CHECKS:
+        return
+    now = time.monotonic()
+    for connection in connections.all():
+        if (connection.connection is None or connection.in_atomic_block
+                or now - getattr(connection, 'health_checked_at', 0)
+                < settings.DB_CONN_HEALTH_CHECK_IDLE):
+            continue
+        connection.health_checked_at = now
+        if not connection.is_usable():
+            connection.close()
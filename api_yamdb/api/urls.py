@@ -2,8 +2,8 @@ from django.urls import include, path
 from rest_framework import routers
 
 from .views import (CategoriesViewSet, CommentViewSet, GenresViewSet,
-                    ReviewViewSet, TitlesViewSet, UsersViewSet, obtain_token,
-                    signup)
+                    ReviewViewSet, TitlesViewSet, UsersViewSet,
+                    cache_statistics, export, obtain_token, search, signup)
 
 app_name = "api"
 v1_router = routers.DefaultRouter()
@@ -24,5 +24,8 @@ v1_router.register(
 urlpatterns = [
     path("auth/token/", obtain_token),
     path("auth/signup/", signup),
+    path("search/", search),
+    path("cache/stats/", cache_statistics),
+    path("export/<str:entity>.ndjson", export),
     path("", include(v1_router.urls)),
 ]
@@ -1,24 +1,39 @@
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.auth.tokens import default_token_generator
-from django.core.mail import send_mail
-from django.db.models import Avg, SmallIntegerField
+from django.db import IntegrityError, transaction
+from django.http import HttpResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from django_filters.rest_framework import DjangoFilterBackend
-from iniconfig import ParseError
+from outbox.models import OutgoingEmail
 from rest_framework import filters, mixins, permissions, status, viewsets
 from rest_framework.decorators import action, api_view, permission_classes
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
-from rest_framework_simplejwt.tokens import RefreshToken
-from reviews.models import Category, Genre, Review, Title
+from rest_framework.settings import api_settings
+from reviews.models import Category, Comment, Genre, Review, Title, TitleStats
+from reviews.search import search as search_queryset
 
-from .filters import TitleFilter
+from .authentication import issue_token
+from .cache import CachedListMixin, CachedRetrieveMixin
+from .cache import stats as cache_stats
+from .compiled import CompiledSerializer
+from .conditional import ConditionalGetMixin
+from .export import EXPORTS, ndjson_stream
+from .filters import ReviewOrderingFilter, TitleFilter, TitleOrderingFilter
+from .metrics import registry as metrics_registry
+from .mixins import CompiledListMixin, ReadOptimizedMixin, SoftDeleteMixin
+from .pagination import PageOrKeysetPagination
 from .permissions import (IsAdminOrSuperuser, IsAdminUserOrReadOnly,
                           ReviewCommentPermission, UsersPermission)
 from .serializers import (CategorySerializer, CommentSerializer,
-                          GenreSerializer, ReviewSerializer, SignUpSerializer,
-                          TitleReadSerializer, TitleWriteSerializer,
-                          UsersSerializer)
+                          GenreSerializer, ReviewSerializer,
+                          SearchCommentSerializer, SearchReviewSerializer,
+                          SignUpSerializer, TitleBulkSerializer,
+                          TitleReadSerializer, TitleStatsSerializer,
+                          TitleWriteSerializer, UsersSerializer)
 
 User = get_user_model()
 
@@ -28,14 +43,17 @@ User = get_user_model()
 def signup(request):
     serializer = SignUpSerializer(data=request.data)
     if serializer.is_valid():
-        serializer.save()
-        user = get_object_or_404(
-            User, username=serializer.validated_data.get('username'))
-        token = default_token_generator.make_token(user=user)
-        serializer.save(confirmation_code=token)
-        send_mail(subject='Confirmation code', message=token,
-                  from_email='YaMBD',
-                  recipient_list=(serializer.validated_data.get('email'),))
+        # Код подтверждения не хранится: default_token_generator
+        # проверяет его по данным пользователя и сроку действия.
+        # Письмо ставится в очередь в той же транзакции, что и пользователь,
+        # и отправляется воркером send_queued_mail.
+        with transaction.atomic():
+            user = serializer.save()
+            OutgoingEmail.objects.enqueue(
+                subject='Confirmation code',
+                message=default_token_generator.make_token(user),
+                from_email='YaMBD',
+                recipient_list=(user.email,))
         return Response(serializer.data, status=status.HTTP_200_OK)
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -46,15 +64,99 @@ def obtain_token(request):
     if 'username' in request.data and 'confirmation_code' in request.data:
         username = request.data.get('username')
         confirmation_code = request.data.get('confirmation_code')
-        user = get_object_or_404(User, username=username)
-        refresh = RefreshToken.for_user(user)
+        user = get_object_or_404(User, username=username,
+                                 deleted_at__isnull=True)
         if default_token_generator.check_token(user, confirmation_code):
-            return Response(status=200, data=str(refresh.access_token))
+            return Response(status=200, data=str(issue_token(user)))
     return Response(status=400)
 
 
-class UsersViewSet(viewsets.ModelViewSet):
-    queryset = User.objects.all()
+SEARCH_LIMIT = 10
+MAX_SEARCH_LIMIT = 50
+SEARCH_TYPES = {
+    'titles': (lambda: Title.objects.for_read(), TitleReadSerializer),
+    'reviews': (
+        lambda: Review.objects.visible().select_related('author', 'title')
+        .defer('search_vector', 'title__search_vector'),
+        SearchReviewSerializer),
+    'comments': (
+        lambda: Comment.objects.visible().select_related('author', 'review')
+        .defer('search_vector', 'review__search_vector'),
+        SearchCommentSerializer),
+}
+
+
+@api_view(['GET'])
+@permission_classes([permissions.AllowAny])
+def search(request):
+    query = request.query_params.get('q', '').strip()
+    if not query:
+        return Response({'q': ['Обязательный параметр.']},
+                        status=status.HTTP_400_BAD_REQUEST)
+    types = request.query_params.get('type')
+    types = types.split(',') if types else list(SEARCH_TYPES)
+    unknown = set(types) - set(SEARCH_TYPES)
+    if unknown:
+        return Response({'type': [f'Неизвестный тип: {", ".join(unknown)}']},
+                        status=status.HTTP_400_BAD_REQUEST)
+    try:
+        limit = int(request.query_params.get('limit', SEARCH_LIMIT))
+    except ValueError:
+        limit = SEARCH_LIMIT
+    limit = max(1, min(limit, MAX_SEARCH_LIMIT))
+    data = {}
+    for search_type in types:
+        get_queryset, serializer_class = SEARCH_TYPES[search_type]
+        found = search_queryset(get_queryset(), query)[:limit]
+        data[search_type] = serializer_class(found, many=True).data
+    return Response(data)
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminOrSuperuser])
+def cache_statistics(request):
+    return Response(cache_stats.snapshot())
+
+
+def metrics(request):
+    # Обычная view Django, без аутентификации DRF: сборщик Prometheus
+    # ходит сюда часто.
+    token = settings.METRICS_TOKEN
+    if token and request.META.get('HTTP_AUTHORIZATION') != f'Bearer {token}':
+        return HttpResponse(status=status.HTTP_403_FORBIDDEN)
+    return HttpResponse(metrics_registry.render(),
+                        content_type='text/plain; version=0.0.4')
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminOrSuperuser])
+def export(request, entity):
+    # Вся таблица одним потоковым ответом вместо постраничного обхода.
+    # since - выгрузить только измененное с этого момента; значение для
+    # следующего запроса приходит в заголовке X-Export-Started.
+    if entity not in EXPORTS:
+        return Response(status=status.HTTP_404_NOT_FOUND)
+    since = request.query_params.get('since')
+    if since is not None:
+        try:
+            since = parse_datetime(since)
+        except ValueError:
+            since = None
+        if since is None:
+            return Response({'since': ['Ожидается дата и время ISO 8601.']},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if timezone.is_naive(since):
+            since = timezone.make_aware(since, timezone.utc)
+    started = timezone.now()
+    response = StreamingHttpResponse(
+        ndjson_stream(entity, since),
+        content_type='application/x-ndjson; charset=utf-8')
+    response['X-Export-Started'] = started.isoformat()
+    return response
+
+
+class UsersViewSet(SoftDeleteMixin, viewsets.ModelViewSet):
+    queryset = User.objects.filter(deleted_at__isnull=True)
     serializer_class = UsersSerializer
     filter_backends = (filters.SearchFilter,)
     search_fields = ('username',)
@@ -75,8 +177,11 @@ class UsersViewSet(viewsets.ModelViewSet):
     )
     def get_object(self):
         if self.kwargs.get('username') == 'me':
-            self.check_object_permissions(self.request, self.request.user)
-            return self.request.user
+            # request.user - снимок из кэша аутентификации, профилю
+            # нужны все поля.
+            user = User.objects.get(pk=self.request.user.pk)
+            self.check_object_permissions(self.request, user)
+            return user
         return super(UsersViewSet, self).get_object()
 
     def partial_update(self, request, *args, **kwargs):
@@ -99,18 +204,59 @@ class UsersViewSet(viewsets.ModelViewSet):
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class TitlesViewSet(viewsets.ModelViewSet):
-    queryset = Title.objects.all().annotate(rating=Avg("reviews__score",
-                                            output_field=SmallIntegerField()))
-    filter_backends = (DjangoFilterBackend,)
+class TitlesViewSet(CachedListMixin, CachedRetrieveMixin, ConditionalGetMixin,
+                    CompiledListMixin, ReadOptimizedMixin, SoftDeleteMixin,
+                    viewsets.ModelViewSet):
+    queryset = Title.objects.all()
+    compiled_serializer = CompiledSerializer(TitleReadSerializer)
+    filter_backends = (DjangoFilterBackend, TitleOrderingFilter)
     filterset_class = TitleFilter
     permission_classes = (IsAdminUserOrReadOnly,)
+    lookup_value_regex = '[0-9]+'
+    conditional_deletions = True
+
+    def optimize_queryset(self, queryset):
+        return queryset.for_read()
+
+    def get_cache_namespaces(self):
+        if self.action == 'retrieve':
+            return (f'title:{self.kwargs["pk"]}', 'taxonomy')
+        if self.action == 'stats':
+            return (f'title:{self.kwargs["pk"]}',)
+        return ('titles',)
 
     def get_serializer_class(self):
         if self.action in ('list', 'retrieve'):
             return TitleReadSerializer
+        if self.action == 'bulk':
+            return TitleBulkSerializer
         return TitleWriteSerializer
 
+    @action(detail=False, methods=['post'], url_path='bulk')
+    def bulk(self, request):
+        serializer = self.get_serializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+        titles = serializer.save()
+        created = (Title.objects.for_read()
+                   .filter(pk__in=[title.pk for title in titles])
+                   .order_by('pk'))
+        return Response(TitleReadSerializer(created, many=True).data,
+                        status=status.HTTP_201_CREATED)
+
+    @action(detail=True, methods=['get'])
+    def stats(self, request, pk=None):
+        return self.cached_response(self.get_stats, request, pk=pk)
+
+    def get_stats(self, request, pk=None):
+        # Распределение оценок одной строкой TitleStats. Строки нет
+        # только у произведения без отзывов.
+        stats = TitleStats.objects.filter(
+            title_id=pk, title__deleted_at__isnull=True).first()
+        if stats is None:
+            get_object_or_404(Title.objects.only('pk'), pk=pk)
+            stats = TitleStats(title_id=pk)
+        return Response(TitleStatsSerializer(stats).data)
+
 
 class CreateRetrieveViewSet(mixins.CreateModelMixin, mixins.ListModelMixin,
                             mixins.DestroyModelMixin, viewsets.GenericViewSet):
@@ -118,7 +264,8 @@ class CreateRetrieveViewSet(mixins.CreateModelMixin, mixins.ListModelMixin,
     pass
 
 
-class CategoriesViewSet(CreateRetrieveViewSet):
+class CategoriesViewSet(CachedListMixin, CreateRetrieveViewSet):
+    cache_namespaces = ('categories',)
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
     filter_backends = (DjangoFilterBackend, filters.SearchFilter)
@@ -127,7 +274,8 @@ class CategoriesViewSet(CreateRetrieveViewSet):
     permission_classes = (IsAdminUserOrReadOnly,)
 
 
-class GenresViewSet(CreateRetrieveViewSet):
+class GenresViewSet(CachedListMixin, CreateRetrieveViewSet):
+    cache_namespaces = ('genres',)
     queryset = Genre.objects.all()
     serializer_class = GenreSerializer
     filter_backends = (DjangoFilterBackend, filters.SearchFilter)
@@ -136,37 +284,75 @@ class GenresViewSet(CreateRetrieveViewSet):
     permission_classes = (IsAdminUserOrReadOnly,)
 
 
-class ReviewViewSet(viewsets.ModelViewSet):
+class ReviewViewSet(ConditionalGetMixin, CompiledListMixin, ReadOptimizedMixin,
+                    SoftDeleteMixin, viewsets.ModelViewSet):
     serializer_class = ReviewSerializer
+    compiled_serializer = CompiledSerializer(ReviewSerializer)
     permission_classes = [
         ReviewCommentPermission,
         permissions.IsAuthenticatedOrReadOnly
     ]
-    pagination_class = PageNumberPagination
+    pagination_class = PageOrKeysetPagination
+    filter_backends = (ReviewOrderingFilter,)
+    read_select_related = ('author', 'title')
+    read_defer = ('search_vector', 'title__search_vector')
+    # Создание и удаление отзыва сдвигают Title.modified вместе
+    # с рейтингом, так что COUNT(*) по отзывам не нужен.
+    conditional_related = ('title__modified',)
+    conditional_count = False
+
+    def get_title(self):
+        # Произведение ищется один раз за запрос.
+        if not hasattr(self, '_title'):
+            self._title = get_object_or_404(
+                Title.objects.defer('search_vector'),
+                pk=self.kwargs.get('title_id'))
+        return self._title
 
     def get_queryset(self, *args, **kwargs):
-        title = get_object_or_404(Title, pk=self.kwargs.get('title_id'))
-        return title.reviews.all()
+        return self.get_title().reviews.filter(author__deleted_at__isnull=True)
 
     def perform_create(self, serializer):
-        title = get_object_or_404(Title, pk=self.kwargs.get('title_id'))
-        if Review.objects.filter(title=title,
-                                 author=self.request.user).exists():
-            raise ParseError
-        serializer.save(author=self.request.user, title=title)
+        # Повторный отзыв ловит ограничение unique_author_title в БД,
+        # без предварительного SELECT ... EXISTS.
+        try:
+            with transaction.atomic():
+                serializer.save(author=self.request.user,
+                                title=self.get_title())
+        except IntegrityError:
+            # Нарушение внешнего ключа (произведение удалили параллельно)
+            # - не повторный отзыв: такую ошибку не подменяем.
+            if not Review.objects.filter(author=self.request.user,
+                                         title=self.get_title()).exists():
+                raise
+            raise ValidationError({api_settings.NON_FIELD_ERRORS_KEY: [
+                'Вы можете написать только один отзыв на произведение']})
 
 
-class CommentViewSet(viewsets.ModelViewSet):
+class CommentViewSet(ConditionalGetMixin, CompiledListMixin,
+                     ReadOptimizedMixin, SoftDeleteMixin,
+                     viewsets.ModelViewSet):
     serializer_class = CommentSerializer
+    compiled_serializer = CompiledSerializer(CommentSerializer)
     permission_classes = (ReviewCommentPermission,)
-    pagination_class = PageNumberPagination
+    pagination_class = PageOrKeysetPagination
+    read_select_related = ('author',)
+    read_defer = ('search_vector',)
+    # Создание и удаление комментария сдвигают Review.modified вместе
+    # со счетчиком: удаление тоже меняет Last-Modified.
+    conditional_related = ('review__modified',)
+
+    def get_review(self):
+        if not hasattr(self, '_review'):
+            self._review = get_object_or_404(
+                Review.objects.visible().defer('search_vector'),
+                pk=self.kwargs.get('review_id'),
+                title_id=self.kwargs.get('title_id'))
+        return self._review
 
     def get_queryset(self, *args, **kwargs):
-        review = get_object_or_404(
-            Review, pk=self.kwargs.get('review_id'))
-        return review.comments.all()
+        return self.get_review().comments.filter(
+            author__deleted_at__isnull=True)
 
     def perform_create(self, serializer):
-        review = get_object_or_404(
-            Review, pk=self.kwargs.get('review_id'))
-        serializer.save(author=self.request.user, review=review)
+        serializer.save(author=self.request.user, review=self.get_review())
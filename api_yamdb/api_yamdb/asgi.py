@@ -0,0 +1,192 @@
+import asyncio
+import io
+import logging
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from functools import partial
+
+from django.conf import settings
+from django.core.wsgi import get_wsgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'api_yamdb.settings')
+
+logger = logging.getLogger(__name__)
+
+
+class ClientDisconnectedError(Exception):
+    pass
+
+
+def build_environ(scope, body):
+    # Окружение WSGI (PEP 3333) из scope ASGI: строки - в latin-1.
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode().decode('latin1'),
+        'PATH_INFO': scope['path'].encode().decode('latin1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin1'),
+        'SERVER_NAME': str(server[0]),
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': 'HTTP/' + scope.get('http_version', '1.1'),
+        'REMOTE_ADDR': client[0],
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope.get('headers', ()):
+        name = name.decode('latin1').upper().replace('-', '_')
+        if name not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            name = 'HTTP_' + name
+        value = value.decode('latin1')
+        environ[name] = (f'{environ[name]},{value}' if name in environ
+                         else value)
+    # Тело уже прочитано целиком, в том числе при chunked-загрузке.
+    environ['CONTENT_LENGTH'] = str(len(body))
+    return environ
+
+
+class ThreadedASGIHandler:
+    # ASGI поверх WSGI-приложения Django 2.2, у которого нет своего ASGI.
+    # Цикл событий держит соединения, читает тело запроса и отдает ответ,
+    # поэтому медленные клиенты и keep-alive не занимают потоки. Django
+    # работает в пуле из max_workers потоков: на каждый поток - свое
+    # соединение с БД, как у воркера gthread.
+
+    def __init__(self, wsgi_application, max_workers):
+        self.wsgi_application = wsgi_application
+        self.executor = ThreadPoolExecutor(max_workers,
+                                           thread_name_prefix='asgi')
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            raise ValueError(f'Неподдерживаемый тип ASGI: {scope["type"]}')
+        body = await self.read_body(receive)
+        if body is None:
+            return
+        environ = build_environ(scope, body)
+        loop = asyncio.get_event_loop()
+        queue = asyncio.Queue(maxsize=8)
+        disconnected = threading.Event()
+        task = loop.run_in_executor(
+            self.executor, self.run, environ, loop, queue, disconnected)
+        try:
+            while True:
+                message = await queue.get()
+                if message is None:
+                    break
+                await send(message)
+        except BaseException:
+            disconnected.set()
+            raise
+        finally:
+            await task
+
+    async def read_body(self, receive):
+        chunks = []
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return None
+            chunks.append(message.get('body', b''))
+            if not message.get('more_body', False):
+                return b''.join(chunks)
+
+    def run(self, environ, loop, queue, disconnected):
+        # Весь запрос, включая close() ответа с сигналом request_finished,
+        # идет в одном потоке: соединения с БД привязаны к потоку. Что бы
+        # ни случилось, в очередь уходит None, иначе __call__ ждал бы
+        # ответа вечно.
+        put = partial(self.put, loop=loop, queue=queue,
+                      disconnected=disconnected)
+        started = {}
+
+        def start_response(status, headers, exc_info=None):
+            started['status'] = int(status.split(' ', 1)[0])
+            started['headers'] = [
+                (name.lower().encode('latin1'), value.encode('latin1'))
+                for name, value in headers]
+
+        try:
+            self.respond(environ, start_response, started, put)
+        except ClientDisconnectedError:
+            pass
+        except Exception:
+            logger.exception('Ошибка обработки %s %s',
+                             environ['REQUEST_METHOD'], environ['PATH_INFO'])
+            if not started.get('sent'):
+                self.send_error(put)
+        finally:
+            try:
+                put(None)
+            except ClientDisconnectedError:
+                pass
+
+    def respond(self, environ, start_response, started, put):
+        response = self.wsgi_application(environ, start_response)
+        closed = False
+        try:
+            if getattr(response, 'streaming', False):
+                chunks = response
+            else:
+                # Обычный ответ собирается целиком, и поток свободен еще
+                # до того, как клиент его дочитает.
+                chunks = [b''.join(response)]
+                closed = True
+                response.close()
+            put({'type': 'http.response.start', **started})
+            started['sent'] = True
+            for chunk in chunks:
+                if chunk:
+                    put({'type': 'http.response.body', 'body': chunk,
+                         'more_body': True})
+            put({'type': 'http.response.body'})
+        finally:
+            if not closed:
+                response.close()
+
+    def send_error(self, put):
+        body = b'Internal Server Error'
+        try:
+            put({'type': 'http.response.start', 'status': 500,
+                 'headers': [(b'content-type', b'text/plain'),
+                             (b'content-length', str(len(body)).encode())]})
+            put({'type': 'http.response.body', 'body': body})
+        except ClientDisconnectedError:
+            pass
+
+    def put(self, message, loop, queue, disconnected):
+        # Очередь ограничена: поток ждет медленного клиента, но не
+        # бесконечно, если тот отключился.
+        future = asyncio.run_coroutine_threadsafe(queue.put(message), loop)
+        while True:
+            try:
+                return future.result(timeout=1)
+            except FutureTimeoutError:
+                if disconnected.is_set():
+                    future.cancel()
+                    raise ClientDisconnectedError
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+
+application = ThreadedASGIHandler(get_wsgi_application(),
+                                  settings.ASGI_THREADS)
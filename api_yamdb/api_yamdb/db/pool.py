@@ -0,0 +1,132 @@
+import os
+import threading
+import time
+
+
+class PoolTimeoutError(Exception):
+    pass
+
+
+class ConnectionPool:
+    # Пул соединений одного процесса. Не больше max_size соединений
+    # одновременно: остальные потоки ждут свободного до timeout секунд.
+    # Свободные соединения не закрываются, а переиспользуются (LIFO).
+
+    def __init__(self, connect, reset, max_size, timeout, check=None,
+                 check_after=0):
+        self.connect = connect
+        # reset(connection) откатывает незавершенную транзакцию и
+        # возвращает False, если соединение больше нельзя использовать.
+        self.reset = reset
+        # check(connection) - запрос к БД, поэтому только для соединений,
+        # простоявших в пуле не меньше check_after секунд.
+        self.check = check
+        self.check_after = check_after
+        self.max_size = max_size
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._lock = threading.Lock()
+        self._idle = []
+        self.in_use = 0
+        self.max_in_use = 0
+        self.acquired = 0
+        self.opened = 0
+        self.timeouts = 0
+        self.wait_seconds = 0.0
+
+    def acquire(self):
+        started = time.perf_counter()
+        if not self._slots.acquire(timeout=self.timeout):
+            with self._lock:
+                self.timeouts += 1
+            raise PoolTimeoutError(
+                f'Все {self.max_size} соединений пула заняты дольше '
+                f'{self.timeout} с')
+        waited = time.perf_counter() - started
+        with self._lock:
+            connection, idle_since = (
+                self._idle.pop() if self._idle else (None, None))
+        try:
+            if connection is not None and not self.usable(connection,
+                                                          idle_since):
+                connection.close()
+                connection = None
+            if connection is None or connection.closed:
+                connection = self.connect()
+                with self._lock:
+                    self.opened += 1
+        except BaseException:
+            self._slots.release()
+            raise
+        with self._lock:
+            self.in_use += 1
+            self.max_in_use = max(self.max_in_use, self.in_use)
+            self.acquired += 1
+            self.wait_seconds += waited
+        return connection
+
+    def usable(self, connection, idle_since):
+        if self.check is None or connection.closed:
+            return True
+        if time.monotonic() - idle_since < self.check_after:
+            return True
+        try:
+            return self.check(connection)
+        except Exception:
+            return False
+
+    def release(self, connection, discard=False):
+        try:
+            if not discard and not connection.closed:
+                try:
+                    discard = not self.reset(connection)
+                except Exception:
+                    discard = True
+            if discard or connection.closed:
+                try:
+                    connection.close()
+                except Exception:
+                    pass
+            else:
+                with self._lock:
+                    self._idle.append((connection, time.monotonic()))
+        finally:
+            with self._lock:
+                self.in_use -= 1
+            self._slots.release()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'max_size': self.max_size,
+                'in_use': self.in_use,
+                'idle': len(self._idle),
+                'max_in_use': self.max_in_use,
+                'acquired': self.acquired,
+                'opened': self.opened,
+                'timeouts': self.timeouts,
+                'wait_seconds': self.wait_seconds,
+            }
+
+
+# Пулы по (alias, pid): после fork воркер gunicorn не должен
+# пользоваться соединениями мастера.
+pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(alias, connect, reset, max_size, timeout, check=None,
+             check_after=0):
+    key = (alias, os.getpid())
+    with _pools_lock:
+        if key not in pools:
+            pools[key] = ConnectionPool(connect, reset, max_size, timeout,
+                                        check, check_after)
+        return pools[key]
+
+
+def current_pools():
+    pid = os.getpid()
+    with _pools_lock:
+        return {alias: pool for (alias, pool_pid), pool in pools.items()
+                if pool_pid == pid}
@@ -0,0 +1,67 @@
+from django.conf import settings
+from django.db.backends.postgresql import base
+from django.db.utils import OperationalError
+from psycopg2 import extensions
+
+from ..pool import PoolTimeoutError, get_pool
+
+
+def reset_connection(connection):
+    status = connection.get_transaction_status()
+    if status == extensions.TRANSACTION_STATUS_UNKNOWN:
+        return False
+    if status != extensions.TRANSACTION_STATUS_IDLE:
+        connection.rollback()
+    return True
+
+
+def check_connection(connection):
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+    except base.Database.Error:
+        # БД закрыла простаивавшее соединение - пул возьмет новое.
+        return False
+    return True
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    # PostgreSQL с пулом соединений процесса для воркеров с потоками
+    # (gthread) или гринлетами. Django закрывает соединение в конце
+    # запроса (CONN_MAX_AGE = 0), а close() возвращает его в пул.
+    # Размер и ожидание задаются ключом POOL в DATABASES:
+    # {'MAX_SIZE': 4, 'TIMEOUT': 10}.
+
+    def get_pool(self, conn_params=None):
+        options = self.settings_dict.get('POOL', {})
+        conn_params = conn_params or self.get_connection_params()
+        checks = getattr(settings, 'DB_CONN_HEALTH_CHECKS', False)
+        return get_pool(
+            self.alias, lambda: base.Database.connect(**conn_params),
+            reset_connection, options.get('MAX_SIZE', 4),
+            options.get('TIMEOUT', 10),
+            check=check_connection if checks else None,
+            check_after=getattr(settings, 'DB_CONN_HEALTH_CHECK_IDLE', 0))
+
+    def get_new_connection(self, conn_params):
+        pool = self.get_pool(conn_params)
+        connection = self.acquire(pool)
+        options = self.settings_dict['OPTIONS']
+        self.isolation_level = options.get('isolation_level',
+                                           connection.isolation_level)
+        if self.isolation_level != connection.isolation_level:
+            connection.set_session(isolation_level=self.isolation_level)
+        return connection
+
+    def acquire(self, pool):
+        try:
+            return pool.acquire()
+        except PoolTimeoutError as error:
+            raise OperationalError(str(error)) from error
+
+    def _close(self):
+        if self.connection is None:
+            return
+        broken = self.errors_occurred and not self.is_usable()
+        with self.wrap_database_errors:
+            self.get_pool().release(self.connection, discard=broken)
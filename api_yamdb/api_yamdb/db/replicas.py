@@ -0,0 +1,151 @@
+import hashlib
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, connections
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+WRITE_STATEMENTS = ('INSERT', 'UPDATE', 'DELETE')
+
+# Отставание реплики PostgreSQL в секундах; 0, если все полученные
+# изменения уже применены (иначе простаивающий primary выглядел бы
+# как отставание).
+LAG_SQL = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery()
+             OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn()
+        THEN 0
+        ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+    END
+"""
+
+_state = threading.local()
+
+
+def replicas_allowed():
+    return (getattr(_state, 'replicas', False)
+            and not getattr(_state, 'primary', False))
+
+
+@contextmanager
+def use_primary():
+    # Чтение внутри блока идет на primary, метка записи не меняется.
+    replicas = getattr(_state, 'replicas', False)
+    _state.replicas = False
+    try:
+        yield
+    finally:
+        _state.replicas = replicas
+
+
+def replica_lag(alias):
+    connection = connections[alias]
+    if connection.vendor != 'postgresql':
+        return 0.0
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(LAG_SQL)
+            return float(cursor.fetchone()[0] or 0)
+    except Exception:
+        # Недоступная реплика не выбирается до следующей проверки.
+        return float('inf')
+
+
+class ReplicaSelector:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counter = itertools.count()
+        self._lags = {}
+        self._checked = None
+
+    def choose(self, aliases):
+        if settings.DB_REPLICA_SELECTION == 'least_lag':
+            return self.least_lagging(aliases)
+        return aliases[next(self._counter) % len(aliases)]
+
+    def least_lagging(self, aliases):
+        now = time.monotonic()
+        with self._lock:
+            if (self._checked is None or now - self._checked
+                    >= settings.DB_REPLICA_LAG_CHECK_INTERVAL):
+                self._lags = {alias: replica_lag(alias) for alias in aliases}
+                self._checked = now
+            lags = self._lags
+        candidates = [(lag, alias) for alias, lag in lags.items()
+                      if lag <= settings.DB_REPLICA_MAX_LAG]
+        return min(candidates)[1] if candidates else None
+
+
+selector = ReplicaSelector()
+
+
+def track_writes(execute, sql, params, many, context):
+    # Метку ставит выполненная запись, а не обращение к роутеру:
+    # db_for_write вызывается и там, где ничего не пишется.
+    result = execute(sql, params, many, context)
+    if sql.lstrip().upper().startswith(WRITE_STATEMENTS):
+        _state.primary = True
+    return result
+
+
+class ReplicaRouter:
+    # Чтение в безопасных запросах идет на реплики DB_REPLICAS, все
+    # остальное - на primary: запись, чтение внутри транзакции, чтение
+    # после записи в том же запросе, команды и воркеры вне запросов.
+
+    def db_for_read(self, model, **hints):
+        if (not replicas_allowed()
+                or connections[DEFAULT_DB_ALIAS].in_atomic_block):
+            return DEFAULT_DB_ALIAS
+        return selector.choose(settings.DB_REPLICAS) or DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+def pin_key(request):
+    # Клиент определяется по токену, а без него - по адресу. За nginx
+    # REMOTE_ADDR у всех один, поэтому берется X-Real-IP: nginx
+    # перезаписывает его адресом клиента.
+    client = (request.META.get('HTTP_AUTHORIZATION')
+              or request.META.get('HTTP_X_REAL_IP')
+              or request.META.get('REMOTE_ADDR', ''))
+    return 'db:primary:' + hashlib.md5(client.encode()).hexdigest()
+
+
+class ReplicaMiddleware:
+    # После записи клиент DB_READ_YOUR_WRITES_SECONDS секунд читает
+    # с primary и видит свои изменения, даже если реплики отстают.
+    # Метка хранится в кэше: с REDIS_URL ее видят все воркеры.
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        cache = caches[settings.API_CACHE_ALIAS]
+        key = pin_key(request)
+        safe = request.method in SAFE_METHODS
+        _state.replicas = safe and not cache.get(key)
+        _state.primary = False
+        try:
+            with connections[DEFAULT_DB_ALIAS].execute_wrapper(track_writes):
+                response = self.get_response(request)
+            wrote = _state.primary
+        finally:
+            _state.replicas = _state.primary = False
+        # Отклоненная запись (4xx, 5xx) ничего не изменила.
+        if wrote and 200 <= response.status_code < 300:
+            cache.set(key, True, settings.DB_READ_YOUR_WRITES_SECONDS)
+        return response
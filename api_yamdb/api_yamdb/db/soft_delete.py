@@ -0,0 +1,36 @@
+from django.db import models, router, transaction
+from django.dispatch import Signal
+from django.utils import timezone
+
+# Отправляется в транзакции мягкого удаления: счетчики и кэши меняются
+# так же, как при post_delete. Саму строку и все, что от нее зависит,
+# позже удаляет пачками команда purge_deleted.
+soft_deleted = Signal(providing_args=['instance', 'using'])
+
+
+class AliveManager(models.Manager):
+    # Менеджер по умолчанию: мягко удаленных строк не видят ни он, ни
+    # связанные менеджеры (title.reviews). Каскад Django идет через
+    # _base_manager и удаляет все строки.
+
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
+
+
+class SoftDeleteModel(models.Model):
+    deleted_at = models.DateTimeField(blank=True, null=True, editable=False)
+
+    class Meta:
+        abstract = True
+
+    def soft_delete(self, using=None):
+        # Одним UPDATE вместо каскада по всем зависимым строкам.
+        using = using or router.db_for_write(type(self), instance=self)
+        self.deleted_at = timezone.now()
+        with transaction.atomic(using=using, savepoint=False):
+            type(self)._base_manager.using(using).filter(pk=self.pk).update(
+                **self.get_soft_delete_values())
+            soft_deleted.send(sender=type(self), instance=self, using=using)
+
+    def get_soft_delete_values(self):
+        return {'deleted_at': self.deleted_at}
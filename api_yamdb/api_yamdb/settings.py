@@ -21,18 +21,21 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'django_extensions',
     'rest_framework',
     'django_filters',
     'rest_framework_simplejwt',
     'users',
-    'reviews',
-    'api',
+    'reviews.apps.ReviewsConfig',
+    'outbox',
+    'api.apps.ApiConfig',
 ]
 
 AUTH_USER_MODEL = 'users.User'
 
 MIDDLEWARE = [
+    'api.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -64,6 +67,10 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'api_yamdb.wsgi.application'
 
+# Потоки для Django в режиме ASGI (api_yamdb.asgi:application под uvicorn):
+# соединения держит цикл событий, а потоков и соединений с БД - столько.
+ASGI_THREADS = int(os.getenv('ASGI_THREADS', '8'))
+
 DATABASES = {
     'default': {
         'ENGINE': os.getenv('DB_ENGINE', default='django.db.backends.postgresql'),
@@ -71,10 +78,102 @@ DATABASES = {
         'USER': os.getenv('POSTGRES_USER', default='postgres'),
         'PASSWORD': os.getenv('POSTGRES_PASSWORD', default='yapracticum'),
         'HOST': os.getenv('DB_HOST', default='db'),
-        'PORT': os.getenv('DB_PORT', default='5432')
+        'PORT': os.getenv('DB_PORT', default='5432'),
+        # Соединение живет между запросами, а не открывается на каждый.
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', '60')),
     }
 }
 
+# Перед запросом к переиспользуемому соединению - SELECT 1: если БД его
+# закрыла (рестарт, таймаут простоя), открывается новое. Проверка стоит
+# круга до БД, поэтому соединение проверяется, только если его не
+# проверяли (или, в пуле, не брали) DB_CONN_HEALTH_CHECK_IDLE секунд.
+DB_CONN_HEALTH_CHECKS = bool(int(os.getenv('DB_CONN_HEALTH_CHECKS', '1')))
+
+DB_CONN_HEALTH_CHECK_IDLE = float(os.getenv('DB_CONN_HEALTH_CHECK_IDLE',
+                                            '30'))
+
+if bool(int(os.getenv('DB_POOL', '0'))):
+    # Пул соединений в процессе для воркеров gthread/gevent: на воркер
+    # не больше DB_POOL_MAX_SIZE соединений (по умолчанию - по числу
+    # потоков), всего на инстанс - GUNICORN_WORKERS * DB_POOL_MAX_SIZE.
+    DATABASES['default'].update(
+        ENGINE='api_yamdb.db.postgresql_pool',
+        CONN_MAX_AGE=0,
+        POOL={
+            'MAX_SIZE': int(os.getenv(
+                'DB_POOL_MAX_SIZE', os.getenv('GUNICORN_THREADS', '4'))),
+            'TIMEOUT': float(os.getenv('DB_POOL_TIMEOUT', '10')),
+        },
+    )
+
+# Реплики для чтения: DB_REPLICA_HOSTS="replica1,replica2:5433" - с теми же
+# базой и учетными данными, что у primary. DB_REPLICAS_EMULATE=2 для
+# локальной проверки заводит реплики-псевдонимы той же БД (в т.ч. SQLite).
+for index, address in enumerate(
+        filter(None, os.getenv('DB_REPLICA_HOSTS', '').split(',')), 1):
+    host, _, port = address.strip().partition(':')
+    DATABASES[f'replica_{index}'] = dict(
+        DATABASES['default'], HOST=host,
+        PORT=port or DATABASES['default']['PORT'], TEST={'MIRROR': 'default'})
+for index in range(1, int(os.getenv('DB_REPLICAS_EMULATE', '0')) + 1):
+    DATABASES.setdefault(f'replica_{index}', dict(
+        DATABASES['default'], TEST={'MIRROR': 'default'}))
+
+DB_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+
+if DB_REPLICAS:
+    DATABASE_ROUTERS = ['api_yamdb.db.replicas.ReplicaRouter']
+    MIDDLEWARE.insert(1, 'api_yamdb.db.replicas.ReplicaMiddleware')
+
+# Выбор реплики: round_robin или least_lag (наименьшее отставание,
+# замер раз в DB_REPLICA_LAG_CHECK_INTERVAL секунд; реплики, отставшие
+# больше DB_REPLICA_MAX_LAG секунд, пропускаются).
+DB_REPLICA_SELECTION = os.getenv('DB_REPLICA_SELECTION', 'round_robin')
+
+DB_REPLICA_MAX_LAG = float(os.getenv('DB_REPLICA_MAX_LAG', '5'))
+
+DB_REPLICA_LAG_CHECK_INTERVAL = float(
+    os.getenv('DB_REPLICA_LAG_CHECK_INTERVAL', '5'))
+
+# Сколько секунд после записи клиент читает только с primary.
+DB_READ_YOUR_WRITES_SECONDS = int(
+    os.getenv('DB_READ_YOUR_WRITES_SECONDS', '5'))
+
+if os.getenv('REDIS_URL'):
+    # Общий для всех воркеров кэш; нужен пакет django-redis.
+    CACHES = {
+        'default': {
+            'BACKEND': 'django_redis.cache.RedisCache',
+            'LOCATION': os.getenv('REDIS_URL'),
+        }
+    }
+else:
+    # LocMemCache вытесняет записи по LRU, но живет в памяти одного
+    # процесса: сброс после записи видит только воркер, где она случилась,
+    # остальные отдают старый ответ не дольше API_CACHE_TIMEOUT.
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'OPTIONS': {
+                'MAX_ENTRIES': int(os.getenv('CACHE_MAX_ENTRIES', '5000')),
+            },
+        }
+    }
+
+API_CACHE_ALIAS = 'default'
+
+API_CACHE_TIMEOUT = int(os.getenv('API_CACHE_TIMEOUT', '60'))
+
+# Списки произведений, отзывов и комментариев сериализуются из .values()
+# по заранее построенному плану полей (api.compiled), а не ModelSerializer.
+API_COMPILED_SERIALIZERS = bool(int(os.getenv('API_COMPILED_SERIALIZERS',
+                                              '1')))
+
+# Кодировщик JSON для ответов и тел запросов (api.renderers):
+# auto - orjson, если установлен, иначе json из стандартной библиотеки.
+API_JSON_BACKEND = os.getenv('API_JSON_BACKEND', 'auto')
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -114,7 +213,18 @@ REST_FRAMEWORK = {
     ],
 
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.authentication.CachedJWTAuthentication',
+    ],
+
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+
+    'DEFAULT_PARSER_CLASSES': [
+        'api.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
     ],
 
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
@@ -127,6 +237,47 @@ SIMPLE_JWT = {
     'AUTH_HEADER_TYPES': ('Bearer',),
 }
 
+JWT_USER_CACHE_TTL = int(os.getenv('JWT_USER_CACHE_TTL', '60'))
+
+# Роль и флаги пользователя в claims токена: ни одного запроса к таблице
+# пользователей, но смена роли вступит в силу только с новым токеном.
+JWT_USER_CLAIMS = bool(int(os.getenv('JWT_USER_CLAIMS', '0')))
+
 EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
+
+OUTBOX_MAX_ATTEMPTS = int(os.getenv('OUTBOX_MAX_ATTEMPTS', '5'))
+
+OUTBOX_RETRY_DELAY = int(os.getenv('OUTBOX_RETRY_DELAY', '30'))
+
+# Сколько секунд взятое воркером письмо не выдается другим. Должно быть
+# больше времени отправки пачки, иначе письмо уйдет дважды.
+OUTBOX_LEASE = int(os.getenv('OUTBOX_LEASE', '300'))
+
+SEARCH_CONFIG = os.getenv('SEARCH_CONFIG', default='russian')
+
+# Размер пачки INSERT для POST /api/v1/titles/bulk/.
+TITLE_BULK_BATCH_SIZE = int(os.getenv('TITLE_BULK_BATCH_SIZE', '500'))
+# Наибольшее число произведений в одном запросе к /api/v1/titles/bulk/.
+TITLE_BULK_MAX_ITEMS = int(os.getenv('TITLE_BULK_MAX_ITEMS', '1000'))
+
+# Байесовский рейтинг для ?ordering=rating: средняя оценка по умолчанию
+# и вес (число воображаемых отзывов). После изменения пересчитать:
+# python manage.py recompute_ratings
+RATING_PRIOR_MEAN = float(os.getenv('RATING_PRIOR_MEAN', '5.5'))
+
+RATING_PRIOR_WEIGHT = int(os.getenv('RATING_PRIOR_WEIGHT', '5'))
+
+# Метрики запросов для Prometheus на /metrics. Если задан METRICS_TOKEN,
+# сборщик передает его в заголовке Authorization: Bearer.
+METRICS_ENABLED = bool(int(os.getenv('METRICS_ENABLED', '1')))
+
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+
+# Запросы к БД дольше порога пишутся в лог с местом вызова; доля
+# записываемых задается METRICS_SLOW_QUERY_SAMPLE_RATE (0..1).
+METRICS_SLOW_QUERY_MS = float(os.getenv('METRICS_SLOW_QUERY_MS', '100'))
+
+METRICS_SLOW_QUERY_SAMPLE_RATE = float(
+    os.getenv('METRICS_SLOW_QUERY_SAMPLE_RATE', '1'))
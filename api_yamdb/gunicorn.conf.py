@@ -0,0 +1,50 @@
+import multiprocessing
+import os
+
+bind = '0:8000'
+
+# Без REDIS_URL кэш и метки чтения после записи живут в памяти процесса,
+# и сброс кэша после записи видит только один воркер.
+shared_cache = bool(os.getenv('REDIS_URL'))
+
+workers = int(os.getenv(
+    'GUNICORN_WORKERS',
+    multiprocessing.cpu_count() * 2 + 1 if shared_cache else 1))
+
+threads = int(os.getenv('GUNICORN_THREADS', '1'))
+
+worker_class = os.getenv('GUNICORN_WORKER_CLASS',
+                         'gthread' if threads > 1 else 'sync')
+
+# Сколько соединений с БД можно занять этому инстансу: часть
+# max_connections PostgreSQL за вычетом других клиентов.
+db_connection_budget = int(os.getenv('DB_CONNECTION_BUDGET', '90'))
+
+
+def threads_per_worker():
+    # Воркер uvicorn (api_yamdb.asgi) выполняет Django в ASGI_THREADS
+    # потоках независимо от threads.
+    if 'uvicorn' in worker_class:
+        return int(os.getenv('ASGI_THREADS', '8'))
+    return threads
+
+
+def db_connections_per_worker():
+    if bool(int(os.getenv('DB_POOL', '0'))):
+        return int(os.getenv('DB_POOL_MAX_SIZE', threads_per_worker()))
+    # Без пула у каждого потока свое постоянное соединение.
+    return threads_per_worker()
+
+
+def on_starting(server):
+    if workers > 1 and not shared_cache:
+        server.log.warning(
+            'Запущено %s воркеров без REDIS_URL: кэш в памяти процесса, '
+            'и воркеры будут отдавать устаревшие ответы после записи',
+            workers)
+    total = workers * db_connections_per_worker()
+    if total > db_connection_budget:
+        server.log.warning(
+            'Воркеры могут открыть %s соединений с БД при бюджете %s: '
+            'уменьшите GUNICORN_WORKERS, GUNICORN_THREADS или '
+            'DB_POOL_MAX_SIZE', total, db_connection_budget)
@@ -0,0 +1,13 @@
+from django.contrib import admin
+
+from .models import OutgoingEmail
+
+
+class OutgoingEmailAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'subject', 'recipients', 'status', 'attempts',
+                    'next_attempt_at', 'sent_at',)
+    list_filter = ('status',)
+    search_fields = ('recipients',)
+
+
+admin.site.register(OutgoingEmail, OutgoingEmailAdmin)
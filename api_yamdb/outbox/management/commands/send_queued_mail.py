@@ -0,0 +1,91 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from outbox.models import OutgoingEmail
+
+
+class Command(BaseCommand):
+    help = ('Отправляет письма из очереди пачками через одно '
+            'SMTP-соединение, с повторными попытками.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Не завершаться, а опрашивать очередь каждые --interval с.')
+        parser.add_argument('--interval', type=float, default=5)
+
+    def handle(self, *args, **options):
+        while True:
+            sent, failed = self.send_batch(options['batch_size'])
+            if sent or failed:
+                self.stdout.write(
+                    f'Отправлено: {sent}, с ошибкой: {failed}')
+            if not options['loop']:
+                break
+            if not sent and not failed:
+                time.sleep(options['interval'])
+
+    def send_batch(self, batch_size):
+        emails = self.claim(batch_size)
+        if not emails:
+            return 0, 0
+        sent = failed = 0
+        connection = get_connection()
+        try:
+            connection.open()
+        except Exception as error:
+            for email in emails:
+                self.mark_failed(email, error)
+            return 0, len(emails)
+        with connection:
+            for email in emails:
+                try:
+                    EmailMessage(email.subject, email.body, email.from_email,
+                                 email.recipient_list,
+                                 connection=connection).send()
+                except Exception as error:
+                    self.mark_failed(email, error)
+                    failed += 1
+                else:
+                    self.mark_sent(email)
+                    sent += 1
+        return sent, failed
+
+    def claim(self, batch_size):
+        # Короткая транзакция: письма уходят в аренду до OUTBOX_LEASE,
+        # блокировки снимаются до отправки. Если воркер упадет, повторно
+        # уйдут только письма без отметки об отправке, после аренды.
+        with transaction.atomic():
+            # skip_locked: несколько воркеров разбирают разные письма.
+            emails = list(OutgoingEmail.objects.due()
+                          .select_for_update(skip_locked=True)
+                          [:batch_size])
+            lease = timezone.now() + timedelta(seconds=settings.OUTBOX_LEASE)
+            OutgoingEmail.objects.filter(
+                pk__in=[email.pk for email in emails]).update(
+                    next_attempt_at=lease, attempts=F('attempts') + 1)
+        for email in emails:
+            email.attempts += 1
+        return emails
+
+    def mark_sent(self, email):
+        OutgoingEmail.objects.filter(pk=email.pk).update(
+            status=OutgoingEmail.SENT, sent_at=timezone.now())
+
+    def mark_failed(self, email, error):
+        values = {'last_error': repr(error)}
+        if email.attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+            values['status'] = OutgoingEmail.FAILED
+        else:
+            # Экспоненциальная пауза между попытками.
+            delay = settings.OUTBOX_RETRY_DELAY * 2 ** (email.attempts - 1)
+            values['next_attempt_at'] = (
+                timezone.now() + timedelta(seconds=delay))
+        OutgoingEmail.objects.filter(pk=email.pk).update(**values)
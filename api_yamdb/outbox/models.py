@@ -0,0 +1,57 @@
+from django.db import models
+from django.db.models import Q
+from django.utils import timezone
+
+
+class OutgoingEmailQuerySet(models.QuerySet):
+
+    def enqueue(self, subject, message, from_email, recipient_list):
+        # Та же сигнатура, что у send_mail: письмо уходит воркером
+        # send_queued_mail, запрос его не ждет.
+        return self.create(subject=subject, body=message,
+                           from_email=from_email,
+                           recipients=','.join(recipient_list))
+
+    def due(self):
+        return self.filter(status=OutgoingEmail.PENDING,
+                           next_attempt_at__lte=timezone.now())
+
+
+class OutgoingEmail(models.Model):
+    PENDING = 'pending'
+    SENT = 'sent'
+    FAILED = 'failed'
+    STATUSES = (
+        (PENDING, 'В очереди'),
+        (SENT, 'Отправлено'),
+        (FAILED, 'Не отправлено'),
+    )
+    subject = models.CharField('Тема', max_length=255)
+    body = models.TextField('Текст')
+    from_email = models.CharField('Отправитель', max_length=254)
+    recipients = models.TextField('Получатели')
+    status = models.CharField('Статус', choices=STATUSES, default=PENDING,
+                              max_length=10)
+    attempts = models.PositiveSmallIntegerField('Попытки', default=0)
+    next_attempt_at = models.DateTimeField('Следующая попытка',
+                                           default=timezone.now)
+    last_error = models.TextField('Последняя ошибка', blank=True)
+    created = models.DateTimeField('Создано', auto_now_add=True)
+    sent_at = models.DateTimeField('Отправлено', blank=True, null=True)
+
+    objects = OutgoingEmailQuerySet.as_manager()
+
+    class Meta:
+        ordering = ['pk']
+        indexes = [
+            models.Index(fields=['next_attempt_at'],
+                         name='outbox_pending_idx',
+                         condition=Q(status='pending')),
+        ]
+
+    def __str__(self):
+        return f'{self.subject} -> {self.recipients}'
+
+    @property
+    def recipient_list(self):
+        return self.recipients.split(',')
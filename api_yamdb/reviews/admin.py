@@ -4,7 +4,10 @@ from .models import Category, Comment, Genre, Review, Title
 
 
 class TitleAdmin(admin.ModelAdmin):
-    list_display = ('pk', 'name', 'year', 'description', 'category',)
+    list_display = ('pk', 'name', 'year', 'description', 'category',
+                    'rating',)
+    readonly_fields = ('rating_sum', 'rating_count', 'rating',
+                       'weighted_rating',)
     search_fields = ('category', 'genre',)
     list_filter = ('name', 'category', 'genre', 'year',)
     empty_value_display = '-пусто-'
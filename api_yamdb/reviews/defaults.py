@@ -0,0 +1,9 @@
+from django.conf import settings
+
+# Значения по умолчанию для полей моделей. Миграции ссылаются на них
+# по пути reviews.defaults, поэтому модуль не импортирует модели и
+# функции из него не переносятся.
+
+
+def prior_rating():
+    return float(settings.RATING_PRIOR_MEAN)
@@ -0,0 +1,51 @@
+import os
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from reviews.catalog import ENTITIES, FORMATS, write_rows
+
+
+class Command(BaseCommand):
+    help = ('Выгружает каталог в CSV или NDJSON потоком, '
+            'не загружая таблицу в память.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'entity', help=f'Из {", ".join(ENTITIES)} или all.')
+        parser.add_argument(
+            'path', nargs='?', default='-',
+            help='Файл (по умолчанию stdout); для all - каталог.')
+        parser.add_argument('--format', choices=FORMATS, default='ndjson')
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        entity, path, format = (options['entity'], options['path'],
+                                options['format'])
+        if entity == 'all':
+            if path == '-':
+                raise CommandError('Для all укажите каталог')
+            os.makedirs(path, exist_ok=True)
+            for name in ENTITIES:
+                self.export(name, os.path.join(path, f'{name}.{format}'),
+                            options)
+            return
+        if entity not in ENTITIES:
+            raise CommandError(f'Неизвестная таблица: {entity}')
+        self.export(entity, path, options)
+
+    def export(self, name, path, options):
+        entity = ENTITIES[name]
+        started = time.monotonic()
+        rows = entity.export_queryset().iterator(
+            chunk_size=options['batch_size'])
+        if path == '-':
+            count = write_rows(sys.stdout, entity, rows, options['format'])
+        else:
+            with open(path, 'w', newline='', encoding='utf-8') as stream:
+                count = write_rows(stream, entity, rows, options['format'])
+        elapsed = max(time.monotonic() - started, 1e-6)
+        # В stderr, чтобы не смешивать с данными при выводе в stdout.
+        self.stderr.write(
+            f'{name}: выгружено {count}, {elapsed:.1f} с '
+            f'({count / elapsed:.0f} строк/с)')
@@ -0,0 +1,121 @@
+import os
+import sys
+import time
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import router, transaction
+from reviews.catalog import (ENTITIES, FORMATS, catalog_imported, chunked,
+                             preserve_timestamps, read_rows, reset_sequences)
+from reviews.models import Comment, Review, Title
+
+SEARCHABLE = {'titles': Title, 'reviews': Review, 'comments': Comment}
+
+
+class Command(BaseCommand):
+    help = ('Загружает каталог из CSV или NDJSON пачками через '
+            'bulk_create; уже существующие строки пропускаются.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'entity', help=f'Из {", ".join(ENTITIES)} или all.')
+        parser.add_argument(
+            'path',
+            help='Файл (- для stdin); для all - каталог с файлами '
+                 '<entity>.csv или <entity>.ndjson.')
+        parser.add_argument('--format', choices=FORMATS)
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        imported = []
+        for name, path, format in self.get_sources(options):
+            self.import_file(name, path, format, options)
+            imported.append(name)
+        self.finish(imported, options)
+
+    def get_sources(self, options):
+        entity, path, format = (options['entity'], options['path'],
+                                options['format'])
+        if entity == 'all':
+            if not os.path.isdir(path):
+                raise CommandError(f'{path}: не каталог')
+            for name in ENTITIES:
+                for candidate in (format,) if format else FORMATS:
+                    file_path = os.path.join(path, f'{name}.{candidate}')
+                    if os.path.exists(file_path):
+                        yield name, file_path, candidate
+                        break
+            return
+        if entity not in ENTITIES:
+            raise CommandError(f'Неизвестная таблица: {entity}')
+        if format is None:
+            format = os.path.splitext(path)[1].lstrip('.')
+            if format not in FORMATS:
+                raise CommandError('Укажите --format')
+        yield entity, path, format
+
+    def import_file(self, name, path, format, options):
+        entity = ENTITIES[name]
+        stream = (sys.stdin if path == '-'
+                  else open(path, newline='', encoding='utf-8'))
+        read = skipped = 0
+        started = time.monotonic()
+        try:
+            with preserve_timestamps(entity.model):
+                for rows in chunked(read_rows(stream, format),
+                                    options['batch_size']):
+                    skipped += self.import_chunk(name, entity, rows)
+                    read += len(rows)
+                    if options['verbosity'] > 1:
+                        self.stdout.write(
+                            f'{name}: {read} ({self.rate(read, started)})')
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+        reset_sequences(entity.model)
+        self.stdout.write(self.style.SUCCESS(
+            f'{name}: прочитано {read}, пропущено {skipped}, '
+            f'{time.monotonic() - started:.1f} с '
+            f'({self.rate(read, started)})'))
+
+    def import_chunk(self, name, entity, rows):
+        objects, skipped = entity.build(rows)
+        with transaction.atomic(using=router.db_for_write(entity.model)):
+            # ignore_conflicts: повторная загрузка того же файла и строки,
+            # нарушающие уникальность, не прерывают импорт.
+            entity.model.objects.bulk_create(objects, ignore_conflicts=True)
+            title_ids = self.affected_titles(name, objects)
+            if name == 'title_genres' and title_ids:
+                # m2m_changed при bulk_create не отправляется.
+                Title.objects.filter(pk__in=title_ids).touch()
+        catalog_imported.send(sender=entity.model, entity=name,
+                              title_ids=title_ids)
+        return skipped
+
+    def affected_titles(self, name, objects):
+        if name in ('title_genres', 'reviews'):
+            return {obj.title_id for obj in objects}
+        if name == 'titles':
+            return {obj.pk for obj in objects if obj.pk is not None}
+        return set()
+
+    def finish(self, imported, options):
+        # Сигналы моделей при bulk_create не срабатывают: рейтинг
+        # и поисковые вектора достраиваются отдельными проходами.
+        if 'reviews' in imported:
+            call_command('recompute_ratings', stdout=self.stdout,
+                         batch_size=options['batch_size'])
+            call_command('rebuild_title_stats', stdout=self.stdout,
+                         batch_size=options['batch_size'])
+        if 'comments' in imported:
+            call_command('reconcile_comment_counts', stdout=self.stdout,
+                         batch_size=options['batch_size'])
+        searchable = [name for name in imported if name in SEARCHABLE]
+        if searchable:
+            call_command('rebuild_search_index', *searchable, missing=True,
+                         stdout=self.stdout,
+                         batch_size=options['batch_size'])
+
+    def rate(self, count, started):
+        elapsed = max(time.monotonic() - started, 1e-6)
+        return f'{count / elapsed:.0f} строк/с'
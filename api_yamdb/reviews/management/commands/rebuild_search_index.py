@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand, CommandError
+from reviews.models import Comment, Review, Title
+from reviews.search import is_postgres, update_search_vector
+
+MODELS = {'titles': Title, 'reviews': Review, 'comments': Comment}
+
+
+class Command(BaseCommand):
+    help = 'Заново строит search_vector для полнотекстового поиска.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'models', nargs='*',
+            help=f'Из {", ".join(MODELS)}; по умолчанию все.')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--missing', action='store_true',
+            help='Только строки без вектора (после массовой загрузки).')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        unknown = set(options['models']) - set(MODELS)
+        if unknown:
+            raise CommandError(f'Неизвестные модели: {", ".join(unknown)}')
+        for name in options['models'] or MODELS:
+            model = MODELS[name]
+            if not is_postgres(model):
+                self.stdout.write(
+                    f'{name}: не PostgreSQL, полнотекстовый индекс не нужен')
+                continue
+            queryset = model.objects.all()
+            if options['missing']:
+                queryset = queryset.filter(search_vector__isnull=True)
+            updated = 0
+            last_pk = 0
+            while True:
+                pks = list(queryset.filter(pk__gt=last_pk)
+                           .order_by('pk')
+                           .values_list('pk', flat=True)[:batch_size])
+                if not pks:
+                    break
+                updated += update_search_vector(queryset.filter(
+                    pk__gt=last_pk, pk__lte=pks[-1]))
+                last_pk = pks[-1]
+            self.stdout.write(self.style.SUCCESS(
+                f'{name}: обновлено {updated}'))
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from reviews.models import Title, TitleStats
+
+
+class Command(BaseCommand):
+    help = ('Пересобирает распределение оценок произведений (TitleStats) '
+            'по отзывам: одна группировка отзывов на пачку произведений.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        titles = reviews = 0
+        last_pk = 0
+        while True:
+            title_ids = list(
+                Title.objects.filter(pk__gt=last_pk).order_by('pk')
+                .values_list('pk', flat=True)[:batch_size])
+            if not title_ids:
+                break
+            with transaction.atomic():
+                stats = TitleStats.objects.rebuild(title_ids)
+            titles += len(stats)
+            reviews += sum(title_stats.total for title_stats in stats)
+            last_pk = title_ids[-1]
+            if options['verbosity'] > 1:
+                self.stdout.write(f'Произведений: {titles}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Распределение оценок пересобрано: произведений {titles}, '
+            f'отзывов {reviews}'))
@@ -0,0 +1,77 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.utils import timezone
+from reviews.models import Review, Title
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает денормализованный рейтинг произведений '
+            'и сообщает о расхождениях.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать расхождения, ничего не сохраняя.')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        checked = drifted = 0
+        last_pk = 0
+        while True:
+            with transaction.atomic():
+                changed, last_pk, count = self.check_batch(
+                    last_pk, batch_size, options)
+            if not count:
+                break
+            checked += count
+            drifted += len(changed)
+        self.stdout.write(self.style.SUCCESS(
+            f'Проверено произведений: {checked}, '
+            f'с расхождениями: {drifted}'
+            + (' (dry run)' if options['dry_run'] else '')))
+
+    def check_batch(self, last_pk, batch_size, options):
+        # Блокируем строки пачки: параллельные отзывы применят свою
+        # дельту уже поверх исправленных значений.
+        titles = list(
+            Title.objects.select_for_update()
+            .filter(pk__gt=last_pk).order_by('pk')
+            .only('pk', 'rating_sum', 'rating_count', 'rating',
+                  'weighted_rating')
+            [:batch_size]
+        )
+        if not titles:
+            return [], last_pk, 0
+        stats = {
+            row['title_id']: row for row in
+            Review.objects.filter(title_id__in=[t.pk for t in titles])
+            .values('title_id')
+            .annotate(rating_sum=Sum('score'), rating_count=Count('id'))
+            .order_by()
+        }
+        changed = []
+        for title in titles:
+            row = stats.get(title.pk, {})
+            actual = self.rating_state(title)
+            title.set_rating(row.get('rating_sum', 0),
+                             row.get('rating_count', 0))
+            expected = self.rating_state(title)
+            if actual != expected:
+                title.modified = timezone.now()
+                changed.append(title)
+                if options['verbosity'] > 1:
+                    self.stdout.write(
+                        f'Произведение {title.pk}: {actual} -> {expected}')
+        if changed and not options['dry_run']:
+            Title.objects.bulk_update(
+                changed, ('rating_sum', 'rating_count', 'rating',
+                          'weighted_rating', 'modified'))
+        return changed, titles[-1].pk, len(titles)
+
+    def rating_state(self, title):
+        # weighted_rating сравнивается с округлением: БД и Python могут
+        # разойтись в последних знаках float.
+        return (title.rating_sum, title.rating_count, title.rating,
+                round(title.weighted_rating, 6))
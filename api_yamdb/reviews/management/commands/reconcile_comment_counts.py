@@ -0,0 +1,66 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+from reviews.models import Comment, Review
+
+
+class Command(BaseCommand):
+    help = ('Сверяет Review.comment_count с числом комментариев '
+            'и исправляет расхождения пачками.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать расхождения, ничего не сохраняя.')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        checked = drifted = 0
+        last_pk = 0
+        while True:
+            with transaction.atomic():
+                changed, last_pk, count = self.check_batch(
+                    last_pk, batch_size, options)
+            if not count:
+                break
+            checked += count
+            drifted += len(changed)
+        self.stdout.write(self.style.SUCCESS(
+            f'Проверено отзывов: {checked}, '
+            f'с расхождениями: {drifted}'
+            + (' (dry run)' if options['dry_run'] else '')))
+
+    def check_batch(self, last_pk, batch_size, options):
+        # Строки пачки заблокированы: новый комментарий применит свою
+        # дельту уже поверх исправленного значения.
+        reviews = list(
+            Review.objects.select_for_update()
+            .filter(pk__gt=last_pk).order_by('pk')
+            .only('pk', 'comment_count')
+            [:batch_size]
+        )
+        if not reviews:
+            return [], last_pk, 0
+        counts = dict(
+            Comment.objects.filter(review_id__in=[r.pk for r in reviews])
+            .values('review_id').annotate(count=Count('id'))
+            .values_list('review_id', 'count').order_by()
+        )
+        changed = []
+        now = timezone.now()
+        for review in reviews:
+            expected = counts.get(review.pk, 0)
+            if review.comment_count != expected:
+                if options['verbosity'] > 1:
+                    self.stdout.write(
+                        f'Отзыв {review.pk}: {review.comment_count} -> '
+                        f'{expected}')
+                review.comment_count = expected
+                review.modified = now
+                changed.append(review)
+        if changed and not options['dry_run']:
+            Review.objects.bulk_update(changed,
+                                       ('comment_count', 'modified'))
+        return changed, reviews[-1].pk, len(reviews)
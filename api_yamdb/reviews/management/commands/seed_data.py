@@ -0,0 +1,137 @@
+import random
+import time
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+from reviews.catalog import (catalog_imported, chunked, preserve_timestamps,
+                             reset_sequences)
+from reviews.models import Category, Comment, Genre, Review, Title, User
+
+WORDS = ('фильм', 'книга', 'песня', 'сюжет', 'герой', 'драма', 'комедия',
+         'финал', 'актер', 'автор', 'история', 'мир', 'время', 'любовь',
+         'война', 'музыка', 'роман', 'детектив', 'фантастика', 'главный')
+
+
+class Command(BaseCommand):
+    help = ('Заполняет БД синтетическими данными заданного объема '
+            'для нагрузочных замеров (benchmark_api).')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--categories', type=int, default=20)
+        parser.add_argument('--genres', type=int, default=50)
+        parser.add_argument('--titles', type=int, default=10000)
+        parser.add_argument('--genres-per-title', type=int, default=2)
+        parser.add_argument('--reviews', type=int, default=100000)
+        parser.add_argument('--comments', type=int, default=200000)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        if options['titles'] < 1 or options['genres'] < 1:
+            raise CommandError('Нужно хотя бы одно произведение и жанр')
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.now = timezone.now()
+        # Отзыв уникален для пары (автор, произведение): авторов нужно
+        # не меньше, чем отзывов на одно произведение.
+        users = max(options['users'],
+                    -(-options['reviews'] // options['titles']))
+        user_ids = self.seed(User, users, self.make_user)
+        category_ids = self.seed(Category, options['categories'],
+                                 self.make_category)
+        genre_ids = self.seed(Genre, options['genres'], self.make_genre)
+        title_ids = self.seed(
+            Title, options['titles'],
+            lambda pk, index: self.make_title(pk, category_ids))
+        per_title = min(options['genres_per_title'], len(genre_ids))
+        self.seed_title_genres(title_ids, genre_ids, per_title)
+        review_ids = self.seed(
+            Review, options['reviews'],
+            lambda pk, index: self.make_review(pk, index, title_ids,
+                                               user_ids))
+        if review_ids:
+            self.seed(Comment, options['comments'],
+                      lambda pk, index: self.make_comment(
+                          pk, index, review_ids, user_ids))
+        call_command('recompute_ratings', stdout=self.stdout,
+                     batch_size=self.batch_size)
+        call_command('rebuild_title_stats', stdout=self.stdout,
+                     batch_size=self.batch_size)
+        call_command('reconcile_comment_counts', stdout=self.stdout,
+                     batch_size=self.batch_size)
+        call_command('rebuild_search_index', missing=True,
+                     stdout=self.stdout, batch_size=self.batch_size)
+        for entity in ('categories', 'genres', 'titles'):
+            catalog_imported.send(sender=type(self), entity=entity,
+                                  title_ids=())
+
+    def seed(self, model, count, make):
+        # Явные id после текущего максимума: зависимые таблицы ссылаются
+        # на них без обратного чтения вставленных строк.
+        start = (model.objects.aggregate(pk=Max('pk'))['pk'] or 0) + 1
+        started = time.monotonic()
+        objects = (make(start + index, index) for index in range(count))
+        with preserve_timestamps(model):
+            for chunk in chunked(objects, self.batch_size):
+                with transaction.atomic():
+                    model.objects.bulk_create(chunk)
+        reset_sequences(model)
+        self.report(model._meta.verbose_name_plural, count, started)
+        return range(start, start + count)
+
+    def seed_title_genres(self, title_ids, genre_ids, per_title):
+        through = Title.genre.through
+        started = time.monotonic()
+        links = (through(title_id=title_id, genre_id=genre_id)
+                 for title_id in title_ids
+                 for genre_id in self.rng.sample(genre_ids, per_title))
+        for chunk in chunked(links, self.batch_size):
+            through.objects.bulk_create(chunk)
+        self.report('title genres', len(title_ids) * per_title, started)
+
+    def report(self, name, count, started):
+        elapsed = max(time.monotonic() - started, 1e-6)
+        self.stdout.write(f'{name}: {count}, {elapsed:.1f} с '
+                          f'({count / elapsed:.0f} строк/с)')
+
+    def text(self, words=12):
+        return ' '.join(self.rng.choices(WORDS, k=words))
+
+    def make_user(self, pk, index):
+        return User(pk=pk, username=f'seed{pk}', email=f'seed{pk}@yamdb.fake',
+                    password=make_password(None))
+
+    def make_category(self, pk, index):
+        return Category(pk=pk, name=f'Категория {pk}',
+                        slug=f'seed-category-{pk}')
+
+    def make_genre(self, pk, index):
+        return Genre(pk=pk, name=f'Жанр {pk}', slug=f'seed-genre-{pk}')
+
+    def make_title(self, pk, category_ids):
+        return Title(
+            pk=pk, name=f'{self.rng.choice(WORDS).capitalize()} {pk}',
+            year=self.rng.randint(1900, 2022), description=self.text(),
+            category_id=(self.rng.choice(category_ids)
+                         if category_ids else None))
+
+    def make_review(self, pk, index, title_ids, user_ids):
+        # Отзывы раскладываются по кругу: i-й отзыв произведения пишет
+        # i-й автор, так пары (автор, произведение) не повторяются.
+        return Review(
+            pk=pk, title_id=title_ids[index % len(title_ids)],
+            author_id=user_ids[index // len(title_ids)],
+            score=self.rng.randint(1, 10), text=self.text(),
+            pub_date=self.now - timedelta(minutes=index))
+
+    def make_comment(self, pk, index, review_ids, user_ids):
+        return Comment(
+            pk=pk, review_id=review_ids[index % len(review_ids)],
+            author_id=self.rng.choice(user_ids), text=self.text(6),
+            pub_date=self.now - timedelta(seconds=index))
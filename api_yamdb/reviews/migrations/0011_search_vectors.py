@@ -0,0 +1,59 @@
+# Generated by Django 2.2.16 on 2026-10-18 19:52
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+# GIN-индексы и pg_trgm есть только в PostgreSQL: на SQLite (локальные
+# тесты) эти шаги пропускаются, поиск там работает через icontains.
+SEARCH_INDEXES = (
+    ('reviews_title', 'title_search_vector_gin',
+     'USING gin (search_vector)'),
+    ('reviews_review', 'review_search_vector_gin',
+     'USING gin (search_vector)'),
+    ('reviews_comment', 'comment_search_vector_gin',
+     'USING gin (search_vector)'),
+    ('reviews_title', 'title_name_trgm_gin',
+     'USING gin (name gin_trgm_ops)'),
+)
+
+
+def create_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for table, name, method in SEARCH_INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {name} ON {table} {method}')
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for _, name, _ in SEARCH_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0010_title_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='review',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='title',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 2.2.16 on 2026-10-18 20:05
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import ExpressionWrapper, F, FloatField
+
+# Формула и значения на момент миграции, без ссылок на код моделей:
+# его правки не должны менять уже примененные миграции.
+PRIOR_MEAN = 5.5
+
+
+def fill_weighted_rating(apps, schema_editor):
+    Title = apps.get_model('reviews', 'Title')
+    mean = float(getattr(settings, 'RATING_PRIOR_MEAN', PRIOR_MEAN))
+    weight = float(getattr(settings, 'RATING_PRIOR_WEIGHT', 5))
+    Title.objects.update(weighted_rating=ExpressionWrapper(
+        (F('rating_sum') + weight * mean) / (F('rating_count') + weight),
+        output_field=FloatField()))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0012_modified_timestamps'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='title',
+            name='weighted_rating',
+            field=models.FloatField(default=PRIOR_MEAN, editable=False),
+        ),
+        migrations.RunPython(fill_weighted_rating, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='title',
+            index=models.Index(fields=['weighted_rating', 'id'], name='title_weighted_rating_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='title',
+            index=models.Index(fields=['category', 'weighted_rating', 'id'], name='title_category_rating_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='title',
+            index=models.Index(fields=['rating_count', 'id'], name='title_rating_count_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='title',
+            index=models.Index(fields=['name', 'id'], name='title_name_idx'),
+        ),
+    ]
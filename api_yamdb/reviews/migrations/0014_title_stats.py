@@ -0,0 +1,48 @@
+# Generated by Django 2.2.16 on 2026-10-18 20:36
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count
+
+
+def fill_title_stats(apps, schema_editor):
+    TitleStats = apps.get_model('reviews', 'TitleStats')
+    Review = apps.get_model('reviews', 'Review')
+    stats = {}
+    rows = (Review.objects.filter(score__range=(1, 10))
+            .values('title_id', 'score').annotate(count=Count('id'))
+            .order_by())
+    for row in rows.iterator():
+        title_stats = stats.setdefault(
+            row['title_id'], TitleStats(title_id=row['title_id']))
+        setattr(title_stats, f'score_{row["score"]}', row['count'])
+        title_stats.total += row['count']
+    TitleStats.objects.bulk_create(stats.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0013_title_weighted_rating'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TitleStats',
+            fields=[
+                ('title', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='reviews.Title')),
+                ('score_1', models.PositiveIntegerField(default=0)),
+                ('score_2', models.PositiveIntegerField(default=0)),
+                ('score_3', models.PositiveIntegerField(default=0)),
+                ('score_4', models.PositiveIntegerField(default=0)),
+                ('score_5', models.PositiveIntegerField(default=0)),
+                ('score_6', models.PositiveIntegerField(default=0)),
+                ('score_7', models.PositiveIntegerField(default=0)),
+                ('score_8', models.PositiveIntegerField(default=0)),
+                ('score_9', models.PositiveIntegerField(default=0)),
+                ('score_10', models.PositiveIntegerField(default=0)),
+                ('total', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(fill_title_stats, migrations.RunPython.noop),
+    ]
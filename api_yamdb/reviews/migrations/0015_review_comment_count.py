@@ -0,0 +1,34 @@
+# Generated by Django 2.2.16 on 2026-10-18 20:38
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def fill_comment_counts(apps, schema_editor):
+    Review = apps.get_model('reviews', 'Review')
+    Comment = apps.get_model('reviews', 'Comment')
+    counts = (Comment.objects.values('review_id')
+              .annotate(comment_count=Count('id')).order_by())
+    for row in counts.iterator():
+        Review.objects.filter(pk=row['review_id']).update(
+            comment_count=row['comment_count'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0014_title_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='review',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_comment_counts, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['title', 'comment_count', 'id'], name='review_title_comments_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 2.2.16 on 2026-10-18 20:58
+
+from django.db import migrations, models
+import reviews.defaults
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0016_soft_delete'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='title',
+            name='weighted_rating',
+            field=models.FloatField(default=reviews.defaults.prior_rating, editable=False),
+        ),
+    ]
@@ -1,6 +1,16 @@
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.db import models
+from django.db import models, transaction
+from django.db.models import (Count, ExpressionWrapper, F, FloatField,
+                              OuterRef, Prefetch, Q, Subquery, Sum)
+from django.db.models.functions import NullIf
+from django.utils import timezone
+
+from api_yamdb.db.soft_delete import AliveManager, SoftDeleteModel
+
+from .defaults import prior_rating
 
 User = get_user_model()
 
@@ -21,7 +31,53 @@ class Genre(models.Model):
         return self.name
 
 
-class Title(models.Model):
+def weighted_rating(rating_sum, rating_count):
+    # Байесовская оценка: к отзывам добавляется RATING_PRIOR_WEIGHT
+    # воображаемых оценок RATING_PRIOR_MEAN, и произведение с парой
+    # десяток не обгоняет то, у которого сотни девяток.
+    weight = float(settings.RATING_PRIOR_WEIGHT)
+    return ((rating_sum + weight * settings.RATING_PRIOR_MEAN)
+            / (rating_count + weight))
+
+
+class TitleQuerySet(models.QuerySet):
+
+    def for_read(self):
+        # Категория и жанры одним JOIN и одним запросом на всю страницу.
+        genres = Genre.objects.only('name', 'slug').order_by('pk')
+        return self.select_related('category').prefetch_related(
+            Prefetch('genre', queryset=genres)).defer('search_vector')
+
+    def apply_review_delta(self, score_delta, count_delta):
+        # Атомарный сдвиг счетчиков рейтинга без чтения строки в Python.
+        rating_sum = F('rating_sum') + score_delta
+        rating_count = F('rating_count') + count_delta
+        return self.update(
+            rating_sum=rating_sum,
+            rating_count=rating_count,
+            rating=(F('rating_sum') + score_delta)
+            / NullIf(F('rating_count') + count_delta, 0),
+            weighted_rating=ExpressionWrapper(
+                weighted_rating(rating_sum, rating_count),
+                output_field=FloatField()),
+            modified=timezone.now(),
+        )
+
+    def touch(self):
+        # Время из Python, а не NOW() БД: в SQLite у него точность до
+        # секунды, и две правки подряд дали бы одинаковый ETag.
+        return self.update(modified=timezone.now())
+
+    def recalculate_ratings(self):
+        for title in self:
+            stats = title.reviews.aggregate(
+                rating_sum=Sum('score'), rating_count=Count('id'))
+            title.set_rating(stats['rating_sum'] or 0, stats['rating_count'])
+            title.save(update_fields=('rating_sum', 'rating_count', 'rating',
+                                      'weighted_rating', 'modified'))
+
+
+class Title(SoftDeleteModel):
     name = models.CharField(max_length=256)
     year = models.IntegerField()
     description = models.TextField()
@@ -32,12 +88,62 @@ class Title(models.Model):
     genre = models.ManyToManyField(
         Genre,
         related_name="titles", blank=True)
+    rating_sum = models.PositiveIntegerField(default=0)
+    rating_count = models.PositiveIntegerField(default=0)
+    rating = models.PositiveSmallIntegerField(blank=True, null=True)
+    weighted_rating = models.FloatField(default=prior_rating, editable=False)
+    search_vector = SearchVectorField(null=True, editable=False)
+    modified = models.DateTimeField(auto_now=True)
+
+    objects = AliveManager.from_queryset(TitleQuerySet)()
+    all_objects = TitleQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['modified'], name='title_modified_idx'),
+            models.Index(fields=['year'], name='title_year_idx'),
+            models.Index(fields=['category', 'year'],
+                         name='title_category_year_idx'),
+            # Сортировки ?ordering= (с id для устойчивого порядка): первые
+            # N строк читаются из индекса без сортировки всей таблицы.
+            models.Index(fields=['weighted_rating', 'id'],
+                         name='title_weighted_rating_idx'),
+            models.Index(fields=['category', 'weighted_rating', 'id'],
+                         name='title_category_rating_idx'),
+            models.Index(fields=['rating_count', 'id'],
+                         name='title_rating_count_idx'),
+            models.Index(fields=['name', 'id'], name='title_name_idx'),
+            # Очередь purge_deleted.
+            models.Index(fields=['deleted_at'], name='title_deleted_idx',
+                         condition=Q(deleted_at__isnull=False)),
+        ]
 
     def __str__(self):
         return self.name
 
+    def set_rating(self, rating_sum, rating_count):
+        self.rating_sum = rating_sum
+        self.rating_count = rating_count
+        self.rating = rating_sum // rating_count if rating_count else None
+        self.weighted_rating = weighted_rating(rating_sum, rating_count)
+
+
+class ReviewQuerySet(models.QuerySet):
+
+    def apply_comment_delta(self, delta):
+        # Атомарный сдвиг счетчика комментариев. modified сдвигается
+        # вместе с ним: число комментариев входит в ответ отзыва.
+        return self.update(comment_count=F('comment_count') + delta,
+                           modified=timezone.now())
+
+    def visible(self):
+        # Отзывы удаленных произведений и авторов скрыты сразу, а удаляются
+        # вместе с ними командой purge_deleted.
+        return self.filter(title__deleted_at__isnull=True,
+                           author__deleted_at__isnull=True)
 
-class Review(models.Model):
+
+class Review(SoftDeleteModel):
     text = models.TextField(max_length=2000)
     author = models.ForeignKey(
         User,
@@ -58,18 +164,149 @@ class Review(models.Model):
         on_delete=models.CASCADE,
         related_name="reviews",
     )
+    comment_count = models.PositiveIntegerField(default=0, editable=False)
+    search_vector = SearchVectorField(null=True, editable=False)
+    modified = models.DateTimeField(auto_now=True)
+
+    objects = AliveManager.from_queryset(ReviewQuerySet)()
+    all_objects = ReviewQuerySet.as_manager()
 
     class Meta:
-        ordering = ["-pub_date"]
+        ordering = ["-pub_date", "-id"]
+        indexes = [
+            models.Index(fields=['title', '-pub_date', '-id'],
+                         name='review_title_pub_date_idx'),
+            models.Index(fields=['title', 'modified'],
+                         name='review_title_modified_idx'),
+            models.Index(fields=['title', 'comment_count', 'id'],
+                         name='review_title_comments_idx'),
+            models.Index(fields=['deleted_at'], name='review_deleted_idx',
+                         condition=Q(deleted_at__isnull=False)),
+        ]
         constraints = [
+            # Мягко удаленный отзыв не мешает написать новый.
             models.UniqueConstraint(
                 fields=['author', 'title'],
+                condition=Q(deleted_at__isnull=True),
                 name='unique_author_title'
             )
         ]
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Запоминаем сохраненные в БД значения, чтобы при изменении отзыва
+        # пересчитывать рейтинг произведения по разнице, а не целиком.
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def save(self, *args, **kwargs):
+        # Рейтинг произведения обновляется сигналом в той же транзакции.
+        # Без отдельной точки сохранения: ошибку откатит внешний atomic.
+        with transaction.atomic(using=kwargs.get('using'), savepoint=False):
+            super().save(*args, **kwargs)
+
+
+# Оценки, для которых ведется распределение в TitleStats.
+SCORES = range(1, 11)
 
-class Comment(models.Model):
+
+class TitleStatsQuerySet(models.QuerySet):
+
+    def apply_score_delta(self, score, delta):
+        # Атомарный сдвиг счетчика оценки и общего числа отзывов.
+        if score not in SCORES:
+            return 0
+        counter = f'score_{score}'
+        return self.update(**{counter: F(counter) + delta,
+                              'total': F('total') + delta})
+
+    def rebuild(self, title_ids):
+        # Распределение по отзывам заново: одна группировка по
+        # (произведение, оценка) на все переданные произведения. Строки
+        # произведений блокируются до подсчета: отзыв меняет рейтинг
+        # произведения раньше распределения, поэтому параллельный отзыв
+        # ждет пересборки, а не теряется между подсчетом и вставкой.
+        with transaction.atomic(using=self.db, savepoint=False):
+            title_ids = list(
+                Title.objects.using(self.db).filter(pk__in=title_ids)
+                .select_for_update().order_by('pk')
+                .values_list('pk', flat=True))
+            stats = {pk: self.model(title_id=pk) for pk in title_ids}
+            rows = (Review.objects.using(self.db)
+                    .filter(title_id__in=title_ids, score__in=SCORES)
+                    .values('title_id', 'score')
+                    .annotate(count=Count('id')).order_by())
+            for row in rows:
+                stats[row['title_id']].add(row['score'], row['count'])
+            self.filter(title_id__in=title_ids).delete()
+            self.bulk_create(stats.values())
+        return list(stats.values())
+
+
+class TitleStats(models.Model):
+    # Распределение оценок произведения: счетчик на каждую оценку и общее
+    # число отзывов. Меняется сигналами отзывов в той же транзакции, так
+    # что гистограмма читается одной строкой, без обхода отзывов.
+    title = models.OneToOneField(
+        Title,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="stats",
+    )
+    score_1 = models.PositiveIntegerField(default=0)
+    score_2 = models.PositiveIntegerField(default=0)
+    score_3 = models.PositiveIntegerField(default=0)
+    score_4 = models.PositiveIntegerField(default=0)
+    score_5 = models.PositiveIntegerField(default=0)
+    score_6 = models.PositiveIntegerField(default=0)
+    score_7 = models.PositiveIntegerField(default=0)
+    score_8 = models.PositiveIntegerField(default=0)
+    score_9 = models.PositiveIntegerField(default=0)
+    score_10 = models.PositiveIntegerField(default=0)
+    total = models.PositiveIntegerField(default=0)
+
+    objects = TitleStatsQuerySet.as_manager()
+
+    def __str__(self):
+        return f'{self.title_id}: {self.total}'
+
+    def add(self, score, count):
+        counter = f'score_{score}'
+        setattr(self, counter, getattr(self, counter) + count)
+        self.total += count
+
+    def histogram(self):
+        return {score: getattr(self, f'score_{score}') for score in SCORES}
+
+
+class CommentQuerySet(models.QuerySet):
+
+    def visible(self):
+        return self.filter(author__deleted_at__isnull=True,
+                           review__deleted_at__isnull=True,
+                           review__author__deleted_at__isnull=True,
+                           review__title__deleted_at__isnull=True)
+
+    def uncount(self):
+        # Вычитает живые комментарии из счетчиков их отзывов одним UPDATE.
+        comments = self.filter(deleted_at__isnull=True)
+        counts = (comments.filter(review=OuterRef('pk')).order_by()
+                  .values('review').annotate(count=Count('id'))
+                  .values('count'))
+        return Review.all_objects.filter(
+            pk__in=comments.values('review_id')
+        ).apply_comment_delta(-Subquery(counts))
+
+    def delete(self):
+        # Удаление через QuerySet идет мимо Comment.delete(), поэтому
+        # счетчики вычитаются здесь.
+        with transaction.atomic(using=self.db, savepoint=False):
+            self.uncount()
+            return super().delete()
+
+
+class Comment(SoftDeleteModel):
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -85,6 +322,36 @@ class Comment(models.Model):
         auto_now_add=True,
         db_index=True,
     )
+    search_vector = SearchVectorField(null=True, editable=False)
+    modified = models.DateTimeField(auto_now=True)
+
+    objects = AliveManager.from_queryset(CommentQuerySet)()
+    all_objects = CommentQuerySet.as_manager()
 
     class Meta:
-        ordering = ["-pub_date"]
+        ordering = ["-pub_date", "-id"]
+        indexes = [
+            models.Index(fields=['review', '-pub_date', '-id'],
+                         name='comment_review_pub_date_idx'),
+            models.Index(fields=['review', 'modified'],
+                         name='comment_review_modified_idx'),
+            models.Index(fields=['deleted_at'], name='comment_deleted_idx',
+                         condition=Q(deleted_at__isnull=False)),
+        ]
+
+    def save(self, *args, **kwargs):
+        # Счетчик комментариев отзыва обновляется сигналом в той же
+        # транзакции.
+        with transaction.atomic(using=kwargs.get('using'), savepoint=False):
+            super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        # Здесь, а не в post_delete: обработчик сигнала лишил бы
+        # комментарии быстрого каскадного удаления вместе с отзывом.
+        # Мягко удаленный комментарий уже вычтен из счетчика.
+        with transaction.atomic(using=kwargs.get('using'), savepoint=False):
+            deleted = super().delete(*args, **kwargs)
+            if self.deleted_at is None:
+                Review.objects.filter(
+                    pk=self.review_id).apply_comment_delta(-1)
+        return deleted
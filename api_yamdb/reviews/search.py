@@ -0,0 +1,72 @@
+from django.conf import settings
+from django.contrib.postgres.search import (SearchQuery, SearchRank,
+                                            SearchVector, TrigramSimilarity)
+from django.db import connections, router
+from django.db.models import F, Q
+
+from .models import Comment, Review, Title
+
+# Поля, из которых собирается search_vector каждой модели, и их веса.
+SEARCH_FIELDS = {
+    Title: (('name', 'A'), ('description', 'B')),
+    Review: (('text', 'A'),),
+    Comment: (('text', 'A'),),
+}
+
+
+def search_config():
+    return getattr(settings, 'SEARCH_CONFIG', 'russian')
+
+
+def is_postgres(model):
+    alias = router.db_for_read(model)
+    return connections[alias].vendor == 'postgresql'
+
+
+def search_vector(model):
+    vector = None
+    for field, weight in SEARCH_FIELDS[model]:
+        part = SearchVector(field, weight=weight, config=search_config())
+        vector = part if vector is None else vector + part
+    return vector
+
+
+def update_search_vector(queryset):
+    # На SQLite полнотекстового индекса нет, поиск идет через icontains.
+    if not is_postgres(queryset.model):
+        return 0
+    return queryset.update(search_vector=search_vector(queryset.model))
+
+
+def _postgres_search(queryset, query):
+    search_query = SearchQuery(query, config=search_config())
+    return (queryset.filter(search_vector=search_query)
+            .annotate(rank=SearchRank(F('search_vector'), search_query))
+            .order_by('-rank', '-pk'))
+
+
+def _fallback_search(queryset, query):
+    lookup = Q()
+    for field, _ in SEARCH_FIELDS[queryset.model]:
+        lookup |= Q(**{f'{field}__icontains': query})
+    return queryset.filter(lookup).order_by('-pk')
+
+
+def _title_search(queryset, query):
+    # Полнотекстовое совпадение или похожее название (опечатки):
+    # оператор % использует триграммный GIN-индекс по name.
+    search_query = SearchQuery(query, config=search_config())
+    return (queryset
+            .filter(Q(search_vector=search_query)
+                    | Q(name__trigram_similar=query))
+            .annotate(rank=SearchRank(F('search_vector'), search_query),
+                      similarity=TrigramSimilarity('name', query))
+            .order_by('-rank', '-similarity', '-pk'))
+
+
+def search(queryset, query):
+    if not is_postgres(queryset.model):
+        return _fallback_search(queryset, query)
+    if queryset.model is Title:
+        return _title_search(queryset, query)
+    return _postgres_search(queryset, query)
@@ -0,0 +1,155 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete)
+from django.dispatch import receiver
+
+from api_yamdb.db.soft_delete import soft_deleted
+
+from .models import Category, Comment, Genre, Review, Title, TitleStats
+from .search import SEARCH_FIELDS, update_search_vector
+
+User = get_user_model()
+
+
+def apply_score_delta(title_id, score, delta):
+    updated = TitleStats.objects.filter(title_id=title_id).apply_score_delta(
+        score, delta)
+    if not updated and delta > 0:
+        # Строки распределения еще нет: собираем ее по отзывам, в том
+        # числе только что сохраненному.
+        TitleStats.objects.rebuild([title_id])
+
+
+@receiver(post_save, sender=Title)
+def create_title_stats(sender, instance, created, raw=False, **kwargs):
+    # Пустое распределение сразу: первый отзыв обойдется одним UPDATE.
+    # Произведениям из импорта строку соберет apply_score_delta.
+    if created and not raw:
+        TitleStats.objects.create(title=instance)
+
+
+@receiver(post_save, sender=Review)
+def update_title_rating_on_save(sender, instance, created, raw=False,
+                                **kwargs):
+    if raw:
+        return
+    loaded = getattr(instance, '_loaded_values', None)
+    if created:
+        Title.objects.filter(pk=instance.title_id).apply_review_delta(
+            instance.score, 1)
+        apply_score_delta(instance.title_id, instance.score, 1)
+    elif loaded is None or 'score' not in loaded or 'title_id' not in loaded:
+        # Старые значения неизвестны - пересчитываем произведение целиком.
+        Title.objects.filter(pk=instance.title_id).recalculate_ratings()
+        TitleStats.objects.rebuild([instance.title_id])
+    elif (loaded['title_id'] != instance.title_id
+          or loaded['score'] != instance.score):
+        if loaded['title_id'] != instance.title_id:
+            Title.objects.filter(pk=loaded['title_id']).apply_review_delta(
+                -loaded['score'], -1)
+            Title.objects.filter(pk=instance.title_id).apply_review_delta(
+                instance.score, 1)
+        else:
+            Title.objects.filter(pk=instance.title_id).apply_review_delta(
+                instance.score - loaded['score'], 0)
+        apply_score_delta(loaded['title_id'], loaded['score'], -1)
+        apply_score_delta(instance.title_id, instance.score, 1)
+    instance._loaded_values = {
+        'title_id': instance.title_id, 'score': instance.score}
+
+
+@receiver(post_delete, sender=Review)
+@receiver(soft_deleted, sender=Review)
+def update_title_rating_on_delete(sender, instance, signal, **kwargs):
+    if signal is post_delete and instance.deleted_at is not None:
+        # Мягко удаленный отзыв уже вычтен из рейтинга.
+        return
+    loaded = getattr(instance, '_loaded_values', None) or {}
+    title_id = loaded.get('title_id', instance.title_id)
+    score = loaded.get('score', instance.score)
+    Title.objects.filter(pk=title_id).apply_review_delta(-score, -1)
+    apply_score_delta(title_id, score, -1)
+
+
+@receiver(post_save, sender=Comment)
+def update_comment_count_on_save(sender, instance, created, raw=False,
+                                 **kwargs):
+    if created and not raw:
+        Review.objects.filter(pk=instance.review_id).apply_comment_delta(1)
+
+
+@receiver(soft_deleted, sender=Comment)
+def update_comment_count_on_soft_delete(sender, instance, **kwargs):
+    Review.objects.filter(pk=instance.review_id).apply_comment_delta(-1)
+
+
+@receiver(soft_deleted, sender=User)
+def hide_author_comments(sender, instance, **kwargs):
+    # Комментарии удаленного автора помечаются сразу, и счетчики их
+    # отзывов уменьшаются одним UPDATE, а не только при purge_deleted.
+    comments = Comment.objects.filter(author=instance)
+    comments.uncount()
+    comments.update(deleted_at=instance.deleted_at)
+
+
+@receiver(pre_delete, sender=User)
+def uncount_author_comments(sender, instance, **kwargs):
+    # Комментарии удаляемого пользователя уходят каскадом мимо
+    # Comment.delete(). Обработчик на User, а не на Comment: сигналы
+    # комментариев лишили бы их быстрого каскада вместе с отзывом.
+    Comment.objects.filter(author=instance).uncount()
+
+
+@receiver(soft_deleted, sender=User)
+def hide_author_reviews(sender, instance, **kwargs):
+    # Отзывы удаленного автора сразу уходят из рейтинга и помечаются
+    # удаленными, как его комментарии: post_delete при purge_deleted их
+    # пропустит. У автора не больше одного отзыва на произведение.
+    reviews = Review.objects.filter(author=instance)
+    for title_id, score in reviews.values_list('title_id', 'score'):
+        Title.objects.filter(pk=title_id).apply_review_delta(-score, -1)
+        apply_score_delta(title_id, score, -1)
+    reviews.update(deleted_at=instance.deleted_at)
+
+
+@receiver(post_save, sender=Title)
+@receiver(post_save, sender=Review)
+@receiver(post_save, sender=Comment)
+def update_search_vector_on_save(sender, instance, raw=False,
+                                 update_fields=None, **kwargs):
+    if raw:
+        return
+    fields = {field for field, _ in SEARCH_FIELDS[sender]}
+    if update_fields is not None and not fields & set(update_fields):
+        return
+    update_search_vector(sender.objects.filter(pk=instance.pk))
+
+
+@receiver(post_save, sender=Category)
+@receiver(pre_delete, sender=Category)
+def touch_category_titles(sender, instance, created=False, raw=False,
+                          **kwargs):
+    # Категория и жанры входят в ответ произведения, поэтому их изменение
+    # сдвигает Title.modified (по нему считаются ETag и Last-Modified).
+    if not created and not raw:
+        Title.objects.filter(category=instance).touch()
+
+
+@receiver(post_save, sender=Genre)
+@receiver(pre_delete, sender=Genre)
+def touch_genre_titles(sender, instance, created=False, raw=False,
+                       **kwargs):
+    if not created and not raw:
+        Title.objects.filter(genre=instance).touch()
+
+
+@receiver(m2m_changed, sender=Title.genre.through)
+def touch_titles_on_genre_change(sender, instance, action, reverse, pk_set,
+                                 **kwargs):
+    if not reverse:
+        if action.startswith('post_'):
+            Title.objects.filter(pk=instance.pk).touch()
+    elif action == 'pre_clear':
+        Title.objects.filter(genre=instance).touch()
+    elif action in ('post_add', 'post_remove') and pk_set:
+        Title.objects.filter(pk__in=pk_set).touch()
@@ -2,8 +2,10 @@ from django.contrib.auth.models import AbstractUser
 from django.db import models
 from django.db.models import Q
 
+from api_yamdb.db.soft_delete import SoftDeleteModel
 
-class User(AbstractUser):
+
+class User(SoftDeleteModel, AbstractUser):
     CHOICES = (
         ('user', 'Пользователь'),
         ('moderator', 'Модератор'),
@@ -16,7 +18,6 @@ class User(AbstractUser):
         blank=True,
     )
     email = models.EmailField(max_length=254, blank=False, unique=True)
-    confirmation_code = models.TextField('Код подтверждения', blank=True)
 
     def __str__(self):
         return self.username
@@ -26,6 +27,16 @@ class User(AbstractUser):
             models.CheckConstraint(check=~Q(username='me'),
                                    name='username_not_me')
         ]
+        indexes = [
+            models.Index(fields=['deleted_at'], name='user_deleted_idx',
+                         condition=Q(deleted_at__isnull=False)),
+        ]
+
+    def get_soft_delete_values(self):
+        # Менеджер пользователей не скрывает удаленных: username и email
+        # остаются занятыми до purge_deleted. Войти уже нельзя.
+        self.is_active = False
+        return {**super().get_soft_delete_values(), 'is_active': False}
 
     @property
     def is_user(self):
@@ -1,9 +1,114 @@
 import sys
 from os.path import abspath, dirname, join
 
+import pytest
+
 root_dir = dirname(dirname(abspath(__file__)))
 sys.path.append(root_dir)
 infra_dir_path = join(root_dir, 'infra')
 
 pytest_plugins = [
 ]
+
+
+@pytest.fixture(scope='session')
+def django_db_modify_db_settings():
+    # Тесты с БД гоняем на SQLite в памяти, чтобы не требовать Postgres.
+    # settings.DATABASES при этом не меняем - его проверяет test_settings.
+    from django.db import connections
+    from django.db.utils import load_backend
+
+    for alias in connections:
+        connections.ensure_defaults(alias)
+        connections.prepare_test_settings(alias)
+        settings_dict = dict(connections.databases[alias],
+                             ENGINE='django.db.backends.sqlite3',
+                             NAME=':memory:')
+        backend = load_backend(settings_dict['ENGINE'])
+        connections[alias] = backend.DatabaseWrapper(settings_dict, alias)
+
+
+@pytest.fixture
+def admin():
+    from users.models import User
+
+    return User.objects.create(username='admin', email='a@ya.ru',
+                               role='admin', bio='Биография')
+
+
+@pytest.fixture
+def admin_client(admin):
+    from .utils import client_for
+
+    return client_for(admin)
+
+
+@pytest.fixture
+def authors():
+    from .utils import create_users
+
+    return create_users(3)
+
+
+@pytest.fixture
+def title():
+    from reviews.models import Title
+
+    return Title.objects.create(name='Title', year=2000, description='')
+
+
+@pytest.fixture(autouse=True)
+def clear_api_cache():
+    # Кэш ответов живет в памяти процесса и пережил бы откат БД между
+    # тестами, а id объектов в новой транзакции повторяются.
+    from django.core.cache import caches
+
+    from api.cache import stats
+
+    for cache in caches.all():
+        cache.clear()
+    stats.reset()
+
+
+@pytest.fixture(autouse=True)
+def clear_user_snapshots():
+    from api.authentication import user_cache
+
+    user_cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def run_on_commit_hooks(monkeypatch):
+    # Тест с django_db идет в транзакции, которая откатывается, и
+    # transaction.on_commit не срабатывает. Фиксацией считаем выход из
+    # внешнего atomic приложения, как в Django 3.2
+    # captureOnCommitCallbacks(execute=True), а вызов вне atomic -
+    # немедленным, как в autocommit.
+    from django.db import connections, transaction
+    from django.db.backends.base.base import BaseDatabaseWrapper
+
+    def depth(connection):
+        return len(connection.savepoint_ids) + connection.in_atomic_block
+
+    test_depth = {alias: depth(connections[alias]) for alias in connections}
+    on_commit = BaseDatabaseWrapper.on_commit
+    atomic_exit = transaction.Atomic.__exit__
+
+    def test_on_commit(connection, func):
+        if (connection.in_atomic_block
+                and depth(connection) == test_depth[connection.alias]):
+            func()
+        else:
+            on_commit(connection, func)
+
+    def test_atomic_exit(atomic, *exc_info):
+        atomic_exit(atomic, *exc_info)
+        connection = transaction.get_connection(atomic.using)
+        if (test_depth[connection.alias]
+                and depth(connection) == test_depth[connection.alias]):
+            hooks, connection.run_on_commit = connection.run_on_commit, []
+            for _, func in hooks:
+                func()
+
+    monkeypatch.setattr(BaseDatabaseWrapper, 'on_commit', test_on_commit)
+    monkeypatch.setattr(transaction.Atomic, '__exit__', test_atomic_exit)
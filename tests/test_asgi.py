@@ -0,0 +1,204 @@
+import asyncio
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+
+import pytest
+from api.authentication import issue_token
+from django.core.management import call_command
+from reviews.models import Category, Title
+
+
+@pytest.fixture
+def application():
+    # Потоки обработчика работают с тем же соединением SQLite в памяти,
+    # что и тест, - как live_server в Django.
+    from django.core.wsgi import get_wsgi_application
+    from django.db import connections
+
+    from api_yamdb.asgi import ThreadedASGIHandler
+
+    connection = connections['default']
+    connection.inc_thread_sharing()
+
+    def share_connection():
+        connections['default'] = connection
+
+    handler = ThreadedASGIHandler(get_wsgi_application(), 1)
+    handler.executor = ThreadPoolExecutor(1, initializer=share_connection)
+    yield handler
+    handler.executor.shutdown()
+    connection.dec_thread_sharing()
+
+
+def call_asgi(application, path, query=b'', headers=(), method='GET',
+              body=b''):
+    # Один запрос к ASGI-приложению без сервера: возвращает сообщения
+    # ответа, как их получил бы uvicorn.
+    scope = {
+        'type': 'http', 'method': method, 'path': path,
+        'query_string': query, 'http_version': '1.1', 'scheme': 'http',
+        'server': ('testserver', 80), 'client': ('127.0.0.1', 5000),
+        'headers': [(b'host', b'testserver'), *headers],
+    }
+    messages = [{'type': 'http.request', 'body': body[:1],
+                 'more_body': bool(body)}]
+    if body:
+        messages.append({'type': 'http.request', 'body': body[1:]})
+    sent = []
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    # Зависший обработчик отменяется, а не вешает тесты.
+    asyncio.run(asyncio.wait_for(application(scope, receive, send), 10))
+    return sent
+
+
+def response_body(sent):
+    return b''.join(message.get('body', b'') for message in sent[1:])
+
+
+@pytest.mark.django_db
+class TestASGI:
+
+    def test_titles_list(self, application):
+        category = Category.objects.create(name='Фильмы', slug='movies')
+        Title.objects.create(name='Фильм', year=2000, description='-',
+                             category=category)
+        sent = call_asgi(application, '/api/v1/titles/',
+                         query=b'category=movies')
+        assert sent[0]['type'] == 'http.response.start'
+        assert sent[0]['status'] == 200, (
+            'Проверьте, что ASGI-приложение отдает список произведений')
+        assert (b'content-type', b'application/json') in sent[0]['headers']
+        assert json.loads(response_body(sent))['count'] == 1
+
+    def test_request_body(self, application, admin):
+        sent = call_asgi(
+            application, '/api/v1/categories/', method='POST',
+            body=json.dumps({'name': 'Книги', 'slug': 'books'}).encode(),
+            headers=[(b'content-type', b'application/json'),
+                     (b'authorization',
+                      f'Bearer {issue_token(admin)}'.encode())])
+        assert sent[0]['status'] == 201, (
+            'Проверьте, что тело запроса по частям доходит до Django')
+        assert Category.objects.filter(slug='books').exists()
+
+    def test_streaming_response(self, application, admin):
+        for number in range(3):
+            Title.objects.create(name=f'Фильм {number}', year=2000,
+                                 description='-')
+        sent = call_asgi(
+            application, '/api/v1/export/titles.ndjson',
+            headers=[(b'authorization',
+                      f'Bearer {issue_token(admin)}'.encode())])
+        assert sent[0]['status'] == 200
+        assert sent[-1].get('more_body', False) is False, (
+            'Проверьте, что поток ответа завершается')
+        lines = response_body(sent).decode().splitlines()
+        assert len(lines) == 3, (
+            'Проверьте, что потоковый ответ передается через ASGI')
+
+    @pytest.mark.parametrize('fail', ['call', 'body'])
+    def test_application_error(self, fail):
+        from api_yamdb.asgi import ThreadedASGIHandler
+
+        class Body:
+            closed = False
+
+            def __iter__(self):
+                raise RuntimeError('ошибка при чтении тела')
+
+            def close(self):
+                self.closed = True
+
+        body = Body()
+
+        def wsgi_application(environ, start_response):
+            if fail == 'call':
+                raise RuntimeError('ошибка приложения')
+            start_response('200 OK', [('Content-Type', 'text/plain')])
+            return body
+
+        handler = ThreadedASGIHandler(wsgi_application, 1)
+        sent = call_asgi(handler, '/')
+        handler.executor.shutdown()
+        assert sent[0]['status'] == 500, (
+            'Проверьте, что ошибка приложения дает ответ 500, а не '
+            'зависший запрос')
+        assert response_body(sent) == b'Internal Server Error'
+        assert fail == 'call' or body.closed
+
+    def test_lifespan(self):
+        from api_yamdb.asgi import ThreadedASGIHandler
+
+        handler = ThreadedASGIHandler(None, 1)
+        messages = [{'type': 'lifespan.startup'},
+                    {'type': 'lifespan.shutdown'}]
+        sent = []
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message['type'])
+
+        asyncio.run(handler({'type': 'lifespan'}, receive, send))
+        assert sent == ['lifespan.startup.complete',
+                        'lifespan.shutdown.complete']
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        body = b'{"count": 0}'
+        if self.path == '/chunked':
+            self.send_response(200)
+            self.send_header('Transfer-Encoding', 'chunked')
+            self.end_headers()
+            self.wfile.write(b'%x\r\n%s\r\n0\r\n\r\n' % (len(body), body))
+            return
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_address[1]}'
+    server.shutdown()
+    server.server_close()
+
+
+class TestLoadTest:
+
+    @pytest.mark.parametrize('path', ['/titles', '/chunked'])
+    def test_load_test(self, server, path, tmp_path):
+        output = tmp_path / 'asgi.json'
+        stdout = StringIO()
+        call_command('load_test', server + path, concurrency=4,
+                     duration=0.3, warmup=0, idle_connections=2,
+                     label='asgi', output=str(output), stdout=stdout)
+        result = json.loads(output.read_text())
+        assert result['requests'] > 0 and result['errors'] == 0, (
+            'Проверьте, что load_test читает ответы через keep-alive')
+        assert result['statuses'] == {'200': result['requests']}
+        assert {'rps', 'p50_ms', 'p95_ms', 'p99_ms'} <= set(result)
+        call_command('load_test', server + path, concurrency=2,
+                     duration=0.2, warmup=0, compare=str(output),
+                     stdout=stdout)
+        assert 'asgi -> прогон: RPS ' in stdout.getvalue()
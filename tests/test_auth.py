@@ -0,0 +1,33 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from outbox.models import OutgoingEmail
+from rest_framework.test import APIClient
+
+
+@pytest.mark.django_db
+class TestConfirmationCode:
+
+    def test_signup_and_token(self):
+        client = APIClient()
+        with CaptureQueriesContext(connection) as context:
+            response = client.post('/api/v1/auth/signup/', {
+                'username': 'newuser', 'email': 'new@ya.ru'})
+        assert response.status_code == 200
+        user_writes = [
+            query['sql'] for query in context.captured_queries
+            if 'users_user' in query['sql']
+            and query['sql'].startswith(('INSERT', 'UPDATE'))
+        ]
+        assert len(user_writes) == 1, (
+            'Проверьте, что signup записывает пользователя одним INSERT'
+        )
+
+        code = OutgoingEmail.objects.get().body
+        response = client.post('/api/v1/auth/token/', {
+            'username': 'newuser', 'confirmation_code': 'wrong'})
+        assert response.status_code == 400
+        response = client.post('/api/v1/auth/token/', {
+            'username': 'newuser', 'confirmation_code': code})
+        assert response.status_code == 200
+        assert response.data
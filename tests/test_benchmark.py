@@ -0,0 +1,53 @@
+import json
+
+import pytest
+from django.core.management import CommandError, call_command
+from django.db.models import Sum
+from reviews.models import Comment, Review, Title
+from users.models import User
+
+SEED = dict(users=2, categories=2, genres=3, titles=10, reviews=35,
+            comments=20, batch_size=7)
+
+
+@pytest.mark.django_db
+class TestBenchmark:
+
+    def test_seed_data(self):
+        call_command('seed_data', **SEED)
+        assert Title.objects.count() == 10
+        assert Review.objects.count() == 35
+        assert Comment.objects.count() == 20
+        assert User.objects.count() == 4, (
+            'Проверьте, что авторов хватает на уникальные пары '
+            '(автор, произведение)'
+        )
+        assert Title.genre.through.objects.count() == 20
+        assert Title.objects.aggregate(
+            total=Sum('rating_count'))['total'] == 35, (
+            'Проверьте, что рейтинг пересчитывается после заполнения'
+        )
+        call_command('seed_data', **SEED)
+        assert Review.objects.count() == 70
+
+    def test_benchmark_and_compare(self, tmp_path):
+        call_command('seed_data', **SEED)
+        output = tmp_path / 'result.json'
+        call_command('benchmark_api', requests=3, warmup=1,
+                     output=str(output))
+        result = json.loads(output.read_text(encoding='utf-8'))
+        assert result['meta']['rows']['review'] == 35
+        titles = result['endpoints']['titles_list']
+        assert titles['p50_ms'] <= titles['p95_ms'] <= titles['p99_ms']
+        assert titles['queries'] > 0
+        assert titles['peak_memory_kb'] > 0
+
+        call_command('benchmark_api', requests=3, warmup=0,
+                     endpoints='titles_list', compare=str(output),
+                     threshold=1000)
+        result['endpoints']['titles_list']['queries'] = 0
+        output.write_text(json.dumps(result), encoding='utf-8')
+        with pytest.raises(CommandError):
+            call_command('benchmark_api', requests=3, warmup=0,
+                         endpoints='titles_list', compare=str(output),
+                         threshold=1000)
@@ -0,0 +1,82 @@
+import json
+
+import pytest
+from django.core.management import call_command
+from reviews.models import Comment, Review, Title
+from users.models import User
+
+FILES = {
+    'categories.csv': 'name,slug\nФильмы,movies\nКниги,books\n',
+    'genres.csv': 'name,slug\nДрама,drama\nКомедия,comedy\n',
+    'users.csv': 'username,email,role,bio,first_name,last_name\n'
+                 'alice,alice@ya.ru,,,,\nbob,bob@ya.ru,moderator,,,\n',
+    'titles.csv': 'id,name,year,description,category\n'
+                  '10,Матрица,1999,,movies\n11,Идиот,1869,,books\n'
+                  '12,Без категории,2000,,\n',
+    'title_genres.csv': 'title,genre\n10,drama\n10,comedy\n11,drama\n'
+                        '99,drama\n',
+    'reviews.ndjson': '\n'.join(json.dumps(row) for row in (
+        {'id': 1, 'title': 10, 'author': 'alice', 'text': 'Отлично',
+         'score': 9, 'pub_date': '2020-01-02T03:04:05+00:00'},
+        {'id': 2, 'title': 10, 'author': 'bob', 'text': 'Неплохо',
+         'score': 6, 'pub_date': '2020-01-03T03:04:05+00:00'},
+        {'id': 3, 'title': 10, 'author': 'nobody', 'text': 'Автора нет',
+         'score': 1, 'pub_date': '2020-01-03T03:04:05+00:00'},
+    )),
+    'comments.csv': 'id,review,author,text,pub_date\n'
+                    '1,1,bob,Согласен,2020-01-04T00:00:00+00:00\n',
+}
+
+
+@pytest.fixture
+def catalog_dir(tmp_path):
+    for name, content in FILES.items():
+        (tmp_path / name).write_text(content, encoding='utf-8')
+    return tmp_path
+
+
+@pytest.mark.django_db
+class TestCatalogImport:
+
+    def test_import_all(self, catalog_dir):
+        call_command('import_catalog', 'all', str(catalog_dir),
+                     batch_size=2)
+        assert User.objects.count() == 2
+        assert User.objects.get(username='alice').role == 'user'
+        matrix = Title.objects.get(pk=10)
+        assert matrix.category.slug == 'movies'
+        assert Title.objects.get(pk=12).category is None
+        assert set(matrix.genre.values_list('slug', flat=True)) == {
+            'drama', 'comedy'}
+        assert Review.objects.count() == 2, (
+            'Проверьте, что строки с неизвестным автором пропускаются'
+        )
+        assert Review.objects.get(pk=1).pub_date.year == 2020, (
+            'Проверьте, что дата публикации берется из файла'
+        )
+        assert (matrix.rating_sum, matrix.rating_count, matrix.rating) == (
+            15, 2, 7)
+        assert Comment.objects.get(pk=1).review_id == 1
+
+    def test_import_is_idempotent(self, catalog_dir):
+        call_command('import_catalog', 'all', str(catalog_dir))
+        call_command('import_catalog', 'all', str(catalog_dir))
+        assert Title.objects.count() == 3
+        assert Review.objects.count() == 2
+        assert Title.objects.get(pk=10).rating_count == 2
+
+    def test_export_round_trip(self, catalog_dir, tmp_path):
+        call_command('import_catalog', 'all', str(catalog_dir))
+        export_dir = tmp_path / 'export'
+        call_command('export_catalog', 'all', str(export_dir),
+                     format='csv')
+        lines = (export_dir / 'reviews.csv').read_text().splitlines()
+        assert lines[0] == 'id,title,author,text,score,pub_date'
+        assert lines[1].startswith('1,10,alice,Отлично,9,2020-01-02')
+        Review.objects.all().delete()
+        call_command('import_catalog', 'reviews',
+                     str(export_dir / 'reviews.csv'))
+        assert Review.objects.get(pk=1).pub_date.day == 2
+        exported = (export_dir / 'title_genres.csv').read_text()
+        assert exported.splitlines()[1:] == ['10,drama', '10,comedy',
+                                             '11,drama']
@@ -0,0 +1,125 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from rest_framework.test import APIClient
+from reviews.models import Comment, Review
+from users.models import User
+
+from .utils import assert_constant_queries, client_for, create_users
+
+
+@pytest.fixture
+def authors():
+    return create_users(4)
+
+
+@pytest.fixture
+def reviews(title, authors):
+    return [Review.objects.create(title=title, author=author, text='t',
+                                  score=5) for author in authors]
+
+
+def comment_count(review):
+    return Review.objects.values_list('comment_count', flat=True).get(
+        pk=review.pk)
+
+
+@pytest.mark.django_db
+class TestCommentCount:
+
+    def test_create_and_delete(self, title, authors, reviews):
+        review = reviews[0]
+        url = f'/api/v1/titles/{title.pk}/reviews/{review.pk}/comments/'
+        modified = Review.objects.get(pk=review.pk).modified
+        ids = []
+        for author in authors:
+            response = client_for(author).post(url, {'text': 'комментарий'})
+            assert response.status_code == 201
+            ids.append(response.json()['id'])
+        assert comment_count(review) == 4
+        assert Review.objects.get(pk=review.pk).modified > modified, (
+            'Проверьте, что новый комментарий сдвигает Review.modified')
+
+        response = client_for(authors[1]).delete(f'{url}{ids[1]}/')
+        assert response.status_code == 204
+        assert comment_count(review) == 3
+        assert comment_count(reviews[1]) == 0
+
+    def test_bulk_and_cascade_delete(self, authors, reviews):
+        for review in reviews[:2]:
+            for author in authors:
+                Comment.objects.create(review=review, author=author,
+                                       text='t')
+        Comment.objects.filter(author__in=authors[:2]).delete()
+        counts = [comment_count(review) for review in reviews]
+        assert counts == [2, 2, 0, 0], (
+            'Проверьте, что удаление комментариев через QuerySet '
+            'уменьшает счетчики их отзывов')
+        authors[2].soft_delete()
+        authors[3].delete()
+        assert comment_count(reviews[0]) == comment_count(reviews[1]) == 0, (
+            'Проверьте, что комментарии, удаленные каскадом вместе с '
+            'пользователем, вычитаются из счетчиков')
+
+    def test_read_only(self, title, authors, reviews):
+        url = f'/api/v1/titles/{title.pk}/reviews/{reviews[0].pk}/'
+        response = client_for(authors[0]).patch(url, {'comment_count': 99})
+        assert response.status_code == 200
+        assert response.json()['comment_count'] == 0, (
+            'Проверьте, что comment_count нельзя изменить через API')
+
+    @pytest.mark.parametrize('compiled', [False, True])
+    def test_payload_and_ordering(self, settings, title, authors, reviews,
+                                  compiled):
+        settings.API_COMPILED_SERIALIZERS = compiled
+        for index, review in enumerate(reviews):
+            for author in authors[:index]:
+                Comment.objects.create(review=review, author=author,
+                                       text='t')
+        url = f'/api/v1/titles/{title.pk}/reviews/'
+        results = APIClient().get(
+            f'{url}?ordering=-comment_count').json()['results']
+        assert [row['comment_count'] for row in results] == [3, 2, 1, 0], (
+            'Проверьте сортировку ?ordering=-comment_count')
+        assert [row['id'] for row in results] == [
+            review.pk for review in reversed(reviews)]
+        results = APIClient().get(
+            f'{url}?ordering=comment_count').json()['results']
+        assert [row['comment_count'] for row in results] == [0, 1, 2, 3]
+
+    def test_constant_queries(self, title):
+        url = f'/api/v1/titles/{title.pk}/reviews/'
+
+        def fill(size):
+            for index in range(title.reviews.count(), size):
+                author = User.objects.create(username=f'author{index}',
+                                             email=f'a{index}@ya.ru')
+                review = Review.objects.create(title=title, author=author,
+                                               text='t', score=5)
+                Comment.objects.create(review=review, author=author,
+                                       text='t')
+
+        assert_constant_queries(APIClient(), url, fill)
+
+    def test_reconcile(self, authors, reviews):
+        for author in authors:
+            Comment.objects.create(review=reviews[0], author=author,
+                                   text='t')
+        # Счетчики, сбитые загрузкой в обход моделей.
+        Review.objects.filter(pk=reviews[0].pk).update(comment_count=3)
+        Review.objects.filter(pk=reviews[1].pk).update(comment_count=7)
+
+        stdout = StringIO()
+        call_command('reconcile_comment_counts', dry_run=True,
+                     stdout=stdout)
+        assert 'с расхождениями: 2 (dry run)' in stdout.getvalue()
+        assert comment_count(reviews[0]) == 3
+
+        stdout = StringIO()
+        call_command('reconcile_comment_counts', batch_size=2,
+                     stdout=stdout)
+        assert 'Проверено отзывов: 4, с расхождениями: 2' in (
+            stdout.getvalue())
+        assert comment_count(reviews[0]) == 4
+        assert comment_count(reviews[1]) == 0
@@ -0,0 +1,145 @@
+from datetime import timedelta
+from io import StringIO
+
+import pytest
+from api.compiled import CompiledSerializer
+from api.pagination import KeysetPagination
+from api.serializers import (CommentSerializer, ReviewSerializer,
+                             TitleReadSerializer)
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from reviews.models import Category, Comment, Genre, Review, Title
+from users.models import User
+
+from .utils import count_queries
+
+
+@pytest.fixture
+def catalog():
+    authors = [User.objects.create(username=f'user{i}', email=f'u{i}@ya.ru')
+               for i in range(4)]
+    category = Category.objects.create(name='Фильмы', slug='movies')
+    genres = [Genre.objects.create(name=f'Жанр {i}', slug=f'genre-{i}')
+              for i in range(3)]
+    titles = []
+    for number in range(6):
+        title = Title.objects.create(
+            name=f'Фильм «{number}»', year=1990 + number,
+            description='Описание\nв две строки',
+            category=category if number % 3 else None)
+        # Жанры в обратном порядке: в ответе они все равно по pk.
+        title.genre.set(genres[number % 3::-1])
+        titles.append(title)
+    now = timezone.now()
+    for index, author in enumerate(authors):
+        for title in titles[:5]:
+            review = Review.objects.create(
+                title=title, author=author, score=index + 5, text='Отзыв')
+            # Одинаковое время у нескольких отзывов: курсор различает их по id.
+            Review.objects.filter(pk=review.pk).update(
+                pub_date=now - timedelta(minutes=index // 2,
+                                         microseconds=index))
+    review = Review.objects.filter(title=titles[0]).first()
+    for author in authors:
+        Comment.objects.create(review=review, author=author, text='Коммент')
+    return titles
+
+
+def render(data):
+    return JSONRenderer().render(data)
+
+
+def both(client, url, settings):
+    # Ответ API с обычными и с компилированными сериализаторами.
+    contents = []
+    for compiled in (False, True):
+        settings.API_COMPILED_SERIALIZERS = compiled
+        caches['default'].clear()
+        response = client.get(url)
+        assert response.status_code == 200
+        contents.append(response.content)
+    return contents
+
+
+@pytest.mark.django_db
+class TestCompiledSerializers:
+
+    @pytest.mark.parametrize('serializer_class, get_queryset', [
+        (TitleReadSerializer, lambda: Title.objects.for_read()),
+        (ReviewSerializer,
+         lambda: Review.objects.select_related('author', 'title')),
+        (CommentSerializer, lambda: Comment.objects.select_related('author')),
+    ])
+    def test_parity(self, catalog, serializer_class, get_queryset):
+        compiled = CompiledSerializer(serializer_class)
+        queryset = get_queryset().order_by('pk')
+        expected = serializer_class(queryset, many=True).data
+        assert render(compiled.serialize(compiled.values(queryset))) == (
+            render(expected)), (
+            f'Проверьте, что CompiledSerializer({serializer_class.__name__})'
+            f' дает тот же JSON')
+
+    @pytest.mark.parametrize('url', [
+        '/api/v1/titles/',
+        '/api/v1/titles/?ordering=-rating',
+        '/api/v1/titles/?genre=genre-0&ordering=year',
+        '/api/v1/titles/?page=2',
+        '/api/v1/titles/{title}/reviews/',
+        '/api/v1/titles/{title}/reviews/?pagination=cursor',
+        '/api/v1/titles/{title}/reviews/{review}/comments/',
+    ])
+    def test_api_parity(self, catalog, settings, monkeypatch, url):
+        monkeypatch.setattr(PageNumberPagination, 'page_size', 4)
+        title = catalog[0]
+        url = url.format(title=title.pk, review=title.reviews.first().pk)
+        drf, compiled = both(APIClient(), url, settings)
+        assert drf == compiled, (
+            f'Проверьте, что {url} отдает тот же JSON в обоих режимах')
+
+    def test_cursor_pages(self, catalog, settings, monkeypatch):
+        monkeypatch.setattr(KeysetPagination, 'page_size', 3)
+        client = APIClient()
+        url = f'/api/v1/titles/{catalog[0].pk}/reviews/?pagination=cursor'
+        pages = 0
+        while url:
+            drf, compiled = both(client, url, settings)
+            assert drf == compiled, (
+                'Проверьте курсор KeysetPagination по строкам из .values()')
+            url = client.get(url).json()['next']
+            pages += 1
+        assert pages > 1
+
+    def test_fewer_queries(self, catalog, settings):
+        client = APIClient()
+        url = '/api/v1/titles/'
+        settings.API_COMPILED_SERIALIZERS = False
+        drf = count_queries(client, url)
+        caches['default'].clear()
+        settings.API_COMPILED_SERIALIZERS = True
+        assert count_queries(client, url) <= drf, (
+            'Проверьте, что компилированный режим не добавляет запросов')
+
+    def test_unsupported_field(self):
+        class Serializer(serializers.ModelSerializer):
+            upper = serializers.SerializerMethodField()
+
+            class Meta:
+                model = Category
+                fields = ('name', 'upper')
+
+        with pytest.raises(ImproperlyConfigured):
+            CompiledSerializer(Serializer).plan
+
+    def test_benchmark(self, catalog):
+        stdout = StringIO()
+        call_command('benchmark_serializers', rows=10, repeat=1,
+                     stdout=stdout)
+        output = stdout.getvalue()
+        assert output.count('совпадает') == 3, (
+            'Проверьте, что benchmark_serializers сверяет JSON')
@@ -0,0 +1,98 @@
+from datetime import timedelta
+from unittest import mock
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from reviews.models import Comment, Review, Title
+from users.models import User
+
+
+@pytest.fixture
+def review():
+    author = User.objects.create(username='author', email='a@ya.ru')
+    title = Title.objects.create(name='Title', year=2000, description='')
+    return Review.objects.create(title=title, author=author, text='t',
+                                 score=5)
+
+
+def get(url, **headers):
+    with CaptureQueriesContext(connection) as context:
+        response = APIClient().get(url, **headers)
+    return response, len(context.captured_queries)
+
+
+@pytest.mark.django_db
+class TestConditionalGet:
+
+    def test_reviews_not_modified(self, review):
+        url = f'/api/v1/titles/{review.title_id}/reviews/'
+        response, _ = get(url)
+        assert response.status_code == 200
+        etag = response['ETag']
+        assert response.has_header('Last-Modified')
+
+        response, queries = get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 304, (
+            'Проверьте, что повторный опрос с If-None-Match получает 304'
+        )
+        assert not response.content
+        assert queries <= 2
+
+        response, _ = get(
+            url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        assert response.status_code == 304
+
+    def test_changes_update_etag(self, review):
+        url = f'/api/v1/titles/{review.title_id}/reviews/'
+        etag = get(url)[0]['ETag']
+        review.text = 'edited'
+        review.save()
+        response, _ = get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200
+        assert response['ETag'] != etag
+
+        etag = response['ETag']
+        Title.objects.filter(pk=review.title_id).get().save()
+        assert get(url, HTTP_IF_NONE_MATCH=etag)[0].status_code == 200, (
+            'Проверьте, что изменение произведения меняет ETag отзывов'
+        )
+
+    def test_comments_and_titles(self, review):
+        Comment.objects.create(review=review, author=review.author,
+                               text='c')
+        url = (f'/api/v1/titles/{review.title_id}/reviews/'
+               f'{review.pk}/comments/')
+        etag = get(url)[0]['ETag']
+        assert get(url, HTTP_IF_NONE_MATCH=etag)[0].status_code == 304
+
+        url = f'/api/v1/titles/{review.title_id}/'
+        etag = get(url)[0]['ETag']
+        response, queries = get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 304
+        assert queries == 0, 'Проверьте, что 304 из кэша не ходит в БД'
+
+        review.title.genre.create(name='Рок', slug='rock')
+        assert get(url, HTTP_IF_NONE_MATCH=etag)[0].status_code == 200
+
+    def test_soft_delete_updates_last_modified(self, review):
+        comment, _ = [Comment.objects.create(review=review,
+                                             author=review.author, text=text)
+                      for text in ('c1', 'c2')]
+        other = Title.objects.create(name='Другое', year=2001,
+                                     description='')
+        urls = [f'/api/v1/titles/{review.title_id}/reviews/{review.pk}/'
+                f'comments/', '/api/v1/titles/']
+        stamps = [get(url)[0]['Last-Modified'] for url in urls]
+        # Last-Modified с точностью до секунды: удаление - в следующей.
+        later = timezone.now() + timedelta(seconds=2)
+        with mock.patch('django.utils.timezone.now', return_value=later):
+            comment.soft_delete()
+            other.soft_delete()
+        for url, stamp in zip(urls, stamps):
+            response, _ = get(url, HTTP_IF_MODIFIED_SINCE=stamp)
+            assert response.status_code == 200, (
+                f'Проверьте, что после удаления {url} не отдает 304 '
+                f'по If-Modified-Since')
@@ -0,0 +1,119 @@
+import threading
+
+import pytest
+from api.metrics import registry
+from api_yamdb.db.pool import PoolTimeoutError, get_pool, pools
+
+
+class FakeConnection:
+
+    def __init__(self):
+        self.closed = False
+        self.in_transaction = False
+
+    def close(self):
+        self.closed = True
+
+
+def reset(connection):
+    connection.in_transaction = False
+    return True
+
+
+@pytest.fixture
+def pool():
+    pools.clear()
+    yield get_pool('test', FakeConnection, reset, max_size=2, timeout=0.05)
+    pools.clear()
+
+
+class TestConnectionPool:
+
+    def test_reuses_connections(self, pool):
+        first = pool.acquire()
+        first.in_transaction = True
+        pool.release(first)
+        assert pool.acquire() is first, (
+            'Проверьте, что соединение возвращается в пул, а не закрывается'
+        )
+        assert not first.in_transaction
+        assert pool.stats()['opened'] == 1
+
+    def test_limit_and_timeout(self, pool):
+        connections = [pool.acquire(), pool.acquire()]
+        with pytest.raises(PoolTimeoutError):
+            pool.acquire()
+        stats = pool.stats()
+        assert (stats['in_use'], stats['max_in_use'], stats['timeouts']) == (
+            2, 2, 1)
+        released = threading.Timer(0.01, pool.release, [connections[0]])
+        released.start()
+        pool.timeout = 1
+        assert pool.acquire() is connections[0], (
+            'Проверьте, что поток дожидается освободившегося соединения'
+        )
+        assert pool.stats()['wait_seconds'] > 0
+
+    def test_broken_connection_discarded(self, pool):
+        connection = pool.acquire()
+        pool.release(connection, discard=True)
+        assert connection.closed
+        assert pool.acquire() is not connection
+        assert pool.stats()['in_use'] == 1
+
+    def test_idle_connection_checked(self, pool):
+        checked = []
+
+        def check(connection):
+            checked.append(connection)
+            return False
+
+        pool.check = check
+        pool.check_after = 60
+        first = pool.acquire()
+        pool.release(first)
+        assert pool.acquire() is first, (
+            'Проверьте, что недавно возвращенное соединение не проверяется'
+        )
+        assert not checked
+        pool.release(first)
+        pool.check_after = 0
+        second = pool.acquire()
+        assert checked == [first]
+        assert first.closed and second is not first, (
+            'Проверьте, что соединение, не прошедшее проверку, заменяется'
+        )
+
+    def test_metrics(self, pool):
+        pool.release(pool.acquire())
+        text = registry.render()
+        assert 'api_db_pool_acquired_total{alias="test"} 1' in text
+        assert 'api_db_pool_max_size{alias="test"} 2' in text
+
+    def test_persistent_connection_checks_throttled(self, settings,
+                                                    monkeypatch):
+        from api import signals
+
+        class Wrapper:
+            connection = object()
+            in_atomic_block = False
+            checks = 0
+
+            def is_usable(self):
+                self.checks += 1
+                return True
+
+        wrapper = Wrapper()
+        monkeypatch.setattr(signals.connections, 'all', lambda: [wrapper])
+        settings.DB_CONN_HEALTH_CHECKS = True
+        settings.DB_CONN_HEALTH_CHECK_IDLE = 60
+        for _ in range(3):
+            signals.check_persistent_connections(sender=None)
+        assert wrapper.checks == 1, (
+            'Проверьте, что соединение не проверяется на каждый запрос'
+        )
+
+    def test_backend_importable(self):
+        from api_yamdb.db.postgresql_pool.base import DatabaseWrapper
+
+        assert DatabaseWrapper.vendor == 'postgresql'
@@ -0,0 +1,92 @@
+import json
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+from rest_framework.test import APIClient
+from reviews.models import Category, Genre, Review, Title
+from users.models import User
+
+
+@pytest.fixture
+def catalog():
+    author = User.objects.create(username='author', email='b@ya.ru')
+    category = Category.objects.create(name='Фильмы', slug='movies')
+    drama = Genre.objects.create(name='Драма', slug='drama')
+    titles = []
+    for number in range(5):
+        title = Title.objects.create(name=f'Фильм {number}', year=2000,
+                                     description='', category=category)
+        title.genre.add(drama)
+        Review.objects.create(title=title, author=author, score=8,
+                              text='Текст')
+        titles.append(title)
+    return titles
+
+
+def read_lines(response):
+    assert response.streaming, 'Проверьте, что ответ отдается потоком'
+    content = b''.join(response.streaming_content).decode()
+    return [json.loads(line) for line in content.splitlines()]
+
+
+@pytest.mark.django_db
+class TestExport:
+
+    def test_titles_export(self, admin_client, catalog):
+        response = admin_client.get('/api/v1/export/titles.ndjson')
+        assert response.status_code == 200
+        assert response['Content-Type'].startswith('application/x-ndjson')
+        rows = read_lines(response)
+        assert [row['id'] for row in rows] == [t.pk for t in catalog]
+        assert rows[0]['genre'] == ['drama']
+        assert rows[0]['category'] == 'movies'
+        assert rows[0]['rating'] == 8
+
+    def test_reviews_since(self, admin_client, catalog):
+        since = admin_client.get(
+            '/api/v1/export/reviews.ndjson')['X-Export-Started']
+        review = Review.objects.first()
+        review.text = 'Новый текст'
+        review.save()
+        response = admin_client.get('/api/v1/export/reviews.ndjson',
+                                    {'since': since})
+        rows = read_lines(response)
+        assert [row['id'] for row in rows] == [review.pk], (
+            'Проверьте, что since отбирает только измененные строки'
+        )
+        assert rows[0]['author'] == 'author'
+        future = (timezone.now() + timedelta(days=1)).isoformat()
+        response = admin_client.get('/api/v1/export/reviews.ndjson',
+                                    {'since': future})
+        assert read_lines(response) == []
+
+    def test_since_includes_tombstones(self, admin_client, catalog):
+        since = admin_client.get(
+            '/api/v1/export/titles.ndjson')['X-Export-Started']
+        catalog[0].soft_delete()
+        Review.objects.get(title=catalog[1]).soft_delete()
+        rows = read_lines(admin_client.get('/api/v1/export/titles.ndjson',
+                                           {'since': since}))
+        # Рейтинг второго произведения изменился: оно выгружается целиком.
+        assert [row['id'] for row in rows[:-1]] == [catalog[1].pk]
+        assert rows[-1] == {'id': catalog[0].pk, 'deleted': True}, (
+            'Проверьте, что удаленные произведения выгружаются отметками'
+        )
+        rows = read_lines(admin_client.get('/api/v1/export/reviews.ndjson',
+                                           {'since': since}))
+        assert rows == [
+            {'id': review.pk, 'deleted': True} for review in
+            Review.all_objects.filter(title__in=catalog[:2]).order_by('pk')]
+        rows = read_lines(admin_client.get('/api/v1/export/titles.ndjson'))
+        assert len(rows) == 4 and 'deleted' not in rows[0], (
+            'Проверьте, что полная выгрузка отдает только живые строки'
+        )
+
+    def test_validation_and_permissions(self, admin_client, catalog):
+        assert APIClient().get(
+            '/api/v1/export/titles.ndjson').status_code == 401
+        assert admin_client.get('/api/v1/export/titles.ndjson',
+                                {'since': 'вчера'}).status_code == 400
+        assert admin_client.get(
+            '/api/v1/export/users.ndjson').status_code == 404
@@ -0,0 +1,155 @@
+import datetime
+import decimal
+from io import BytesIO, StringIO
+
+import pytest
+from api import renderers
+from api.cache import get_cache
+from api.parsers import FastJSONParser
+from django.core.management import call_command
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from reviews.models import Category, Genre, Title
+
+PAYLOAD = {
+    'text': 'Кино «Сталкер» – 1979 😀',
+    'separators': 'a\u2028b\u2029c',
+    'quotes': '"\\/\n\t',
+    'date': datetime.datetime(2022, 5, 1, 12, 30, 15, 123456,
+                              tzinfo=datetime.timezone.utc),
+    'day': datetime.date(2022, 5, 1),
+    'decimal': decimal.Decimal('8.50'),
+    'float': 7.25,
+    'big': 2 ** 70,
+    'lazy': gettext_lazy('Ленивая строка'),
+    'keys': {1: 'one', 'two': 2},
+    'empty': [None, True, False, {}, []],
+}
+
+
+@pytest.fixture
+def title():
+    category = Category.objects.create(name='Фильмы', slug='films')
+    genre = Genre.objects.create(name='Драма', slug='drama')
+    title = Title.objects.create(name='Сталкер\u2028', year=1979,
+                                 description='Зона', category=category)
+    title.genre.add(genre)
+    return title
+
+
+@pytest.fixture
+def dumps_calls(monkeypatch):
+    calls = []
+    for backend in renderers.BACKENDS.values():
+        def dumps(data, original=backend.dumps):
+            calls.append(data)
+            return original(data)
+        monkeypatch.setattr(backend, 'dumps', dumps)
+    return calls
+
+
+class TestFastJSONRenderer:
+
+    @pytest.mark.parametrize('backend', sorted(renderers.BACKENDS))
+    def test_parity(self, settings, backend):
+        settings.API_JSON_BACKEND = backend
+        assert renderers.FastJSONRenderer().render(PAYLOAD) == (
+            JSONRenderer().render(PAYLOAD)), (
+            f'Проверьте, что кодировщик {backend} дает JSON как у '
+            f'JSONRenderer')
+
+    def test_line_separators(self):
+        content = renderers.encode(PAYLOAD)
+        assert b'a\\u2028b\\u2029c' in content, (
+            'Проверьте, что U+2028 и U+2029 экранируются, как в DRF')
+
+    def test_none(self):
+        assert renderers.FastJSONRenderer().render(None) == b''
+
+    def test_indent(self):
+        content = renderers.FastJSONRenderer().render(
+            PAYLOAD, 'application/json; indent=2')
+        assert content == JSONRenderer().render(
+            PAYLOAD, 'application/json; indent=2')
+
+    def test_unknown_backend(self, settings):
+        settings.API_JSON_BACKEND = 'simdjson'
+        with pytest.raises(renderers.ImproperlyConfigured):
+            renderers.get_backend()
+
+
+class TestFastJSONParser:
+
+    @pytest.mark.parametrize('backend', sorted(renderers.BACKENDS))
+    def test_parse(self, settings, backend):
+        settings.API_JSON_BACKEND = backend
+        parser = FastJSONParser()
+        assert parser.parse(BytesIO('{"a": ["б", 1.5]}'.encode())) == {
+            'a': ['б', 1.5]}
+        for content in (b'{"a": ', b'NaN', b'\xff'):
+            with pytest.raises(ParseError):
+                parser.parse(BytesIO(content))
+
+    @pytest.mark.django_db
+    def test_invalid_body(self, admin):
+        client = APIClient()
+        client.force_authenticate(admin)
+        response = client.post('/api/v1/categories/', '{"name": ',
+                               content_type='application/json')
+        assert response.status_code == 400, (
+            'Проверьте, что некорректный JSON в теле возвращает 400')
+
+
+@pytest.mark.django_db
+class TestEncodedResponses:
+
+    @pytest.mark.parametrize('url', [
+        '/api/v1/titles/',
+        '/api/v1/titles/{title}/',
+        '/api/v1/categories/',
+        '/api/v1/genres/?search=Др',
+    ])
+    def test_backends_identical(self, settings, title, url):
+        url = url.format(title=title.pk)
+        contents = []
+        for backend in ['json', *sorted(renderers.BACKENDS)]:
+            settings.API_JSON_BACKEND = backend
+            # Без очистки кэша все бэкенды, кроме первого, отдали бы его
+            # байты.
+            get_cache().clear()
+            response = APIClient().get(url)
+            assert response.status_code == 200
+            assert response['X-Cache'] == 'MISS'
+            contents.append(response.content)
+        assert len(set(contents)) == 1, (
+            f'Проверьте, что {url} отдает одинаковый JSON с любым '
+            f'API_JSON_BACKEND')
+
+    def test_cache_hit_not_encoded(self, title, dumps_calls):
+        client = APIClient()
+        first = client.get('/api/v1/titles/')
+        assert first['X-Cache'] == 'MISS'
+        assert len(dumps_calls) == 1, (
+            'Проверьте, что при промахе ответ кодируется один раз')
+        second = client.get('/api/v1/titles/')
+        assert second['X-Cache'] == 'HIT'
+        assert second.content == first.content
+        assert len(dumps_calls) == 1, (
+            'Проверьте, что ответ из кэша отдается уже закодированным')
+
+    def test_browsable_api(self, title):
+        client = APIClient()
+        client.get('/api/v1/categories/')
+        response = client.get('/api/v1/categories/', HTTP_ACCEPT='text/html')
+        assert response['X-Cache'] == 'HIT'
+        assert response['Content-Type'].startswith('text/html')
+        assert '&quot;slug&quot;: &quot;films&quot;' in (
+            response.content.decode())
+
+    def test_benchmark(self, title):
+        stdout = StringIO()
+        call_command('benchmark_json', repeat=1, stdout=stdout)
+        assert stdout.getvalue().count('совпадает') == 3, (
+            'Проверьте, что benchmark_json сверяет JSON с JSONRenderer')
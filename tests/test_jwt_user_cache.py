@@ -0,0 +1,51 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from .utils import client_for
+
+
+def user_queries(client, url):
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(url)
+    return response, [query['sql'] for query in context.captured_queries
+                      if 'users_user' in query['sql']]
+
+
+@pytest.mark.django_db
+class TestJWTUserCache:
+
+    def test_user_loaded_once(self, admin):
+        client = client_for(admin)
+        response, queries = user_queries(client, '/api/v1/users/')
+        assert response.status_code == 200
+        response, queries = user_queries(client, '/api/v1/cache/stats/')
+        assert response.status_code == 200
+        assert not queries, (
+            'Проверьте, что аутентифицированный запрос не читает таблицу '
+            'пользователей повторно'
+        )
+
+    def test_role_change_invalidates(self, admin):
+        client = client_for(admin)
+        assert client.get('/api/v1/cache/stats/').status_code == 200
+        admin.role = 'user'
+        admin.save()
+        assert client.get('/api/v1/cache/stats/').status_code == 403
+
+    def test_deleted_user_rejected(self, admin):
+        client = client_for(admin)
+        assert client.get('/api/v1/cache/stats/').status_code == 200
+        admin.delete()
+        assert client.get('/api/v1/cache/stats/').status_code == 401
+
+    def test_me_returns_full_profile(self, admin):
+        response = client_for(admin).get('/api/v1/users/me/')
+        assert response.data['bio'] == 'Биография'
+
+    def test_token_claims(self, admin, settings):
+        settings.JWT_USER_CLAIMS = True
+        client = client_for(admin)
+        response, queries = user_queries(client, '/api/v1/cache/stats/')
+        assert response.status_code == 200
+        assert not queries
@@ -0,0 +1,49 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from reviews.models import Review, Title
+from users.models import User
+
+
+@pytest.fixture
+def title():
+    title = Title.objects.create(name='Title', year=2000, description='')
+    for i in range(20):
+        author = User.objects.create(username=f'user{i}', email=f'u{i}@ya.ru')
+        Review.objects.create(title=title, author=author, text='t', score=5)
+    return title
+
+
+@pytest.mark.django_db
+class TestKeysetPagination:
+
+    def test_cursor_walks_all_reviews(self, title):
+        client = APIClient()
+        url = f'/api/v1/titles/{title.pk}/reviews/?pagination=cursor'
+        seen = []
+        while url:
+            with CaptureQueriesContext(connection) as context:
+                response = client.get(url)
+            assert response.status_code == 200
+            assert 'count' not in response.data
+            assert not any('COUNT(' in query['sql']
+                           for query in context.captured_queries), (
+                'Проверьте, что курсорная пагинация не считает COUNT(*)'
+            )
+            seen += [review['id'] for review in response.data['results']]
+            url = response.data['next']
+        expected = list(title.reviews.order_by('-pub_date', '-id')
+                        .values_list('id', flat=True))
+        assert seen == expected, (
+            'Проверьте, что курсор обходит все отзывы без пропусков и повторов'
+        )
+
+    def test_page_numbers_by_default(self, title):
+        response = APIClient().get(f'/api/v1/titles/{title.pk}/reviews/')
+        assert response.data['count'] == 20
+
+    def test_invalid_cursor(self, title):
+        response = APIClient().get(
+            f'/api/v1/titles/{title.pk}/reviews/?cursor=broken')
+        assert response.status_code == 404
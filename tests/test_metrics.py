@@ -0,0 +1,74 @@
+import pytest
+from api.metrics import registry
+from rest_framework.test import APIClient
+from reviews.models import Category, Genre, Title
+
+LABELS = 'route="api:titles-list",method="GET"'
+
+
+@pytest.fixture(autouse=True)
+def reset_metrics():
+    registry.reset()
+
+
+@pytest.fixture
+def titles():
+    category = Category.objects.create(name='Фильмы', slug='movies')
+    genre = Genre.objects.create(name='Драма', slug='drama')
+    for number in range(3):
+        title = Title.objects.create(name=f'Фильм {number}', year=2000,
+                                     description='', category=category)
+        title.genre.add(genre)
+
+
+def metric(text, name):
+    for line in text.splitlines():
+        if line.startswith(name + ' '):
+            return float(line.split()[-1])
+    raise AssertionError(f'Метрика {name} не найдена')
+
+
+@pytest.mark.django_db
+class TestMetrics:
+
+    def test_request_metrics(self, titles):
+        client = APIClient()
+        assert client.get('/api/v1/titles/').status_code == 200
+        text = client.get('/metrics').content.decode()
+        assert metric(
+            text, f'api_request_duration_seconds_count{{{LABELS}}}') == 1
+        assert metric(text, f'api_db_queries_sum{{{LABELS}}}') >= 2, (
+            'Проверьте, что считаются SQL-запросы запроса'
+        )
+        assert metric(text, f'api_db_duration_seconds_sum{{{LABELS}}}') > 0
+        assert metric(
+            text, f'api_serializer_duration_seconds_count{{{LABELS}}}') == 1
+        assert metric(text, f'api_response_size_bytes_sum{{{LABELS}}}') > 0
+        assert metric(
+            text, f'api_requests_total{{{LABELS},status="200"}}') == 1
+        assert metric(
+            text, 'api_cache_requests_total{view="titles",result="miss"}'
+        ) == 1
+
+    def test_slow_query_sampling(self, titles, settings):
+        settings.METRICS_SLOW_QUERY_MS = 0
+        APIClient().get('/api/v1/titles/')
+        assert registry.slow_queries, (
+            'Проверьте, что медленные запросы сохраняются'
+        )
+        assert any('api_yamdb' in query['origin']
+                   for query in registry.slow_queries), (
+            'Проверьте, что для запроса сохраняется место вызова в коде'
+        )
+        settings.METRICS_SLOW_QUERY_SAMPLE_RATE = 0
+        registry.reset()
+        APIClient().get('/api/v1/titles/')
+        assert not registry.slow_queries
+
+    def test_token(self, settings):
+        settings.METRICS_TOKEN = 'secret'
+        client = APIClient()
+        assert client.get('/metrics').status_code == 403
+        response = client.get('/metrics',
+                              HTTP_AUTHORIZATION='Bearer secret')
+        assert response.status_code == 200
@@ -0,0 +1,91 @@
+import pytest
+from django.core import mail
+from django.core.mail.backends.base import BaseEmailBackend
+from django.core.management import call_command
+from django.utils import timezone
+from outbox.models import OutgoingEmail
+from rest_framework.test import APIClient
+
+
+class FailingBackend(BaseEmailBackend):
+
+    def send_messages(self, messages):
+        raise ConnectionError('SMTP недоступен')
+
+
+class CrashingBackend(BaseEmailBackend):
+    # Отправляет первое письмо и роняет воркер на втором.
+
+    def send_messages(self, messages):
+        if mail.outbox:
+            raise KeyboardInterrupt
+        mail.outbox.extend(messages)
+        return len(messages)
+
+
+@pytest.mark.django_db
+class TestOutbox:
+
+    def test_signup_enqueues_mail(self):
+        response = APIClient().post('/api/v1/auth/signup/', {
+            'username': 'newuser', 'email': 'new@ya.ru'})
+        assert response.status_code == 200
+        assert not mail.outbox, (
+            'Проверьте, что signup не отправляет письмо синхронно'
+        )
+        email = OutgoingEmail.objects.get()
+        assert email.recipient_list == ['new@ya.ru']
+
+        call_command('send_queued_mail')
+        assert len(mail.outbox) == 1
+        assert mail.outbox[0].to == ['new@ya.ru']
+        email.refresh_from_db()
+        assert email.status == OutgoingEmail.SENT
+
+    def test_failed_mail_is_retried_with_backoff(self, settings):
+        settings.EMAIL_BACKEND = 'tests.test_outbox.FailingBackend'
+        settings.OUTBOX_MAX_ATTEMPTS = 2
+        email = OutgoingEmail.objects.enqueue('s', 'body', 'YaMDb',
+                                              ['a@ya.ru'])
+
+        call_command('send_queued_mail')
+        email.refresh_from_db()
+        assert email.status == OutgoingEmail.PENDING
+        assert email.attempts == 1
+        assert 'SMTP' in email.last_error
+        assert not OutgoingEmail.objects.due().exists(), (
+            'Проверьте, что повтор откладывается на время паузы'
+        )
+
+        OutgoingEmail.objects.update(next_attempt_at=email.created)
+        call_command('send_queued_mail')
+        email.refresh_from_db()
+        assert email.status == OutgoingEmail.FAILED
+
+    def test_crash_does_not_resend(self, settings):
+        settings.EMAIL_BACKEND = 'tests.test_outbox.CrashingBackend'
+        for index in range(3):
+            OutgoingEmail.objects.enqueue('s', 'body', 'YaMDb',
+                                          [f'u{index}@ya.ru'])
+        with pytest.raises(KeyboardInterrupt):
+            call_command('send_queued_mail')
+        assert len(mail.outbox) == 1
+        statuses = list(OutgoingEmail.objects.values_list('status',
+                                                          flat=True))
+        pending = OutgoingEmail.PENDING
+        assert statuses == [OutgoingEmail.SENT, pending, pending], (
+            'Проверьте, что отправленное письмо отмечается сразу, '
+            'а не в конце пачки'
+        )
+        assert not OutgoingEmail.objects.due().exists(), (
+            'Проверьте, что взятые воркером письма не выдаются до конца '
+            'аренды'
+        )
+
+        settings.EMAIL_BACKEND = (
+            'django.core.mail.backends.locmem.EmailBackend')
+        OutgoingEmail.objects.filter(status=pending).update(
+            next_attempt_at=timezone.now())
+        call_command('send_queued_mail')
+        assert [message.to for message in mail.outbox] == [
+            ['u0@ya.ru'], ['u1@ya.ru'], ['u2@ya.ru']]
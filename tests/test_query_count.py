@@ -0,0 +1,72 @@
+import pytest
+from rest_framework.test import APIClient
+from reviews.models import Category, Comment, Genre, Review, Title
+from users.models import User
+
+from .utils import assert_constant_queries
+
+
+@pytest.fixture
+def client():
+    return APIClient()
+
+
+@pytest.fixture
+def category():
+    return Category.objects.create(name='Фильмы', slug='films')
+
+
+@pytest.fixture
+def genres():
+    return [Genre.objects.create(name=f'Жанр {i}', slug=f'genre-{i}')
+            for i in range(2)]
+
+
+@pytest.fixture
+def title(category, genres):
+    title = Title.objects.create(name='Title', year=2000, description='',
+                                 category=category)
+    title.genre.set(genres)
+    return title
+
+
+def make_users(start, stop):
+    return [User.objects.create(username=f'user{i}', email=f'u{i}@ya.ru')
+            for i in range(start, stop)]
+
+
+@pytest.mark.django_db
+class TestQueryCount:
+
+    def test_titles_list(self, client, category, genres):
+        def fill(size):
+            for i in range(Title.objects.count(), size):
+                title = Title.objects.create(
+                    name=f'Title {i}', year=2000, description='',
+                    category=category)
+                title.genre.set(genres)
+
+        assert_constant_queries(client, '/api/v1/titles/', fill)
+
+    def test_reviews_list(self, client, title):
+        url = f'/api/v1/titles/{title.pk}/reviews/'
+
+        def fill(size):
+            for author in make_users(title.reviews.count(), size):
+                Review.objects.create(title=title, author=author,
+                                      text='text', score=5)
+
+        assert_constant_queries(client, url, fill)
+
+    def test_comments_list(self, client, title):
+        author, = make_users(0, 1)
+        review = Review.objects.create(title=title, author=author,
+                                       text='text', score=5)
+        url = f'/api/v1/titles/{title.pk}/reviews/{review.pk}/comments/'
+
+        def fill(size):
+            for user in make_users(100 + review.comments.count(), 100 + size):
+                Comment.objects.create(review=review, author=user,
+                                       text='text')
+
+        assert_constant_queries(client, url, fill)
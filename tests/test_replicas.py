@@ -0,0 +1,167 @@
+from unittest import mock
+
+import pytest
+from django.http import HttpResponse
+from django.test import RequestFactory
+
+REPLICAS = ['replica_1', 'replica_2']
+
+
+@pytest.fixture
+def replicas(settings):
+    # Эмуляция реплик: псевдонимы указывают на то же соединение SQLite,
+    # поэтому видят данные тестовой транзакции.
+    from django.db import connections
+
+    for alias in REPLICAS:
+        connections.databases[alias] = connections['default'].settings_dict
+        connections[alias] = connections['default']
+    settings.DB_REPLICAS = REPLICAS
+    settings.DB_REPLICA_SELECTION = 'round_robin'
+    settings.DATABASE_ROUTERS = ['api_yamdb.db.replicas.ReplicaRouter']
+    yield
+    for alias in REPLICAS:
+        del connections.databases[alias]
+        delattr(connections._connections, alias)
+
+
+def route(method='get', token=None, write=False, status=200, **headers):
+    # Прогоняет запрос через middleware и возвращает, куда ушло чтение.
+    from reviews.models import Title
+
+    from api_yamdb.db.replicas import ReplicaMiddleware
+
+    used = []
+
+    def view(request):
+        if write:
+            Title.objects.create(name='Фильм', year=2000, description='-')
+        used.append(Title.objects.all().db)
+        return HttpResponse(status=status)
+
+    if token:
+        headers['HTTP_AUTHORIZATION'] = f'Bearer {token}'
+    request = getattr(RequestFactory(), method)('/api/v1/titles/', **headers)
+    ReplicaMiddleware(view)(request)
+    return used[0]
+
+
+@pytest.mark.django_db(transaction=True)
+class TestReplicaRouting:
+
+    def test_safe_requests_read_from_replicas(self, replicas):
+        used = {route() for _ in range(4)}
+        assert used == set(REPLICAS), (
+            'Проверьте, что GET-запросы по кругу читают с реплик')
+
+    def test_writes_use_primary(self, replicas):
+        assert route('post') == 'default', (
+            'Проверьте, что небезопасные запросы читают с primary')
+
+    def test_read_your_writes(self, replicas):
+        route('post', token='author', write=True)
+        assert route(token='author') == 'default', (
+            'Проверьте, что после записи клиент читает с primary')
+        assert route(token='reader') in REPLICAS, (
+            'Проверьте, что метка primary не действует на других клиентов')
+
+    def test_read_your_writes_expires(self, replicas, settings):
+        settings.DB_READ_YOUR_WRITES_SECONDS = -1
+        route('post', token='author', write=True)
+        assert route(token='author') in REPLICAS, (
+            'Проверьте, что метка primary истекает')
+
+    def test_only_successful_writes_pin(self, replicas):
+        from django.db import router
+        from reviews.models import Title
+
+        route('post', token='author', write=True, status=400)
+        route('post', token='author')
+        assert router.db_for_write(Title) == 'default'
+        assert route(token='author') in REPLICAS, (
+            'Проверьте, что отклоненный запрос и запрос без записи не '
+            'ставят метку primary')
+
+    def test_anonymous_clients_by_real_ip(self, replicas):
+        route('post', write=True, HTTP_X_REAL_IP='10.0.0.1')
+        assert route(HTTP_X_REAL_IP='10.0.0.1') == 'default'
+        assert route(HTTP_X_REAL_IP='10.0.0.2') in REPLICAS, (
+            'Проверьте, что за nginx анонимные клиенты различаются по '
+            'X-Real-IP, а не по адресу прокси')
+
+    def test_write_in_safe_request_pins_primary(self, replicas):
+        assert route(write=True) == 'default', (
+            'Проверьте, что после записи в запросе чтение идет с primary')
+        assert route() == 'default', (
+            'Проверьте, что запись в GET-запросе тоже ставит метку primary')
+
+    def test_outside_request_uses_primary(self, replicas):
+        from reviews.models import Title
+
+        route()
+        assert Title.objects.all().db == 'default', (
+            'Проверьте, что вне запросов чтение идет с primary')
+
+    def test_transaction_uses_primary(self, replicas):
+        from django.db import transaction
+        from reviews.models import Title
+
+        from api_yamdb.db.replicas import _state
+
+        _state.replicas = True
+        try:
+            with transaction.atomic():
+                used = Title.objects.all().db
+        finally:
+            _state.replicas = False
+        assert used == 'default', (
+            'Проверьте, что чтение в транзакции идет с primary')
+
+    def test_least_lag(self, replicas, settings):
+        from api_yamdb.db.replicas import selector
+
+        settings.DB_REPLICA_SELECTION = 'least_lag'
+        settings.DB_REPLICA_MAX_LAG = 5
+        selector._checked = None
+        assert route() in REPLICAS, (
+            'Проверьте выбор реплики с наименьшим отставанием')
+        selector._lags = {alias: 10.0 for alias in REPLICAS}
+        assert route() == 'default', (
+            'Проверьте, что отставшие реплики пропускаются')
+        selector._checked = None
+
+    def test_api_through_replicas(self, replicas, settings, client):
+        from reviews.models import Category
+
+        Category.objects.create(name='Кино', slug='movie')
+        settings.MIDDLEWARE = (settings.MIDDLEWARE[:1]
+                               + ['api_yamdb.db.replicas.ReplicaMiddleware']
+                               + settings.MIDDLEWARE[1:])
+        response = client.get('/api/v1/categories/')
+        assert response.status_code == 200
+        assert response.json()['count'] == 1, (
+            'Проверьте, что API отдает данные при чтении с реплик')
+
+    def test_cache_miss_reads_from_primary(self, replicas, settings, client):
+        from api_yamdb.db.replicas import ReplicaRouter
+
+        settings.MIDDLEWARE = (settings.MIDDLEWARE[:1]
+                               + ['api_yamdb.db.replicas.ReplicaMiddleware']
+                               + settings.MIDDLEWARE[1:])
+        used = []
+        db_for_read = ReplicaRouter.db_for_read
+
+        def spy(router, model, **hints):
+            used.append(db_for_read(router, model, **hints))
+            return used[-1]
+
+        with mock.patch.object(ReplicaRouter, 'db_for_read', spy):
+            response = client.get('/api/v1/categories/')
+            assert response['X-Cache'] == 'MISS'
+            assert used and set(used) == {'default'}, (
+                'Проверьте, что промах кэша читает с primary: иначе в кэш '
+                'попадут данные отставшей реплики')
+            used.clear()
+            route()
+        assert set(used) <= set(REPLICAS), (
+            'Проверьте, что после промаха чтение снова идет с реплик')
@@ -0,0 +1,94 @@
+import pytest
+from api.authentication import user_cache
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from reviews.models import Category, Genre, Review, Title
+from users.models import User
+
+
+@pytest.fixture
+def title():
+    category = Category.objects.create(name='Фильмы', slug='films')
+    return Title.objects.create(name='Title', year=2000, description='',
+                                category=category)
+
+
+def get(url, user=None):
+    client = APIClient()
+    if user is not None:
+        client.force_authenticate(user)
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(url)
+    assert response.status_code == 200
+    return response, len(context.captured_queries)
+
+
+@pytest.mark.django_db
+class TestResponseCache:
+
+    def test_second_read_skips_database(self, title):
+        first, _ = get('/api/v1/titles/')
+        second, queries = get('/api/v1/titles/')
+        assert first['X-Cache'] == 'MISS'
+        assert second['X-Cache'] == 'HIT'
+        assert queries == 0, 'Проверьте, что ответ из кэша не ходит в БД'
+        assert second.data == first.data
+
+    def test_writes_invalidate(self, title):
+        get('/api/v1/titles/')
+        get(f'/api/v1/titles/{title.pk}/')
+        get('/api/v1/categories/')
+
+        Category.objects.filter(pk=title.category_id).get().save()
+        assert get('/api/v1/titles/')[0]['X-Cache'] == 'MISS'
+        assert get(f'/api/v1/titles/{title.pk}/')[0]['X-Cache'] == 'MISS'
+        assert get('/api/v1/categories/')[0]['X-Cache'] == 'MISS'
+
+        author = User.objects.create(username='author', email='a@ya.ru')
+        Review.objects.create(title=title, author=author, text='t', score=8)
+        response, _ = get(f'/api/v1/titles/{title.pk}/')
+        assert response['X-Cache'] == 'MISS'
+        assert response.data['rating'] == 8
+
+        genre = Genre.objects.create(name='Рок', slug='rock')
+        get('/api/v1/genres/')
+        title.genre.add(genre)
+        assert get('/api/v1/genres/')[0]['X-Cache'] == 'HIT'
+        response, _ = get(f'/api/v1/titles/{title.pk}/')
+        assert response['X-Cache'] == 'MISS'
+        assert response.data['genre'] == [{'name': 'Рок', 'slug': 'rock'}]
+
+    def test_invalidation_waits_for_commit(self, title):
+        url = f'/api/v1/titles/{title.pk}/'
+        author = User.objects.create(username='author', email='a@ya.ru')
+        get(url)
+        with transaction.atomic():
+            Review.objects.create(title=title, author=author, text='t',
+                                  score=8)
+            # Чтение до фиксации: версии еще старые, и то, что прочитал бы
+            # параллельный запрос, не попадает под новую версию.
+            response, _ = get(url)
+            assert response['X-Cache'] == 'HIT'
+            assert response.data['rating'] is None
+        response, _ = get(url)
+        assert response['X-Cache'] == 'MISS', (
+            'Проверьте, что кэш сбрасывается после фиксации транзакции')
+        assert response.data['rating'] == 8
+
+        with transaction.atomic():
+            author.save()
+            user_cache.set(author.pk, ('снимок до фиксации',))
+        assert user_cache.get(author.pk) is None, (
+            'Проверьте, что снимок пользователя сбрасывается после фиксации')
+
+    def test_roles_are_cached_separately(self, title, admin):
+        get('/api/v1/titles/')
+        assert get('/api/v1/titles/', admin)[0]['X-Cache'] == 'MISS'
+
+    def test_stats(self, title, admin):
+        get('/api/v1/titles/')
+        get('/api/v1/titles/')
+        response, _ = get('/api/v1/cache/stats/', admin)
+        assert response.data['titles'] == {'hits': 1, 'misses': 1}
+        assert APIClient().get('/api/v1/cache/stats/').status_code == 401
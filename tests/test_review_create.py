@@ -0,0 +1,62 @@
+import pytest
+from api.serializers import ReviewSerializer
+from django.db import IntegrityError, connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from reviews.models import Review
+from users.models import User
+
+
+@pytest.fixture
+def client():
+    user = User.objects.create(username='author', email='a@ya.ru')
+    client = APIClient()
+    client.force_authenticate(user)
+    return client
+
+
+@pytest.mark.django_db
+class TestReviewCreate:
+
+    def test_create_query_count(self, client, title):
+        url = f'/api/v1/titles/{title.pk}/reviews/'
+        with CaptureQueriesContext(connection) as context:
+            response = client.post(url, {'text': 'text', 'score': 7})
+        assert response.status_code == 201
+        # Точки сохранения появляются только из-за транзакции самого теста.
+        queries = [query['sql'] for query in context.captured_queries
+                   if 'SAVEPOINT' not in query['sql']]
+        # Произведение, INSERT отзыва, UPDATE рейтинга произведения
+        # и UPDATE распределения оценок.
+        assert len(queries) == 4, (
+            'Проверьте, что создание отзыва не делает лишних запросов:\n'
+            + '\n'.join(queries)
+        )
+
+    def test_duplicate_review_is_bad_request(self, client, title):
+        url = f'/api/v1/titles/{title.pk}/reviews/'
+        assert client.post(url, {'text': 'a', 'score': 7}).status_code == 201
+        response = client.post(url, {'text': 'b', 'score': 3})
+        assert response.status_code == 400, (
+            'Проверьте, что повторный отзыв на произведение возвращает 400'
+        )
+        assert response.json() == {'non_field_errors': [
+            'Вы можете написать только один отзыв на произведение']}
+        assert Review.objects.count() == 1
+        title.refresh_from_db()
+        assert (title.rating_sum, title.rating_count) == (7, 1)
+
+    def test_other_integrity_errors_not_masked(self, client, title,
+                                               monkeypatch):
+        def save(serializer, **kwargs):
+            raise IntegrityError('FOREIGN KEY constraint failed')
+
+        monkeypatch.setattr(ReviewSerializer, 'save', save)
+        with pytest.raises(IntegrityError):
+            client.post(f'/api/v1/titles/{title.pk}/reviews/',
+                        {'text': 'a', 'score': 7})
+
+    def test_missing_title(self, client):
+        response = client.post('/api/v1/titles/999/reviews/',
+                               {'text': 'a', 'score': 7})
+        assert response.status_code == 404
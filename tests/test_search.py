@@ -0,0 +1,44 @@
+import pytest
+from django.core.management import call_command
+from rest_framework.test import APIClient
+from reviews.models import Comment, Review, Title
+from users.models import User
+
+
+@pytest.fixture
+def catalog():
+    author = User.objects.create(username='author', email='a@ya.ru')
+    title = Title.objects.create(name='Матрица', year=1999,
+                                 description='фантастический боевик')
+    Title.objects.create(name='Титаник', year=1997, description='Драма')
+    review = Review.objects.create(title=title, author=author, score=9,
+                                   text='Лучший фантастический фильм')
+    Comment.objects.create(review=review, author=author,
+                           text='Согласен, фантастика')
+    return title, review
+
+
+@pytest.mark.django_db
+class TestSearch:
+
+    def test_search_all_types(self, catalog):
+        title, review = catalog
+        response = APIClient().get('/api/v1/search/?q=фантаст')
+        assert response.status_code == 200
+        assert [t['name'] for t in response.data['titles']] == ['Матрица']
+        assert response.data['reviews'][0]['title_id'] == title.pk
+        assert response.data['comments'][0]['review_id'] == review.pk
+
+    def test_search_type_filter(self, catalog):
+        response = APIClient().get('/api/v1/search/?q=Драма&type=titles')
+        assert list(response.data) == ['titles']
+        assert [t['name'] for t in response.data['titles']] == ['Титаник']
+
+    def test_search_validation(self, catalog):
+        client = APIClient()
+        assert client.get('/api/v1/search/').status_code == 400
+        assert client.get(
+            '/api/v1/search/?q=a&type=users').status_code == 400
+
+    def test_rebuild_command_runs(self, catalog):
+        call_command('rebuild_search_index')
@@ -1,3 +1,7 @@
+import runpy
+from pathlib import Path
+from unittest import mock
+
 from api_yamdb import settings
 
 
@@ -9,3 +13,32 @@ class TestSettings:
         assert settings.DATABASES['default']['ENGINE'] == 'django.db.backends.postgresql', (
             'Проверьте, что используете базу данных postgresql'
         )
+
+
+class TestGunicornConf:
+    path = Path(settings.BASE_DIR) / 'gunicorn.conf.py'
+
+    def load(self, monkeypatch, **env):
+        for name in ('REDIS_URL', 'GUNICORN_WORKERS'):
+            monkeypatch.delenv(name, raising=False)
+        for name, value in env.items():
+            monkeypatch.setenv(name, value)
+        return runpy.run_path(str(self.path))
+
+    def test_single_worker_without_shared_cache(self, monkeypatch):
+        assert self.load(monkeypatch)['workers'] == 1, (
+            'Проверьте, что без REDIS_URL по умолчанию запускается один воркер'
+        )
+        assert self.load(monkeypatch, REDIS_URL='redis://redis')['workers'] > 1
+
+    def test_warns_about_local_cache(self, monkeypatch):
+        server = mock.Mock()
+        self.load(monkeypatch, GUNICORN_WORKERS='4')['on_starting'](server)
+        assert 'REDIS_URL' in server.log.warning.call_args[0][0], (
+            'Проверьте, что gunicorn предупреждает о нескольких воркерах '
+            'без общего кэша'
+        )
+        server = mock.Mock()
+        self.load(monkeypatch, GUNICORN_WORKERS='4',
+                  REDIS_URL='redis://redis')['on_starting'](server)
+        assert not server.log.warning.called
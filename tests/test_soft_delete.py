@@ -0,0 +1,170 @@
+from io import StringIO
+
+import pytest
+from api.management.commands.purge_deleted import Command as PurgeCommand
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from reviews.models import Comment, Review, Title, TitleStats
+from users.models import User
+
+from .utils import client_for
+
+
+def make_title(authors, comments=2, name='Title'):
+    title = Title.objects.create(name=name, year=2000, description='')
+    for index, author in enumerate(authors):
+        review = Review.objects.create(title=title, author=author,
+                                       score=index + 4, text='отзыв')
+        for commenter in authors[:comments]:
+            Comment.objects.create(review=review, author=commenter,
+                                   text='комментарий')
+    return title
+
+
+def rating(title):
+    title = Title.all_objects.get(pk=title.pk)
+    stats = TitleStats.objects.get(title=title)
+    return title.rating_sum, title.rating_count, stats.total
+
+
+def purge(**options):
+    stdout = StringIO()
+    call_command('purge_deleted', stdout=stdout, **options)
+    return stdout.getvalue()
+
+
+@pytest.mark.django_db
+class TestSoftDelete:
+
+    def test_title(self, admin, authors):
+        title = make_title(authors)
+        review = title.reviews.first()
+        client = APIClient()
+        with CaptureQueriesContext(connection) as context:
+            response = client_for(admin).delete(f'/api/v1/titles/{title.pk}/')
+        assert response.status_code == 204
+        assert len(context.captured_queries) < 10, (
+            'Проверьте, что DELETE не удаляет отзывы и комментарии в запросе')
+        assert Title.all_objects.filter(pk=title.pk).exists()
+        assert Comment.all_objects.count() == 6
+
+        base = f'/api/v1/titles/{title.pk}'
+        for url in (f'{base}/', f'{base}/reviews/', f'{base}/stats/',
+                    f'{base}/reviews/{review.pk}/comments/'):
+            assert client.get(url).status_code == 404, (
+                f'Проверьте, что {url} скрыт сразу после удаления')
+        assert client.get('/api/v1/titles/').json()['count'] == 0
+        found = client.get('/api/v1/search/?q=отзыв комментарий').json()
+        assert found['reviews'] == [] and found['comments'] == []
+
+    def test_review_and_comment(self, admin, authors):
+        title = make_title(authors)
+        review = Review.objects.get(title=title, author=authors[0])
+        comment = review.comments.get(author=authors[0])
+        author = client_for(authors[0])
+        url = f'/api/v1/titles/{title.pk}/reviews/'
+        assert rating(title) == (15, 3, 3)
+
+        response = author.delete(f'{url}{review.pk}/comments/{comment.pk}/')
+        assert response.status_code == 204
+        assert Review.objects.get(pk=review.pk).comment_count == 1
+        assert author.get(f'{url}{review.pk}/comments/').json()[
+            'count'] == 1
+
+        assert author.delete(f'{url}{review.pk}/').status_code == 204
+        assert rating(title) == (11, 2, 2), (
+            'Проверьте, что мягкое удаление вычитает отзыв из рейтинга')
+        assert author.get(f'{url}{review.pk}/').status_code == 404
+        response = author.post(url, {'text': 'снова', 'score': 9})
+        assert response.status_code == 201, (
+            'Проверьте, что удаленный отзыв не мешает написать новый')
+        assert rating(title) == (20, 3, 3)
+
+        purge()
+        assert not Review.all_objects.filter(pk=review.pk).exists()
+        assert not Comment.all_objects.filter(review_id=review.pk).exists()
+        assert rating(title) == (20, 3, 3), (
+            'Проверьте, что purge_deleted не вычитает отзыв второй раз')
+
+    def test_user(self, admin, authors):
+        title = make_title(authors)
+        other = Review.objects.get(title=title, author=authors[1])
+        deleted = authors[0]
+        client = client_for(deleted)
+        assert client.get('/api/v1/users/me/').status_code == 200
+        url = f'/api/v1/titles/{title.pk}/'
+        assert APIClient().get(url).status_code == 200
+
+        response = client_for(admin).delete(
+            f'/api/v1/users/{deleted.username}/')
+        assert response.status_code == 204
+        assert client.get('/api/v1/users/me/').status_code == 401, (
+            'Проверьте, что удаленный пользователь не проходит аутентификацию')
+        assert client_for(admin).get(
+            f'/api/v1/users/{deleted.username}/').status_code == 404
+        response = APIClient().post('/api/v1/auth/signup/', {
+            'username': deleted.username, 'email': 'new@ya.ru'})
+        assert response.status_code == 400
+        reviews = APIClient().get(
+            f'/api/v1/titles/{title.pk}/reviews/').json()['results']
+        assert deleted.username not in {row['author'] for row in reviews}
+        comments = APIClient().get(
+            f'/api/v1/titles/{title.pk}/reviews/{other.pk}/comments/'
+        ).json()['results']
+        assert [row['author'] for row in comments] == [authors[1].username]
+        assert Review.objects.get(pk=other.pk).comment_count == 1, (
+            'Проверьте, что комментарии удаленного автора сразу вычитаются '
+            'из счетчика')
+        assert rating(title) == (11, 2, 2), (
+            'Проверьте, что отзывы удаленного автора сразу вычитаются из '
+            'рейтинга и распределения оценок')
+        assert APIClient().get(url)['X-Cache'] == 'MISS', (
+            'Проверьте, что удаление автора сбрасывает кэш произведения')
+
+        purge()
+        assert not User.objects.filter(pk=deleted.pk).exists()
+        assert not Review.all_objects.filter(author=deleted).exists()
+        assert not Comment.all_objects.filter(author=deleted).exists()
+        assert rating(title) == (11, 2, 2), (
+            'Проверьте, что отзывы удаленного автора ушли из рейтинга')
+        assert Review.objects.get(pk=other.pk).comment_count == 1, (
+            'Проверьте счетчик комментариев после удаления автора')
+
+    def test_batches_and_resume(self, authors, monkeypatch):
+        titles = [make_title(authors, comments=3, name=f'Title {i}')
+                  for i in range(2)]
+        kept = make_title(authors[:1], name='Kept')
+        for title in titles:
+            title.soft_delete()
+        assert 'Ждут удаления: reviews.Title 2,' in purge(dry_run=True)
+        assert Comment.all_objects.count() == 19
+
+        publish = PurgeCommand.publish
+        calls = []
+
+        def interrupted(command):
+            calls.append(1)
+            if len(calls) == 4:
+                raise KeyboardInterrupt
+            publish(command)
+
+        monkeypatch.setattr(PurgeCommand, 'publish', interrupted)
+        with pytest.raises(KeyboardInterrupt):
+            purge(batch_size=2)
+        assert 0 < Comment.all_objects.count() < 19
+        monkeypatch.setattr(PurgeCommand, 'publish', publish)
+
+        output = purge(batch_size=2)
+        assert 'Осталось: reviews.Title 0,' in output
+        assert set(Title.all_objects.all()) == {kept}
+        assert Review.all_objects.count() == 1
+        assert Comment.all_objects.count() == 1
+        assert TitleStats.objects.filter(title__in=titles).count() == 0
+
+        metrics = APIClient().get('/metrics')
+        content = metrics.content.decode()
+        assert 'api_purge_deleted_rows_total{model="reviews.Title"} 2' in (
+            content)
+        assert 'api_purge_pending_rows{model="reviews.Title"} 0' in content
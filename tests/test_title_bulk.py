@@ -0,0 +1,95 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from reviews.models import Category, Genre, Title, TitleStats
+
+URL = '/api/v1/titles/bulk/'
+
+
+@pytest.fixture
+def taxonomy():
+    Category.objects.create(name='Фильмы', slug='movies')
+    Genre.objects.create(name='Драма', slug='drama')
+    Genre.objects.create(name='Комедия', slug='comedy')
+
+
+def item(number, genre=('drama',), category='movies'):
+    return {'name': f'Фильм {number}', 'year': 2000, 'description': 'Описание',
+            'category': category, 'genre': list(genre)}
+
+
+@pytest.mark.django_db
+class TestTitleBulk:
+
+    def test_bulk_create(self, admin_client, taxonomy):
+        response = admin_client.post(
+            URL, [item(1), item(2, ('drama', 'comedy'))], format='json')
+        assert response.status_code == 201
+        assert [title['name'] for title in response.data] == [
+            'Фильм 1', 'Фильм 2']
+        assert [genre['slug'] for genre in response.data[1]['genre']] == [
+            'drama', 'comedy']
+        assert Title.genre.through.objects.count() == 3
+        assert TitleStats.objects.filter(
+            title__in=[title['id'] for title in response.data]
+        ).count() == 2, (
+            'Проверьте, что распределение оценок создается вместе с '
+            'произведениями'
+        )
+
+    def test_cache_invalidated_after_commit(self, admin_client, taxonomy):
+        assert APIClient().get('/api/v1/titles/').data['count'] == 0
+        admin_client.post(URL, [item(1)], format='json')
+        response = APIClient().get('/api/v1/titles/')
+        assert response['X-Cache'] == 'MISS'
+        assert response.data['count'] == 1, (
+            'Проверьте, что пакетное создание сбрасывает кэш списка'
+        )
+
+    def test_slug_lookups_are_set_based(self, admin_client, taxonomy):
+        def lookups(size):
+            with CaptureQueriesContext(connection) as context:
+                admin_client.post(
+                    URL, [item(number) for number in range(size)],
+                    format='json')
+            return [query for query in context.captured_queries
+                    if 'reviews_genre' in query['sql']
+                    and 'reviews_title' not in query['sql']
+                    or 'reviews_category' in query['sql']
+                    and 'reviews_title' not in query['sql']]
+
+        assert len(lookups(1)) == len(lookups(10)) == 2, (
+            'Проверьте, что жанры и категории всех элементов ищутся '
+            'одним запросом на модель'
+        )
+
+    def test_per_item_errors(self, admin_client, taxonomy):
+        response = admin_client.post(
+            URL, [item(1), item(2, ('horror',)), item(3, category='x'),
+                  {'name': 'Без года'}], format='json')
+        assert response.status_code == 400
+        assert response.data[0] == {}
+        assert list(response.data[1]) == ['genre']
+        assert list(response.data[2]) == ['category']
+        assert 'year' in response.data[3]
+        assert not Title.objects.exists(), (
+            'Проверьте, что при ошибке не создается ни одно произведение'
+        )
+
+    def test_max_items(self, admin_client, taxonomy, settings):
+        settings.TITLE_BULK_MAX_ITEMS = 2
+        response = admin_client.post(
+            URL, [item(number) for number in range(3)], format='json')
+        assert response.status_code == 400, (
+            'Проверьте, что слишком большая пачка отклоняется'
+        )
+        assert 'non_field_errors' in response.data
+        assert not Title.objects.exists()
+        response = admin_client.post(
+            URL, [item(number) for number in range(2)], format='json')
+        assert response.status_code == 201
+
+    def test_permissions(self, taxonomy):
+        assert APIClient().post(URL, [item(1)],
+                                format='json').status_code == 401
@@ -0,0 +1,49 @@
+import pytest
+from rest_framework.test import APIClient
+from reviews.models import Category, Genre, Title
+
+
+@pytest.fixture
+def catalog():
+    films = Category.objects.create(name='Фильмы', slug='films')
+    books = Category.objects.create(name='Книги', slug='books')
+    rock = Genre.objects.create(name='Рок', slug='rock')
+    drama = Genre.objects.create(name='Драма', slug='drama')
+    first = Title.objects.create(name='First', year=1994, description='',
+                                 category=films)
+    first.genre.set([rock, drama])
+    second = Title.objects.create(name='Second', year=2005, description='',
+                                  category=books)
+    second.genre.set([drama])
+    return first, second
+
+
+def names(query):
+    response = APIClient().get(f'/api/v1/titles/?{query}')
+    assert response.status_code == 200
+    return sorted(title['name'] for title in response.data['results'])
+
+
+@pytest.mark.django_db
+class TestTitleFilter:
+
+    def test_exact_filters(self, catalog):
+        assert names('year=1994') == ['First']
+        assert names('year=199') == []
+        assert names('category=film') == []
+        assert names('category=books') == ['Second']
+
+    def test_year_range(self, catalog):
+        assert names('year_min=2000') == ['Second']
+        assert names('year_min=1990&year_max=2010') == ['First', 'Second']
+
+    def test_genre_any_of_without_duplicates(self, catalog):
+        assert names('genre=rock,drama') == ['First', 'Second'], (
+            'Проверьте, что фильтр genre=a,b не дублирует произведения'
+        )
+        assert names('genre=rock') == ['First']
+
+    def test_legacy_contains(self, catalog):
+        assert names('category_contains=film') == ['First']
+        assert names('genre_contains=dra') == ['First', 'Second']
+        assert names('year_contains=99') == ['First']
@@ -0,0 +1,72 @@
+import pytest
+from django.core.management import call_command
+from rest_framework.test import APIClient
+from reviews.models import Category, Review, Title
+from users.models import User
+
+
+@pytest.fixture
+def titles(settings):
+    settings.RATING_PRIOR_MEAN = 5.5
+    settings.RATING_PRIOR_WEIGHT = 5
+    category = Category.objects.create(name='Фильмы', slug='movies')
+    authors = [User.objects.create(username=f'user{i}', email=f'u{i}@ya.ru')
+               for i in range(10)]
+    single = Title.objects.create(name='Один отзыв', year=2001,
+                                  description='', category=category)
+    popular = Title.objects.create(name='Много отзывов', year=1999,
+                                   description='', category=category)
+    unrated = Title.objects.create(name='Без отзывов', year=2010,
+                                   description='')
+    Review.objects.create(title=single, author=authors[0], score=10,
+                          text='a')
+    for author in authors:
+        Review.objects.create(title=popular, author=author, score=9,
+                              text='b')
+    return single, popular, unrated
+
+
+def names(query):
+    response = APIClient().get(f'/api/v1/titles/?ordering={query}')
+    assert response.status_code == 200
+    return [title['name'] for title in response.data['results']]
+
+
+@pytest.mark.django_db
+class TestTitleOrdering:
+
+    def test_weighted_rating(self, titles):
+        single, popular, unrated = titles
+        single.refresh_from_db()
+        assert single.weighted_rating == pytest.approx(
+            (10 + 5 * 5.5) / 6)
+        assert names('-rating') == ['Много отзывов', 'Один отзыв',
+                                    'Без отзывов'], (
+            'Проверьте, что одна высокая оценка не обгоняет много хороших'
+        )
+
+    def test_other_orderings(self, titles):
+        assert names('-review_count') == ['Много отзывов', 'Один отзыв',
+                                          'Без отзывов']
+        assert names('year') == ['Много отзывов', 'Один отзыв',
+                                 'Без отзывов']
+        assert names('name,-year') == ['Без отзывов', 'Много отзывов',
+                                       'Один отзыв']
+
+    def test_unknown_ordering_ignored(self, titles):
+        assert sorted(names('weighted_rating')) == sorted(
+            title.name for title in titles)
+
+    def test_ordering_within_category(self, titles):
+        response = APIClient().get(
+            '/api/v1/titles/?category=movies&ordering=-rating')
+        assert [title['name'] for title in response.data['results']] == [
+            'Много отзывов', 'Один отзыв']
+
+    def test_weighted_rating_follows_delete(self, titles, capsys):
+        single, popular, unrated = titles
+        Review.objects.filter(title=single).delete()
+        single.refresh_from_db()
+        assert single.weighted_rating == pytest.approx(5.5)
+        call_command('recompute_ratings', dry_run=True)
+        assert 'с расхождениями: 0' in capsys.readouterr().out
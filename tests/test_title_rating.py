@@ -0,0 +1,53 @@
+import pytest
+from django.core.management import call_command
+from reviews.models import Review, Title
+
+
+def refreshed(title):
+    title.refresh_from_db()
+    return title.rating_sum, title.rating_count, title.rating
+
+
+@pytest.mark.django_db
+class TestTitleRating:
+
+    def test_rating_follows_reviews(self, title, authors):
+        first = Review.objects.create(title=title, author=authors[0],
+                                      text='a', score=10)
+        Review.objects.create(title=title, author=authors[1],
+                              text='b', score=5)
+        assert refreshed(title) == (15, 2, 7), (
+            'Проверьте, что рейтинг пересчитывается при создании отзыва'
+        )
+
+        first = Review.objects.get(pk=first.pk)
+        first.score = 1
+        first.save()
+        assert refreshed(title) == (6, 2, 3), (
+            'Проверьте, что рейтинг пересчитывается при изменении оценки'
+        )
+
+        first.delete()
+        assert refreshed(title) == (5, 1, 5), (
+            'Проверьте, что рейтинг пересчитывается при удалении отзыва'
+        )
+
+    def test_cascade_and_bulk_delete(self, title, authors):
+        for author in authors:
+            Review.objects.create(title=title, author=author,
+                                  text='a', score=4)
+        authors[0].delete()
+        assert refreshed(title) == (8, 2, 4)
+
+        Review.objects.filter(title=title).delete()
+        assert refreshed(title) == (0, 0, None)
+
+    def test_recompute_command_fixes_drift(self, title, authors):
+        Review.objects.create(title=title, author=authors[0],
+                              text='a', score=8)
+        Title.objects.update(rating_sum=0, rating_count=0, rating=None)
+
+        call_command('recompute_ratings')
+        assert refreshed(title) == (8, 1, 8), (
+            'Проверьте, что recompute_ratings исправляет расхождения'
+        )
@@ -0,0 +1,123 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from reviews.models import Review, Title, TitleStats
+
+from .utils import create_users
+
+
+@pytest.fixture
+def titles():
+    return [Title.objects.create(name=f'Title {i}', year=2000,
+                                 description='') for i in range(2)]
+
+
+@pytest.fixture
+def authors():
+    return create_users(5)
+
+
+def expected_stats(title):
+    scores = dict.fromkeys(range(1, 11), 0)
+    for score in title.reviews.values_list('score', flat=True):
+        scores[score] += 1
+    return sum(scores.values()), scores
+
+
+def actual_stats(title):
+    stats = TitleStats.objects.get(title=title)
+    return stats.total, stats.histogram()
+
+
+def get_stats(title_id):
+    with CaptureQueriesContext(connection) as context:
+        response = APIClient().get(f'/api/v1/titles/{title_id}/stats/')
+    return response, len(context.captured_queries)
+
+
+@pytest.mark.django_db
+class TestTitleStats:
+
+    def test_signals(self, titles, authors):
+        first, second = titles
+        reviews = [Review.objects.create(title=first, author=author,
+                                         score=index + 6, text='t')
+                   for index, author in enumerate(authors)]
+        assert actual_stats(first) == expected_stats(first)
+
+        review = Review.objects.get(pk=reviews[0].pk)
+        review.score = 10
+        review.save()
+        assert actual_stats(first) == expected_stats(first), (
+            'Проверьте, что смена оценки переносит отзыв в другой счетчик')
+
+        review.title = second
+        review.save()
+        assert actual_stats(first) == expected_stats(first)
+        assert actual_stats(second) == expected_stats(second), (
+            'Проверьте перенос отзыва в другое произведение')
+
+        Review.objects.get(pk=reviews[1].pk).delete()
+        assert actual_stats(first) == expected_stats(first)
+        assert actual_stats(first)[0] == 3
+
+    def test_missing_row_rebuilt(self, titles, authors):
+        # Произведения из bulk_create и из старых данных без строки.
+        TitleStats.objects.all().delete()
+        Review.objects.bulk_create([
+            Review(title=titles[0], author=author, score=3, text='t')
+            for author in authors[:3]])
+        Review.objects.create(title=titles[0], author=authors[3], score=9,
+                              text='t')
+        assert actual_stats(titles[0]) == (4, {**dict.fromkeys(
+            range(1, 11), 0), 3: 3, 9: 1})
+
+    def test_endpoint(self, titles, authors):
+        title = titles[0]
+        for index, author in enumerate(authors):
+            Review.objects.create(title=title, author=author,
+                                  score=index % 2 + 7, text='t')
+        response, queries = get_stats(title.pk)
+        assert response.status_code == 200
+        assert response.json() == {
+            'title': title.pk, 'total': 5,
+            'scores': {str(score): {7: 3, 8: 2}.get(score, 0)
+                       for score in range(1, 11)}}
+        assert queries == 1, (
+            'Проверьте, что гистограмма читается одним запросом')
+        response, queries = get_stats(title.pk)
+        assert response['X-Cache'] == 'HIT'
+        assert queries == 0
+
+        Review.objects.filter(author=authors[0]).get().delete()
+        response, _ = get_stats(title.pk)
+        assert response['X-Cache'] == 'MISS', (
+            'Проверьте, что изменение отзывов сбрасывает кэш гистограммы')
+        assert response.json()['total'] == 4
+
+    def test_endpoint_without_reviews(self, titles):
+        TitleStats.objects.all().delete()
+        response, _ = get_stats(titles[1].pk)
+        assert response.status_code == 200
+        assert response.json()['total'] == 0
+        assert get_stats(9999)[0].status_code == 404
+        assert get_stats('abc')[0].status_code == 404
+
+    def test_rebuild_command(self, titles, authors):
+        for title in titles:
+            for index, author in enumerate(authors):
+                Review.objects.create(title=title, author=author,
+                                      score=index + 1, text='t')
+        TitleStats.objects.filter(title=titles[0]).update(score_1=50,
+                                                          total=0)
+        TitleStats.objects.filter(title=titles[1]).delete()
+        stdout = StringIO()
+        call_command('rebuild_title_stats', batch_size=1, stdout=stdout)
+        for title in titles:
+            assert actual_stats(title) == expected_stats(title), (
+                'Проверьте, что rebuild_title_stats исправляет расхождения')
+        assert 'произведений 2, отзывов 10' in stdout.getvalue()
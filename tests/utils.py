@@ -0,0 +1,43 @@
+from api.authentication import issue_token
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from users.models import User
+
+
+def client_for(user):
+    # Клиент с настоящим JWT: запрос проходит аутентификацию целиком.
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {issue_token(user)}')
+    return client
+
+
+def create_users(count):
+    return [User.objects.create(username=f'user{i}', email=f'u{i}@ya.ru')
+            for i in range(count)]
+
+
+def count_queries(client, url):
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(url)
+    assert response.status_code == 200, (
+        f'Проверьте, что GET {url} возвращает 200, а не '
+        f'{response.status_code}'
+    )
+    return len(context.captured_queries)
+
+
+def assert_constant_queries(client, url, fill, sizes=(1, 5, 15)):
+    """Проверяет, что число запросов к url не зависит от размера страницы.
+
+    fill(n) должна догружать данные так, чтобы на странице было n строк.
+    """
+    counts = []
+    for size in sizes:
+        fill(size)
+        counts.append(count_queries(client, url))
+    assert len(set(counts)) == 1, (
+        f'Число SQL-запросов к {url} растет вместе со страницей: '
+        f'{dict(zip(sizes, counts))}'
+    )
+    return counts[0]